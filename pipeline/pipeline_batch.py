@@ -0,0 +1,204 @@
+# ================================
+# pipeline_batch.py — Multi-book batch orchestrator
+# One process pool for a whole manifest of passfiles/books
+# Longest job first (by scene count) so big books don't start last
+# Workers load schema validators, lexicon matchers and the merch catalog once
+# Per-book results plus a combined metrics summary and merged beat statistics
+# ================================
+
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from workflow_utils import read_passfile, TRINITY_TOKENS, SEXUAL_ACTION_KEYWORDS, EROTIC_PHYSIOLOGY
+from workflow_utils_lexicon import token_matcher
+from workflow_utils_merch_catalog import MERCH_CATALOG_PATH, get_merch_catalog
+from workflow_utils_checkpoint import is_scene_key
+from workflow_utils_passfile_index import load_or_build_index
+from workflow_utils_schema import SCHEMA_PATH, get_schema_validator
+from workflow_utils_sketches import BeatStatistics
+from workflow_utils_tracing import get_tracer, run_traced
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+DEFAULT_CHUNK_RANGE = (0, 16)
+
+BookJob = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+# -----------------------
+# Manifest
+# -----------------------
+def load_manifest(manifest: Union[str, Path, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """
+    A JSON file or list whose entries are passfile paths or dicts:
+    {"passfile": ..., "book": ..., "chunk_range": [start, stop], "scenes": n, "resume": bool}.
+    Missing book names default to the passfile stem; each entry keeps its manifest position.
+    """
+    if isinstance(manifest, (str, Path)):
+        with open(manifest, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    entries = []
+    for position, raw in enumerate(manifest):
+        entry = {"passfile": raw} if isinstance(raw, (str, Path)) else dict(raw)
+        if "passfile" not in entry:
+            raise ValueError(f"Manifest entry {position} has no passfile: {raw!r}")
+        entry["passfile"] = str(entry["passfile"])
+        entry.setdefault("book", Path(entry["passfile"]).stem)
+        entry["chunk_range"] = list(entry.get("chunk_range", DEFAULT_CHUNK_RANGE))
+        entry["position"] = position
+        entries.append(entry)
+    return entries
+
+def count_scenes(passfile_path: Union[str, Path]) -> int:
+    """Scene records in a passfile, counted from its top-level key index (no full decode if uncompressed)."""
+    p = Path(passfile_path)
+    if not p.exists():
+        return 0
+    try:
+        keys = load_or_build_index(p).keys()
+    except Exception:
+        keys = read_passfile(str(p)).keys()
+    return sum(1 for key in keys if is_scene_key(key))
+
+def schedule_longest_first(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fill in scene counts and order by them, largest first (manifest order breaks ties)."""
+    for entry in entries:
+        if entry.get("scenes") is None:
+            entry["scenes"] = count_scenes(entry["passfile"])
+    return sorted(entries, key=lambda e: (-e["scenes"], e["position"]))
+
+
+# -----------------------
+# Worker side
+# -----------------------
+def warm_worker(schema_path: Optional[str] = None, merch_catalog_path: Optional[str] = None) -> None:
+    """Pool initializer: build each worker's validator, lexicon matchers and merch catalog once."""
+    for lexicon in (*TRINITY_TOKENS.values(), SEXUAL_ACTION_KEYWORDS, EROTIC_PHYSIOLOGY):
+        token_matcher(lexicon)
+    try:
+        get_schema_validator(Path(schema_path) if schema_path else SCHEMA_PATH)
+        catalog_path = Path(merch_catalog_path) if merch_catalog_path else MERCH_CATALOG_PATH
+        if catalog_path.exists():
+            get_merch_catalog(catalog_path)
+    except Exception as e:
+        # Books still run; whatever failed here is loaded (and reported) on first use
+        logger.warning(f"Worker warm-up incomplete: {e}")
+
+def run_book(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Run pipeline_full for one manifest entry in the current (warm) worker."""
+    from pipeline_full import pipeline_full
+
+    # Without an entry catalog, pipeline_full picks up the installed default (if any)
+    catalog_path = entry.get("merch_catalog")
+    pf = pipeline_full(
+        passfile_path=entry["passfile"],
+        chunk_range=range(*entry["chunk_range"]),
+        resume=bool(entry.get("resume", False)),
+        merch_catalog=get_merch_catalog(catalog_path) if catalog_path else None,
+    )
+    stats = BeatStatistics()
+    for key, record in pf.items():
+        if key.startswith("chunk_") and isinstance(record, dict):
+            stats.add_scene_record(record)
+    return {"chunks": len(range(*entry["chunk_range"])), "keys": len(pf), "beat_stats": stats.to_dict()}
+
+def _run_entry(job: BookJob, entry: Dict[str, Any]) -> Dict[str, Any]:
+    # Failures are reported per book so one bad passfile doesn't sink the batch
+    started = time.perf_counter()
+    result = {"book": entry["book"], "passfile": entry["passfile"], "scenes": entry["scenes"], "worker": os.getpid()}
+    try:
+        result.update(job(entry) or {})
+        result["status"] = "ok"
+    except Exception as e:
+        logging.error(f"Book {entry['book']} failed: {e}")
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+    result["wall_s"] = time.perf_counter() - started
+    return result
+
+
+# -----------------------
+# Orchestrator
+# -----------------------
+def summarize(results: List[Dict[str, Any]], wall_s: float, workers: int) -> Dict[str, Any]:
+    busy = sum(r["wall_s"] for r in results)
+    ok = [r for r in results if r["status"] == "ok"]
+    per_worker: Dict[int, float] = {}
+    for r in results:
+        per_worker[r["worker"]] = per_worker.get(r["worker"], 0.0) + r["wall_s"]
+    return {
+        "books": len(results),
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "scenes": sum(r["scenes"] for r in ok),
+        "workers": workers,
+        "wall_s": wall_s,
+        "busy_s": busy,
+        "utilization": busy / (wall_s * workers) if wall_s > 0 and workers else 0.0,
+        "scenes_per_s": sum(r["scenes"] for r in ok) / wall_s if wall_s > 0 else 0.0,
+        "slowest_book": max(results, key=lambda r: r["wall_s"])["book"] if results else None,
+        "worker_busy_s": {str(pid): s for pid, s in sorted(per_worker.items())},
+    }
+
+def run_batch(manifest: Union[str, Path, Sequence[Any]],
+              workers: Optional[int] = None,
+              job: BookJob = run_book,
+              schema_path: Optional[str] = None,
+              merch_catalog_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Process every book of the manifest on a pool of `workers` processes
+    (default: CPU count, capped at the number of books). Books are submitted
+    longest first; results come back in manifest order with a combined summary.
+    job(entry) -> dict of extra result fields; must be picklable (module-level).
+    Books that return "beat_stats" (BeatStatistics.to_dict()) are merged into
+    one series-level "beat_statistics" summary.
+    """
+    entries = schedule_longest_first(load_manifest(manifest))
+    if not entries:
+        return {"results": [], "summary": summarize([], 0.0, 0), "beat_statistics": BeatStatistics().summary()}
+    workers = max(1, min(workers or os.cpu_count() or 1, len(entries)))
+    tracer = get_tracer()
+    started = time.perf_counter()
+    by_position: Dict[int, Dict[str, Any]] = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_worker,
+                             initargs=(schema_path, merch_catalog_path)) as pool:
+        # The pool hands out work in submission order, so submitting sorted is longest-first
+        if tracer:
+            futures = {pool.submit(run_traced, partial(_run_entry, job), e, "book", {"book": e["book"]}): e
+                       for e in entries}
+        else:
+            futures = {pool.submit(_run_entry, job, e): e for e in entries}
+        for future in as_completed(futures):
+            result = future.result()
+            if tracer:
+                result, events = result
+                tracer.add_events(events)
+            logging.info(f"Book {result['book']} {result['status']} in {result['wall_s']:.2f}s")
+            by_position[futures[future]["position"]] = result
+    wall_s = time.perf_counter() - started
+    results = [by_position[k] for k in sorted(by_position)]
+    stats = BeatStatistics()
+    for result in results:
+        if "beat_stats" in result:
+            stats.merge(BeatStatistics.from_dict(result.pop("beat_stats")))
+    return {"results": results, "summary": summarize(results, wall_s, workers), "beat_statistics": stats.summary()}
+
+
+# -----------------------
+# Execution
+# -----------------------
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    if len(sys.argv) < 2:
+        sys.exit("usage: pipeline_batch.py MANIFEST.json [WORKERS]")
+    batch = run_batch(sys.argv[1], workers=int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    print(json.dumps({"summary": batch["summary"], "beat_statistics": batch["beat_statistics"]}, indent=2))
@@ -0,0 +1,376 @@
+# ================================
+# pipeline_daemon.py — Long-running pipeline/merge service
+# Passfiles held in memory, submissions over a local Unix socket
+# Batched merge_chunks_v5_13 / pipeline_full passes
+# Write-behind flush to disk
+# ================================
+
+import json
+import logging
+import os
+import queue
+import socketserver
+import socket
+import threading
+import time
+from copy import deepcopy
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from workflow_utils import generate_scene_uuid_from_metadata, read_passfile, update_passfile_scenes
+from workflow_utils_inverted_index import InvertedIndex
+from workflow_utils_merge_v5_13 import merge_chunks_v5_13
+from workflow_utils_schema import get_schema_validator
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+DEFAULT_SOCKET_PATH = Path("pipeline_daemon.sock")
+DEFAULT_FLUSH_INTERVAL = 2.0
+DEFAULT_MAX_BATCH = 256
+BATCHED_OPS = {"merge_chunks", "run_pipeline"}
+PIPELINE_INPUT_FIELDS = ("scene_text", "scene_metadata", "beat_list")
+
+_MISSING = object()
+_ALL = object()  # snapshot marker: the snapshot holds every entry
+
+
+# -----------------------
+# Requests
+# -----------------------
+class _Request:
+    """One submission waiting for the batch worker; the handler thread blocks on done."""
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.payload = payload
+        self.response: Dict[str, Any] = {}
+        self.done = threading.Event()
+
+    def reply(self, response: Dict[str, Any]) -> None:
+        self.response = response
+        self.done.set()
+
+
+# -----------------------
+# Daemon
+# -----------------------
+class PipelineDaemon:
+    """
+    Keeps passfiles and the compiled validator hot for the life of the process.
+
+    Protocol: newline-delimited JSON over a Unix socket, one response line per request.
+    - {"op": "merge_chunks", "passfile": p, "chunks": [...], "force_overwrite_text_for": [...]}
+    - {"op": "run_pipeline", "passfile": p, "chunk_range": [start, stop],
+       "scene_text": ..., "scene_metadata": {...}, "beat_list": [...]}   (scene fields optional)
+    - {"op": "get_scene", "passfile": p, "key": scene_uuid}
+    - {"op": "query", "passfile": p, "query": "flag:climax AND cuffs_detected:leather", "level": "scene"|"beat"}
+    - {"op": "flush"}, {"op": "stats"}, {"op": "shutdown"}
+    Batched ops are acknowledged once applied in memory; a request that fails
+    is rolled back without affecting the rest of its batch. Disk writes follow
+    within flush_interval (or on flush/shutdown).
+    """
+
+    def __init__(self,
+                 socket_path: Path = DEFAULT_SOCKET_PATH,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 max_batch: int = DEFAULT_MAX_BATCH):
+        self.socket_path = Path(socket_path)
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.passfiles: Dict[str, Dict[str, Any]] = {}
+        self.term_indexes: Dict[str, InvertedIndex] = {}
+        self.dirty: Dict[str, set] = {}  # passfile -> top-level keys changed since the last flush
+        self.stats = {"requests": 0, "batches": 0, "flushes": 0}
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._stop = threading.Event()
+        # Held while checking _stop and enqueueing, and by stop() while setting it, so no
+        # request can land behind the worker's shutdown sentinel
+        self._submit_lock = threading.Lock()
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+        self._threads: List[threading.Thread] = []
+
+    # -----------------------
+    # Passfile state
+    # -----------------------
+    def _passfile(self, path: str) -> Dict[str, Any]:
+        key = str(Path(path).resolve())
+        if key not in self.passfiles:
+            self.passfiles[key] = read_passfile(key)
+            logger.info(f"Loaded passfile {key} into memory")
+        return self.passfiles[key]
+
+    def _term_index(self, path: str) -> InvertedIndex:
+        key = str(Path(path).resolve())
+        if key not in self.term_indexes:
+            self.term_indexes[key] = InvertedIndex.build(self._passfile(key))
+        return self.term_indexes[key]
+
+    def _reindex(self, path: str, keys: Iterable[str]) -> None:
+        index = self.term_indexes.get(path)
+        if index is not None:
+            index.update(self.passfiles[path], list(keys))
+
+    def _mark_dirty(self, path: str, keys: Iterable[str]) -> None:
+        self.dirty.setdefault(path, set()).update(keys)
+
+    def flush(self) -> int:
+        """
+        Write every dirty passfile; returns the number written. Only the dirty
+        scenes are copied under the daemon lock; each passfile is then updated
+        on disk under its passfile lock, keeping scenes other writers added.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self.dirty = self.dirty, {}
+                updates = {path: {k: deepcopy(self.passfiles[path][k]) for k in keys if k in self.passfiles[path]}
+                           for path, keys in pending.items()}
+            written = 0
+            try:
+                for path in sorted(updates):
+                    update_passfile_scenes(updates[path], path)
+                    pending.pop(path)
+                    written += 1
+            finally:
+                if pending:
+                    with self._lock:
+                        for path, keys in pending.items():
+                            self._mark_dirty(path, keys)
+            if written:
+                with self._lock:
+                    self.stats["flushes"] += 1
+        return written
+
+    # -----------------------
+    # Batch worker
+    # -----------------------
+    def _drain(self, first: _Request) -> List[_Request]:
+        batch = [first]
+        while len(batch) < self.max_batch:
+            try:
+                nxt = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if nxt is None:
+                self._queue.put(None)
+                break
+            batch.append(nxt)
+        return batch
+
+    def _apply_batch(self, batch: List[_Request]) -> None:
+        # One lock hold per batch; each request is applied (and rolled back) on its own
+        with self._lock:
+            for req in batch:
+                op, path, snapshot = req.payload.get("op"), None, None
+                try:
+                    path = str(Path(req.payload["passfile"]).resolve())
+                    pf = self._passfile(path)
+                    snapshot = self._snapshot(pf, op, req.payload)
+                    apply = self._merge if op == "merge_chunks" else self._run_pipeline
+                    result, changed = apply(path, req.payload)
+                except Exception as e:
+                    logger.error(f"Daemon {op} failed for {path}: {e}")
+                    if snapshot is not None:
+                        self._restore(pf, snapshot)
+                        # Rebuilt from the restored passfile on the next query
+                        self.term_indexes.pop(path, None)
+                    req.reply({"ok": False, "error": str(e)})
+                    continue
+                self._mark_dirty(path, changed)
+                req.reply({"ok": True, **result})
+            self.stats["batches"] += 1
+
+    @staticmethod
+    def _snapshot(pf: Dict[str, Any], op: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Copies of the entries the request can modify, restored if it fails."""
+        if op == "merge_chunks":
+            keys = {generate_scene_uuid_from_metadata(c.get("scene_metadata", {})) for c in payload.get("chunks", [])}
+            return {k: deepcopy(pf[k]) if k in pf else _MISSING for k in keys}
+        # pipeline_full adds and replaces top-level entries and edits its inputs in place
+        snapshot = dict(pf)
+        snapshot.update({f: deepcopy(pf[f]) for f in PIPELINE_INPUT_FIELDS if f in pf})
+        snapshot[_ALL] = True
+        return snapshot
+
+    @staticmethod
+    def _restore(pf: Dict[str, Any], snapshot: Dict[str, Any]) -> None:
+        if snapshot.pop(_ALL, False):
+            pf.clear()
+        for key, value in snapshot.items():
+            if value is _MISSING:
+                pf.pop(key, None)
+            else:
+                pf[key] = value
+
+    def _merge(self, path: str, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        chunks = payload.get("chunks", [])
+        pf = self.passfiles[path]
+        merge_chunks_v5_13(pf, chunks, force_overwrite_text_for=payload.get("force_overwrite_text_for", []))
+        keys = [c["scene_uuid"] for c in chunks]
+        self._reindex(path, keys)
+        return {"merged_chunks": len(chunks), "scenes": len(pf)}, keys
+
+    def _run_pipeline(self, path: str, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        from pipeline_full import pipeline_full
+        pf = self.passfiles[path]
+        before = dict(pf)
+        for field in PIPELINE_INPUT_FIELDS:
+            if field in payload:
+                pf[field] = payload[field]
+        start, stop = payload.get("chunk_range", [0, 16])
+        pipeline_full(passfile_path=path, chunk_range=range(start, stop), passfile=pf, persist=False)
+        record = pf.get("scene_record", {})
+        if record.get("scene_uuid"):
+            pf[record["scene_uuid"]] = record
+            self._reindex(path, [record["scene_uuid"]])
+        changed = [k for k in pf if before.get(k, _MISSING) is not pf[k] or k in PIPELINE_INPUT_FIELDS]
+        return {"scene_uuid": record.get("scene_uuid")}, changed
+
+    def _worker(self) -> None:
+        while True:
+            req = self._queue.get()
+            if req is None:
+                self._reject_queued()
+                return
+            batch = self._drain(req)
+            try:
+                self._apply_batch(batch)
+            except Exception as e:
+                logger.error(f"Daemon batch failed: {e}")
+            finally:
+                for req in batch:
+                    if not req.done.is_set():
+                        req.reply({"ok": False, "error": "request not applied"})
+
+    def _reject_queued(self) -> None:
+        while True:
+            try:
+                req = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if req is not None:
+                req.reply({"ok": False, "error": "daemon is shutting down"})
+
+    def _flusher(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}")
+
+    # -----------------------
+    # Request dispatch
+    # -----------------------
+    def handle(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self.stats["requests"] += 1
+        op = payload.get("op")
+        if op in BATCHED_OPS:
+            if "passfile" not in payload:
+                return {"ok": False, "error": "missing 'passfile'"}
+            req = _Request(payload)
+            with self._submit_lock:
+                if self._stop.is_set():
+                    return {"ok": False, "error": "daemon is shutting down"}
+                self._queue.put(req)
+            req.done.wait()
+            return req.response
+        if op == "get_scene":
+            with self._lock:
+                return {"ok": True, "scene": self._passfile(payload["passfile"]).get(payload["key"])}
+        if op == "query":
+            with self._lock:
+                hits = self._term_index(payload["passfile"]).query(payload["query"], payload.get("level", "scene"))
+            return {"ok": True, "hits": hits}
+        if op == "flush":
+            return {"ok": True, "flushed": self.flush()}
+        if op == "stats":
+            with self._lock:
+                return {"ok": True, **self.stats, "passfiles": len(self.passfiles), "dirty": len(self.dirty)}
+        if op == "shutdown":
+            threading.Thread(target=self.stop, daemon=True).start()
+            return {"ok": True}
+        return {"ok": False, "error": f"unknown op {op!r}"}
+
+    # -----------------------
+    # Lifecycle
+    # -----------------------
+    def start(self) -> "PipelineDaemon":
+        get_schema_validator()  # warm the validator before the first submission
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        response = daemon.handle(json.loads(line))
+                    except Exception as e:
+                        response = {"ok": False, "error": str(e)}
+                    self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        self._server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler)
+        self._server.daemon_threads = True
+        for target in (self._server.serve_forever, self._worker, self._flusher):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+        logger.info(f"Pipeline daemon listening on {self.socket_path}")
+        return self
+
+    def stop(self) -> None:
+        with self._submit_lock:
+            if self._stop.is_set():
+                return
+            self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        self._queue.put(None)
+        for t in self._threads:
+            if t is not threading.current_thread():
+                t.join(timeout=5)
+        self.flush()
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        logger.info("Pipeline daemon stopped")
+
+    def serve_forever(self) -> None:
+        self.start()
+        try:
+            while not self._stop.is_set():
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+# -----------------------
+# Client
+# -----------------------
+def submit(request: Dict[str, Any], socket_path: Path = DEFAULT_SOCKET_PATH, timeout: Optional[float] = 60.0) -> Dict[str, Any]:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(socket_path))
+        sock.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+        with sock.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+# -----------------------
+# Execution
+# -----------------------
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    PipelineDaemon(
+        socket_path=Path(os.environ.get("PIPELINE_DAEMON_SOCKET", DEFAULT_SOCKET_PATH)),
+        flush_interval=float(os.environ.get("PIPELINE_DAEMON_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL))
+    ).serve_forever()
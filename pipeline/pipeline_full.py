@@ -7,11 +7,13 @@
 # Schema validation per chunk
 # ================================
 
-import json
 import logging
+import os
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 import uuid
+from contextlib import nullcontext
+from copy import deepcopy
 from statistics import mean
 
 from workflow_utils import (
@@ -21,29 +23,36 @@ from workflow_utils import (
     merge_scene_sections,
     deterministic_uuid,
     update_passfile_scene_record,
-    insert_trinity_advisory
+    update_passfile_scenes,
+    insert_trinity_advisory,
+    iter_continuity_inflections
 )
 from workflow_utils_marketing import (
     extract_merch_evidence,
-    enforce_canonical_merch_refs,
-    save_marketing_copy
+    enforce_canonical_merch_refs
 )
-from workflow_utils_schema import SCHEMA_PATH
-from jsonschema import validate as jsonschema_validate, ValidationError
-
-# -----------------------
-# Logging
-# -----------------------
-logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+from workflow_utils_marketing_sink import get_marketing_sink
+from workflow_utils_merch_catalog import MerchCatalog, default_merch_catalog
+from workflow_utils_schema import SCHEMA_PATH, validate_scene_record, validation_error_type
+from workflow_utils_cache import get_analysis_cache, lexicon_version
+from workflow_utils_keywords import (
+    KEYWORDS, DEFAULT_CHUNK_SIZE, DEFAULT_ARC_THRESHOLDS, ROLLING_AVG_WINDOW, keyword_counts
+)
+from workflow_utils_checkpoint import (
+    CHECKPOINT_KEY, chunk_fingerprint, new_checkpoint, load_checkpoint,
+    record_chunk, committed_entry, continuity_stub
+)
+from workflow_utils_profiling import MEMORY_REPORT_ENV, memory_profiling, memory_stage
+from workflow_utils_tracing import TRACE_REPORT_ENV, trace_iter, trace_span, tracing
+from pipeline_stages import DEFAULT_QUEUE_SIZE, Stage, StagedExecutor
 
 # -----------------------
 # Constants
 # -----------------------
 PASSFILE_PATH = Path("passfile.json")
-DEFAULT_CHUNK_SIZE = 5
-KEYWORDS = ["dominance", "submission", "tension", "release", "erotic", "gaze", "posture", "voice", "control"]
-DEFAULT_ARC_THRESHOLDS = {"erotic_peak": 0.3, "fast_pacing_word_count": 30}
-ROLLING_AVG_WINDOW = 3
+# When a chunk's analysis inputs match the last validated chunk's, only these (continuity)
+# fields can differ, so only their subtrees are re-validated
+CONTINUITY_FIELDS = ("sections",)
 
 # -----------------------
 # Helpers
@@ -58,6 +67,17 @@ def normalize_scene_metadata(scene_metadata: Dict[str, Any]) -> Dict[str, Any]:
     scene_metadata["scene_uuid"] = safe_generate_scene_uuid(scene_metadata)
     return scene_metadata
 
+def canonical_merch_refs(scene_metadata: Dict[str, Any], merch_catalog: Optional[MerchCatalog] = None) -> List[str]:
+    # With a catalog: O(ref length) lookups against the run-wide catalog, unknown refs dropped and logged
+    if merch_catalog is None:
+        return enforce_canonical_merch_refs(scene_metadata)
+    refs, unknown, prefixed = merch_catalog.canonicalize_refs(scene_metadata.get("merch_refs") or [])
+    if prefixed:
+        logging.warning(f"Merch refs matched by prefix only for scene_uuid {scene_metadata.get('scene_uuid')}: {prefixed}")
+    if unknown:
+        logging.warning(f"Unknown merch refs for scene_uuid {scene_metadata.get('scene_uuid')}: {unknown}")
+    return refs
+
 def safe_generate_scene_uuid(scene_metadata: Dict[str, Any]) -> str:
     scene_uuid = scene_metadata.get("scene_uuid")
     try:
@@ -87,19 +107,30 @@ def assign_beat_uuids_stable(beat_list: List[Dict[str, Any]], scene_metadata: Di
         seen_uuids.add(beat["beat_uuid"])
     logging.info(f"Assigned {len(beat_list)} beat UUIDs.")
 
+def _word_chunks(scene_text: str, chunk_size: int) -> List[str]:
+    words = scene_text.split()
+    return [" ".join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size)]
+
+def _chunk_keyword_rows(scene_text: str, chunk_size: int) -> List[List[int]]:
+    # One row of KEYWORDS counts per synthetic chunk
+    return [[lowered.count(kw) for kw in KEYWORDS]
+            for lowered in map(str.lower, _word_chunks(scene_text, chunk_size))]
+
 def compute_micro_beats_adaptive(scene_text: str, beat_list: Optional[List[Dict[str, Any]]] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Dict[str, Any]]:
     micro_beats = []
+    cache = get_analysis_cache()
     if beat_list:
+        version = lexicon_version(KEYWORDS)
         for beat in beat_list:
             text = beat.get("text", "")
-            counts = {kw: text.lower().count(kw) for kw in KEYWORDS}
+            counts = dict(cache.get_or_compute("keyword_counts", text, version, keyword_counts))
             micro_beats.append({"beat_uuid": beat.get("beat_uuid"), "text": text, "keyword_counts": counts})
     else:
-        words = scene_text.split()
-        for i in range(0, len(words), chunk_size):
-            chunk = " ".join(words[i:i + chunk_size])
-            counts = {kw: chunk.lower().count(kw) for kw in KEYWORDS}
-            micro_beats.append({"beat_uuid": f"synthetic_{i//chunk_size}", "text": chunk, "keyword_counts": counts})
+        # Synthetic chunks take microseconds each to count, so the cache holds one entry per scene text
+        rows = cache.get_or_compute("chunk_keyword_counts", scene_text, lexicon_version(KEYWORDS, chunk_size),
+                                    lambda text: _chunk_keyword_rows(text, chunk_size))
+        for i, (chunk, row) in enumerate(zip(_word_chunks(scene_text, chunk_size), rows)):
+            micro_beats.append({"beat_uuid": f"synthetic_{i}", "text": chunk, "keyword_counts": dict(zip(KEYWORDS, row))})
     logging.info(f"Computed {len(micro_beats)} micro-beats.")
     return micro_beats
 
@@ -152,6 +183,10 @@ def propagate_inflection_points_across_chunks(scene_record: Dict[str, Any], prev
             seen.add(p)
     return continuity_points
 
+def propagate_inflection_points_book(scene_records: List[Dict[str, Any]], window: int = 1) -> Dict[str, List[str]]:
+    # One linear pass over a whole book/series in scene order; scene_uuid -> continuity points
+    return {record["scene_uuid"]: points for record, points in iter_continuity_inflections(scene_records, window)}
+
 def package_scene_record(scene_text: str, scene_metadata: Dict[str, Any], arcs: Dict[str, Any], beats: List[Dict[str, Any]]) -> Dict[str, Any]:
     core_id = f"{scene_metadata.get('book_code','UNK')}_P{scene_metadata.get('part','1')}_E{scene_metadata.get('episode','1')}_S{scene_metadata.get('scene','1')}"
     return {
@@ -216,70 +251,252 @@ def update_continuity_arcs(scene_record: Dict[str, Any], pf: Dict[str, Any], chu
     log_continuity_map(scene_record)
     return scene_record
 
+def analysis_inputs(scene_text: str, scene_metadata: Dict[str, Any], beat_list: List[Dict[str, Any]],
+                    arc_thresholds: Optional[Dict[str, float]]) -> str:
+    return chunk_fingerprint(scene_text=scene_text, scene_metadata=scene_metadata,
+                             beat_list=beat_list, arc_thresholds=arc_thresholds)
+
+def pipeline_chunk_fingerprint(chunk_index: int, scene_text: str, scene_metadata: Dict[str, Any],
+                               beat_list: List[Dict[str, Any]], arc_thresholds: Optional[Dict[str, float]],
+                               previous_scene_record: Optional[Dict[str, Any]],
+                               next_scene_record: Optional[Dict[str, Any]]) -> str:
+    # Everything a chunk's checkpointed output depends on
+    return chunk_fingerprint(
+        chunk_index=chunk_index, scene_text=scene_text, scene_metadata=scene_metadata,
+        beat_list=beat_list, arc_thresholds=arc_thresholds,
+        previous=(previous_scene_record or {}).get("inflection_points"),
+        next=(next_scene_record or {}).get("inflection_points"),
+    )
+
+def validate_chunk_record(scene_record: Dict[str, Any], chunk_index: int, inputs: str, last: Dict[str, str]):
+    # last: state carried between chunks of one run. When the analysis inputs match the
+    # last validated chunk's, only the continuity fields are re-checked
+    dirty = CONTINUITY_FIELDS if last.get("inputs") == inputs else None
+    try:
+        validate_scene_record(scene_record, SCHEMA_PATH, dirty=dirty)
+    except validation_error_type() as e:
+        logging.error(f"Schema validation failed for chunk {chunk_index}: {e}")
+        raise
+    last["inputs"] = inputs
+
 # -----------------------
 # Full Pipeline
 # -----------------------
 def pipeline_full(passfile_path: str = str(PASSFILE_PATH), chunk_range: range = range(0, 16),
                   previous_scene_record: Optional[Dict[str, Any]] = None,
                   next_scene_record: Optional[Dict[str, Any]] = None,
-                  arc_thresholds: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+                  arc_thresholds: Optional[Dict[str, float]] = None,
+                  passfile: Optional[Dict[str, Any]] = None,
+                  persist: bool = True,
+                  resume: bool = False,
+                  merch_catalog: Optional[MerchCatalog] = None) -> Dict[str, Any]:
+    # passfile: already-loaded passfile to process in place (skips the read)
+    # persist=False leaves writing to the caller (e.g. the daemon's write-behind flush)
+    # resume=True skips leading chunks whose checkpointed input fingerprints still match
+    # merch_catalog: shared canonical catalog used instead of per-scene canonicalization
+    # (defaults to the installed catalog at MERCH_CATALOG_PATH, if any)
+
+    if merch_catalog is None:
+        merch_catalog = default_merch_catalog()
+    pf = passfile if passfile is not None else read_passfile(passfile_path)
+    # Marketing copy is written behind by the sink's thread, off the per-chunk path
+    marketing_sink = get_marketing_sink(passfile_path)
+    previous_checkpoint = load_checkpoint(pf) if resume else None
+    checkpoint = deepcopy(previous_checkpoint) if previous_checkpoint else new_checkpoint()
+    resuming = previous_checkpoint is not None
+    last_validated: Dict[str, str] = {}
+
+    for chunk_index in trace_iter(chunk_range, "pipeline.chunk", lambda i: {"chunk_index": i}):
+        logging.info(f"Processing chunk {chunk_index}...")
+        with memory_stage("pipeline.ingest"), trace_span("pipeline.ingest"):
+            scene_text = pf.get("scene_text", "")
+            scene_metadata = pf.get("scene_metadata", {})
+
+            # Normalize & audit
+            scene_metadata = normalize_scene_metadata(scene_metadata)
+            pf["scene_metadata"] = scene_metadata
+            scene_metadata["merch_refs"] = canonical_merch_refs(scene_metadata, merch_catalog)
+
+            pf.setdefault("beat_list", [])
+            assign_beat_uuids_stable(pf["beat_list"], scene_metadata)
+
+        # Resume: later chunks read earlier ones' continuity, so only a leading run can be skipped
+        fingerprint = pipeline_chunk_fingerprint(chunk_index, scene_text, scene_metadata, pf["beat_list"],
+                                                 arc_thresholds, previous_scene_record, next_scene_record)
+        if resuming:
+            entry = committed_entry(previous_checkpoint, chunk_index, fingerprint)
+            if entry is not None:
+                pf.setdefault(f"chunk_{chunk_index}", continuity_stub(entry))
+                logging.info(f"Chunk {chunk_index} unchanged since checkpoint; skipped.")
+                continue
+            logging.info(f"Resuming at chunk {chunk_index}.")
+            resuming = False
+
+        with memory_stage("pipeline.analyze"), trace_span("pipeline.analyze"):
+            micro_beats = compute_micro_beats_adaptive(scene_text, pf["beat_list"])
+            arcs = compute_arcs_adaptive(micro_beats, thresholds=arc_thresholds)
+            inflection_points = identify_inflection_points_weighted(micro_beats)
+
+            scene_record = package_scene_record(scene_text, scene_metadata, arcs, pf["beat_list"])
+            scene_record["micro_beats"] = micro_beats
+            scene_record["inflection_points"] = propagate_inflection_points_across_chunks(
+                {"inflection_points": inflection_points}, previous_scene_record, next_scene_record
+            )
 
-    pf = read_passfile(passfile_path)
+        # Merch & Trinity
+        with memory_stage("pipeline.advise"), trace_span("pipeline.advise"):
+            merch_evidence = extract_merch_evidence(scene_metadata)
+            scene_record = merge_scene_sections(scene_record, {"merch_evidence": merch_evidence})
+            scene_record = insert_trinity_advisory(scene_record)
+            marketing_sink.save(scene_metadata["scene_uuid"], merch_evidence)
 
-    for chunk_index in chunk_range:
-        logging.info(f"Processing chunk {chunk_index}...")
-        scene_text = pf.get("scene_text", "")
-        scene_metadata = pf.get("scene_metadata", {})
+        # Continuity
+        with memory_stage("pipeline.validate"), trace_span("pipeline.validate"):
+            scene_record = update_continuity_arcs(scene_record, pf, chunk_index)
 
-        # Normalize & audit
-        scene_metadata = normalize_scene_metadata(scene_metadata)
-        pf["scene_metadata"] = scene_metadata
-        scene_metadata["merch_refs"] = enforce_canonical_merch_refs(scene_metadata)
+            # Schema validation
+            inputs = analysis_inputs(scene_text, scene_metadata, pf["beat_list"], arc_thresholds)
+            validate_chunk_record(scene_record, chunk_index, inputs, last_validated)
+
+        # Update passfile; the checkpoint is committed in the same write as the chunk
+        with memory_stage("pipeline.persist"), trace_span("pipeline.persist"):
+            pf[f"chunk_{chunk_index}"] = scene_record
+            pf["scene_record"] = scene_record
+            pf[CHECKPOINT_KEY] = record_chunk(checkpoint, chunk_index, fingerprint, scene_record)
+            if persist:
+                update_passfile_scenes({scene_record["scene_uuid"]: scene_record, CHECKPOINT_KEY: checkpoint}, passfile_path)
+
+        # Merch verification
+        verify_merch_refs_across_chunks(pf, scene_metadata)
+        logging.info(f"Chunk {chunk_index} processed successfully for scene_uuid {scene_metadata['scene_uuid']}")
+
+    marketing_sink.flush()
+    get_analysis_cache().flush()
+    return pf
 
+# -----------------------
+# Staged Pipeline
+# -----------------------
+def pipeline_full_staged(passfile_path: str = str(PASSFILE_PATH), chunk_range: range = range(0, 16),
+                         previous_scene_record: Optional[Dict[str, Any]] = None,
+                         next_scene_record: Optional[Dict[str, Any]] = None,
+                         arc_thresholds: Optional[Dict[str, float]] = None,
+                         passfile: Optional[Dict[str, Any]] = None,
+                         persist: bool = True,
+                         analyze_workers: int = 2,
+                         queue_size: int = DEFAULT_QUEUE_SIZE,
+                         merch_catalog: Optional[MerchCatalog] = None,
+                         resume: bool = False) -> Dict[str, Any]:
+    """
+    pipeline_full as five stages connected by bounded queues:
+    ingest -> analyze -> advise -> validate -> persist.
+    analyze/advise run with several workers; ingest, validate (which owns the
+    continuity arcs and the in-memory passfile) and persist see chunks in order,
+    so the passfile ends up exactly as pipeline_full leaves it. persist commits
+    each chunk's checkpoint in the same write as the chunk, and resume=True
+    skips the same leading chunks pipeline_full would.
+    """
+    if merch_catalog is None:
+        merch_catalog = default_merch_catalog()
+    pf = passfile if passfile is not None else read_passfile(passfile_path)
+    marketing_sink = get_marketing_sink(passfile_path)
+    last_validated: Dict[str, str] = {}
+    previous_checkpoint = load_checkpoint(pf) if resume else None
+    checkpoint = deepcopy(previous_checkpoint) if previous_checkpoint else new_checkpoint()
+    resuming = previous_checkpoint is not None
+
+    def ingest(chunk_index: int) -> Dict[str, Any]:
+        nonlocal resuming
+        logging.info(f"Processing chunk {chunk_index}...")
+        scene_metadata = normalize_scene_metadata(pf.get("scene_metadata", {}))
+        pf["scene_metadata"] = scene_metadata
+        scene_metadata["merch_refs"] = canonical_merch_refs(scene_metadata, merch_catalog)
         pf.setdefault("beat_list", [])
         assign_beat_uuids_stable(pf["beat_list"], scene_metadata)
-
-        micro_beats = compute_micro_beats_adaptive(scene_text, pf["beat_list"])
+        scene_text = pf.get("scene_text", "")
+        fingerprint = pipeline_chunk_fingerprint(chunk_index, scene_text, scene_metadata, pf["beat_list"],
+                                                 arc_thresholds, previous_scene_record, next_scene_record)
+        # Resume: as in pipeline_full, only a leading run of unchanged chunks is skipped
+        if resuming:
+            entry = committed_entry(previous_checkpoint, chunk_index, fingerprint)
+            if entry is not None:
+                return {"chunk_index": chunk_index, "skipped": entry}
+            logging.info(f"Resuming at chunk {chunk_index}.")
+            resuming = False
+        # Downstream stages work on a snapshot so later chunks can't change it underneath them
+        return {"chunk_index": chunk_index, "scene_text": scene_text,
+                "scene_metadata": deepcopy(scene_metadata), "beat_list": deepcopy(pf["beat_list"]),
+                "inputs": analysis_inputs(scene_text, scene_metadata, pf["beat_list"], arc_thresholds),
+                "fingerprint": fingerprint}
+
+    def analyze(item: Dict[str, Any]) -> Dict[str, Any]:
+        if "skipped" in item:
+            return item
+        micro_beats = compute_micro_beats_adaptive(item["scene_text"], item["beat_list"])
         arcs = compute_arcs_adaptive(micro_beats, thresholds=arc_thresholds)
         inflection_points = identify_inflection_points_weighted(micro_beats)
-
-        scene_record = package_scene_record(scene_text, scene_metadata, arcs, pf["beat_list"])
+        scene_record = package_scene_record(item["scene_text"], item["scene_metadata"], arcs, item["beat_list"])
         scene_record["micro_beats"] = micro_beats
         scene_record["inflection_points"] = propagate_inflection_points_across_chunks(
             {"inflection_points": inflection_points}, previous_scene_record, next_scene_record
         )
-
-        # Merch & Trinity
-        merch_evidence = extract_merch_evidence(scene_metadata)
-        scene_record = merge_scene_sections(scene_record, {"merch_evidence": merch_evidence})
-        scene_record = insert_trinity_advisory(scene_record)
-        save_marketing_copy(scene_metadata["scene_uuid"], merch_evidence, passfile_path)
-
-        # Continuity
-        scene_record = update_continuity_arcs(scene_record, pf, chunk_index)
-
-        # Schema validation
-        try:
-            with open(SCHEMA_PATH) as f:
-                schema = json.load(f)
-            jsonschema_validate(instance=scene_record, schema=schema)
-        except ValidationError as e:
-            logging.error(f"Schema validation failed for chunk {chunk_index}: {e}")
-            raise
-
-        # Update passfile
+        item["scene_record"] = scene_record
+        return item
+
+    def advise(item: Dict[str, Any]) -> Dict[str, Any]:
+        if "skipped" in item:
+            return item
+        item["merch_evidence"] = extract_merch_evidence(item["scene_metadata"])
+        scene_record = merge_scene_sections(item["scene_record"], {"merch_evidence": item["merch_evidence"]})
+        item["scene_record"] = insert_trinity_advisory(scene_record)
+        return item
+
+    def validate(item: Dict[str, Any]) -> Dict[str, Any]:
+        chunk_index = item["chunk_index"]
+        if "skipped" in item:
+            pf.setdefault(f"chunk_{chunk_index}", continuity_stub(item["skipped"]))
+            return item
+        scene_record = update_continuity_arcs(item["scene_record"], pf, chunk_index)
+        validate_chunk_record(scene_record, chunk_index, item["inputs"], last_validated)
         pf[f"chunk_{chunk_index}"] = scene_record
         pf["scene_record"] = scene_record
-        update_passfile_scene_record(passfile_path, scene_record)
-
-        # Merch verification
+        return item
+
+    def persist_chunk(item: Dict[str, Any]) -> int:
+        if "skipped" in item:
+            logging.info(f"Chunk {item['chunk_index']} unchanged since checkpoint; skipped.")
+            return item["chunk_index"]
+        scene_metadata, scene_record = item["scene_metadata"], item["scene_record"]
+        marketing_sink.save(scene_metadata["scene_uuid"], item["merch_evidence"])
+        # The checkpoint is committed in the same write as the chunk
+        pf[CHECKPOINT_KEY] = record_chunk(checkpoint, item["chunk_index"], item["fingerprint"], scene_record)
+        if persist:
+            update_passfile_scenes({scene_record["scene_uuid"]: scene_record, CHECKPOINT_KEY: checkpoint}, passfile_path)
         verify_merch_refs_across_chunks(pf, scene_metadata)
-        logging.info(f"Chunk {chunk_index} processed successfully for scene_uuid {scene_metadata['scene_uuid']}")
-
+        logging.info(f"Chunk {item['chunk_index']} processed successfully for scene_uuid {scene_metadata['scene_uuid']}")
+        return item["chunk_index"]
+
+    executor = StagedExecutor([
+        Stage("ingest", ingest, ordered=True),
+        Stage("analyze", analyze, workers=analyze_workers),
+        Stage("advise", advise, workers=analyze_workers),
+        Stage("validate", validate, ordered=True),
+        Stage("persist", persist_chunk, ordered=True),
+    ], queue_size=queue_size)
+    executor.run(chunk_range)
+    marketing_sink.flush()
+    get_analysis_cache().flush()
+    logging.info("Stage busy time: " + ", ".join(
+        f"{name}={stats['busy_s']:.3f}s" for name, stats in executor.stats.items()) + f"; wall={executor.wall_s:.3f}s")
     return pf
 
 # -----------------------
 # Execution
 # -----------------------
 if __name__ == "__main__":
-    updated_passfile = pipeline_full()
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    memory_report = os.environ.get(MEMORY_REPORT_ENV)
+    trace_report = os.environ.get(TRACE_REPORT_ENV)
+    with memory_profiling(memory_report) if memory_report else nullcontext(), \
+            tracing(trace_report) if trace_report else nullcontext():
+        updated_passfile = pipeline_full()
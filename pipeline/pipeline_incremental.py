@@ -0,0 +1,300 @@
+# ================================
+# pipeline_incremental.py — Incremental re-analysis of scene_text edits
+# Keeps per-micro-beat state for one scene so an edit only recounts the
+# word chunks it touched, relabels the rolling erotic-arc window and the
+# inflection points around them, and patches the scene record in place.
+# Results match a full pipeline_full analysis of the new text.
+# ================================
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from workflow_utils import insert_trinity_advisory
+from workflow_utils_cache import get_analysis_cache, lexicon_version
+from workflow_utils_keywords import (
+    KEYWORDS, DEFAULT_CHUNK_SIZE, DEFAULT_ARC_THRESHOLDS, ROLLING_AVG_WINDOW, keyword_counts
+)
+from pipeline_sweep import rolling_means
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+KeywordCounter = Callable[[str], Dict[str, int]]
+
+
+def _beat_id(k: int) -> str:
+    return f"synthetic_{k}"
+
+def pipeline_keyword_counts(text: str) -> Dict[str, int]:
+    """pipeline_full's keyword counts, through the same analysis cache entries."""
+    return get_analysis_cache().get_or_compute("keyword_counts", text, lexicon_version(KEYWORDS), keyword_counts)
+
+
+# -----------------------
+# Word-level diff
+# -----------------------
+def _common_prefix(a: List[str], b: List[str]) -> int:
+    # Binary search over C-level slice comparisons instead of a Python loop per word
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def _common_suffix(a: List[str], b: List[str], limit: int) -> int:
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:len(a) - lo] == b[len(b) - mid:len(b) - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+# -----------------------
+# Scene state
+# -----------------------
+class IncrementalSceneAnalysis:
+    """
+    Analysis state for a scene analysed from scene_text alone (synthetic
+    micro-beats of chunk_size words; scenes with a beat_list take their
+    micro-beats from the beats, which text edits don't touch).
+    edit(new_text) costs O(words changed + beats whose index shifts): beats
+    before the edit are untouched and, when the word count changes by a
+    multiple of chunk_size, so are the recount-free beats after it.
+    Otherwise the chunks after the edit are re-cut but not recounted: with
+    additive=True (a chunk's keyword_counts is the sum over its words, as
+    keyword substring counts are) each distinct word is counted once, and
+    chunk counts, normalized counts and erotic labels are memoized by the
+    keyword hits / window values they depend on.
+    """
+
+    def __init__(self, scene_record: Dict[str, Any], keyword_counts: KeywordCounter = pipeline_keyword_counts,
+                 thresholds: Optional[Dict[str, float]] = None,
+                 rolling_window: int = ROLLING_AVG_WINDOW,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 previous_scene_record: Optional[Dict[str, Any]] = None,
+                 next_scene_record: Optional[Dict[str, Any]] = None,
+                 additive: bool = True):
+        self.record = scene_record
+        self.keyword_counts = keyword_counts
+        self.additive = additive
+        self._zero: Optional[Dict[str, int]] = None
+        self._word_counts: Dict[str, Tuple[Tuple[str, int], ...]] = {}
+        self._chunk_counts: Dict[Tuple[Any, ...], Tuple[Dict[str, int], Dict[str, float]]] = {}
+        self._labels: Dict[Tuple[float, ...], str] = {}
+        self.thresholds = thresholds or DEFAULT_ARC_THRESHOLDS
+        self.rolling_window = rolling_window
+        self.chunk_size = chunk_size
+        self.previous_points = list((previous_scene_record or {}).get("inflection_points", []))
+        self.next_points = list((next_scene_record or {}).get("inflection_points", []))
+        self.words: List[str] = (scene_record.get("scene_text") or "").split()
+        self.micro_beats: List[Dict[str, Any]] = []
+        self.erotic: List[float] = []
+        self.points: List[int] = []
+
+    @classmethod
+    def analyze(cls, scene_record: Dict[str, Any], **options: Any) -> "IncrementalSceneAnalysis":
+        """Full analysis of scene_record["scene_text"]; writes every derived field."""
+        state = cls(scene_record, **options)
+        sections = scene_record.setdefault("sections", {})
+        for field in ("emotional_arc", "erotic_arc", "pacing_strategy_notes"):
+            sections[field] = {}
+        state._splice(0, 0, len(state._chunks(state.words)), state.words)
+        return state
+
+    @classmethod
+    def from_record(cls, scene_record: Dict[str, Any], **options: Any) -> "IncrementalSceneAnalysis":
+        """
+        Adopt a record pipeline_full already analysed (its micro_beats and arcs)
+        without recounting; falls back to analyze() if they don't match its text.
+        """
+        state = cls(scene_record, **options)
+        micro_beats = scene_record.get("micro_beats")
+        emotional = scene_record.get("sections", {}).get("emotional_arc", {})
+        if (not isinstance(micro_beats, list) or len(micro_beats) != len(state._chunks(state.words))
+                or any(mb.get("beat_uuid") != _beat_id(k) for k, mb in enumerate(micro_beats))):
+            return cls.analyze(scene_record, **options)
+        state.micro_beats = micro_beats
+        state.erotic = [emotional.get(mb["beat_uuid"], {}).get("erotic", 0) for mb in micro_beats]
+        state.points = state._points(0, len(micro_beats))
+        return state
+
+    # -----------------------
+    # Per-beat analysis (same rules as pipeline_full)
+    # -----------------------
+    def _chunks(self, words: List[str]) -> List[int]:
+        return list(range(0, len(words), self.chunk_size))
+
+    def _word_hits(self, word: str) -> Tuple[Tuple[str, int], ...]:
+        # Nonzero keyword counts of one word; most words have none
+        hits = self._word_counts.get(word)
+        if hits is None:
+            counts = self.keyword_counts(word)
+            if self._zero is None:
+                self._zero = dict.fromkeys(counts, 0)
+            hits = self._word_counts[word] = tuple((key, n) for key, n in counts.items() if n)
+        return hits
+
+    def _count_chunk(self, chunk: List[str], text: str) -> Tuple[Dict[str, int], Dict[str, float]]:
+        """(keyword counts, normalized emotional counts) of one chunk, memoized by its words' hits."""
+        if self.additive:
+            key = tuple(map(self._word_hits, chunk))
+            memo = self._chunk_counts.get(key)
+            if memo is not None:
+                return memo
+            counts = dict(self._zero)
+            for hits in key:
+                for word_key, n in hits:
+                    counts[word_key] += n
+        else:
+            counts = dict(self.keyword_counts(text))
+        total = sum(counts.values()) or 1
+        memo = (counts, {word_key: v / total for word_key, v in counts.items()})
+        if self.additive:
+            self._chunk_counts[key] = memo
+        return memo
+
+    def _beats(self, lo: int, hi: int, words: List[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, float]], List[str]]:
+        """Micro-beats [lo, hi) of words with their normalized emotional counts and pacing notes."""
+        cs, fast = self.chunk_size, self.thresholds["fast_pacing_word_count"]
+        chunks = [words[i:i + cs] for i in range(lo * cs, hi * cs, cs)]
+        texts = list(map(" ".join, chunks))
+        if self.additive:
+            # Chunks whose words' hits were seen before resolve without a Python call per word
+            word_hits = self._word_counts.get
+            memos = list(map(self._chunk_counts.get, [tuple(map(word_hits, chunk)) for chunk in chunks]))
+            memos = [memo or self._count_chunk(chunk, text) for memo, chunk, text in zip(memos, chunks, texts)]
+        else:
+            memos = list(map(self._count_chunk, chunks, texts))
+        beats = [{"beat_uuid": _beat_id(k), "text": text, "keyword_counts": dict(counts)}
+                 for k, text, (counts, _) in zip(range(lo, hi), texts, memos)]
+        emotional = [dict(normalized) for _, normalized in memos]
+        pacing = ["fast" if len(chunk) > fast else "steady" for chunk in chunks]
+        return beats, emotional, pacing
+
+    def _erotic_labels(self, lo: int, hi: int) -> List[str]:
+        # A label depends only on the window of erotic values ending at its beat, so
+        # labels are memoized per window; rolling_means is statistics.mean bit for bit
+        w, erotic = self.rolling_window, self.erotic
+        start = min(max(lo, w - 1), hi)
+        windows = [tuple(erotic[max(0, i - w + 1):i + 1]) for i in range(lo, start)]
+        windows += zip(*(erotic[start - w + 1 + j:hi - w + 1 + j] for j in range(w)))
+        labels = list(map(self._labels.get, windows))
+        for i, label in enumerate(labels):
+            if label is None:
+                mean = rolling_means(windows[i], w)[-1]
+                labels[i] = self._labels[windows[i]] = "peak" if mean > self.thresholds["erotic_peak"] else "build"
+        return labels
+
+    def _points(self, lo: int, hi: int) -> List[int]:
+        """Inflection points among beats [lo, hi): erotic * 2 + tension, plus the previous beat's erotic, above 1."""
+        start = max(lo - 1, 0)
+        counts = [b["keyword_counts"] for b in self.micro_beats[start:hi]]
+        erotic = [c.get("erotic", 0) for c in counts]
+        scores = [e * 2 + c.get("tension", 0) for e, c in zip(erotic, counts)]
+        if lo > 0:
+            scores, previous = scores[1:], erotic[:-1]
+        else:
+            previous = [0] + erotic[:-1]
+        return [k for k, score, prev in zip(range(lo, hi), scores, previous) if score + prev > 1]
+
+    # -----------------------
+    # Patching
+    # -----------------------
+    def _splice(self, lo: int, hi_old: int, hi_new: int, words: List[str]) -> None:
+        """Replace beats [lo, hi_old) with freshly counted beats [lo, hi_new) of words; later beats shift."""
+        shift = hi_new - hi_old
+        sections = self.record["sections"]
+        emotional, erotic_arc, pacing = (sections["emotional_arc"], sections["erotic_arc"],
+                                         sections["pacing_strategy_notes"])
+        new_beats, new_emotional, new_pacing = self._beats(lo, hi_new, words)
+        tail = self.micro_beats[hi_old:] if shift else []
+        tail_ids = [b["beat_uuid"] for b in tail]
+        tail_emotional = list(map(emotional.get, tail_ids))
+        tail_labels = list(map(erotic_arc.get, tail_ids))
+        tail_pacing = list(map(pacing.get, tail_ids))
+
+        # Arc dicts are keyed by beat_uuid in beat order: when ids shift, drop everything from lo and re-add in order
+        if shift:
+            dropped = [b["beat_uuid"] for b in self.micro_beats[lo:hi_old]] + tail_ids
+            for d in (emotional, erotic_arc, pacing):
+                for beat_id in dropped:
+                    d.pop(beat_id, None)
+
+        self.micro_beats[lo:hi_old] = new_beats
+        self.erotic[lo:hi_old] = [normalized.get("erotic", 0) for normalized in new_emotional]
+        # Shifted beats keep their counts and arcs under their new index
+        for k, beat in enumerate(tail, hi_new):
+            beat["beat_uuid"] = _beat_id(k)
+        ids = [b["beat_uuid"] for b in self.micro_beats[lo:]] if shift else [b["beat_uuid"] for b in new_beats]
+
+        # Rolling window: a beat's label reads the rolling_window - 1 beats before it
+        relabel_end = min(len(self.micro_beats), hi_new + self.rolling_window - 1)
+        labels = self._erotic_labels(lo, relabel_end)
+        emotional.update(zip(ids, new_emotional + tail_emotional))
+        pacing.update(zip(ids, new_pacing + tail_pacing))
+        if shift:
+            erotic_arc.update(zip(ids, labels + tail_labels[len(labels) - len(new_beats):]))
+        else:
+            erotic_arc.update(zip(map(_beat_id, range(lo, relabel_end)), labels))
+
+        # Inflection points read the beat before, so one beat past the edit can change
+        window_end = min(len(self.micro_beats), hi_new + 1)
+        kept_before = [p for p in self.points if p < lo]
+        kept_after = [p + shift for p in self.points if p >= hi_old + 1 and p + shift >= window_end]
+        self.points = kept_before + self._points(lo, window_end) + kept_after
+        self.words = words
+
+        self.record["micro_beats"] = self.micro_beats
+        self.record["inflection_points"] = self._continuity_points()
+
+    def _continuity_points(self) -> List[str]:
+        # propagate_inflection_points_across_chunks: previous + own + next, first occurrence wins
+        if not self.previous_points and not self.next_points:
+            return [_beat_id(k) for k in self.points]
+        seen = set()
+        points = []
+        for p in self.previous_points + [_beat_id(k) for k in self.points] + self.next_points:
+            if p not in seen:
+                seen.add(p)
+                points.append(p)
+        return points
+
+    def edit(self, new_text: str) -> Dict[str, Any]:
+        """
+        Re-analyse after scene_text changed to new_text; patches the record in
+        place (micro_beats, arcs, pacing, inflection points, scene_text, trinity
+        advisory). Returns what was recomputed.
+        """
+        old_words, new_words = self.words, new_text.split()
+        prefix = _common_prefix(old_words, new_words)
+        suffix = _common_suffix(old_words, new_words, min(len(old_words), len(new_words)) - prefix)
+        cs = self.chunk_size
+        n_old, n_new = len(self._chunks(old_words)), len(self._chunks(new_words))
+        lo = prefix // cs
+        delta = len(new_words) - len(old_words)
+        if delta % cs == 0:
+            # Chunk alignment survives: chunks lying wholly in the common suffix are unchanged
+            hi_new = max(lo, min(n_new, -(-(len(new_words) - suffix) // cs)))
+            hi_old = hi_new - delta // cs
+        else:
+            # Every later chunk is re-cut; their counts come from the memoized word hits
+            hi_new, hi_old = n_new, n_old
+        if old_words != new_words:
+            self._splice(lo, hi_old, hi_new, new_words)
+
+        self.record["scene_text"] = new_text
+        # The advisory only ever adds cues, and cues in unchanged text are already in it
+        changed_words = new_words[prefix:len(new_words) - suffix]
+        if changed_words:
+            view = dict(self.record, scene_text=" ".join(changed_words))
+            insert_trinity_advisory(view)
+        logger.debug(f"Re-analysed beats {lo}..{hi_new} of {n_new} for {self.record.get('scene_uuid')}")
+        return {"recounted": list(range(lo, hi_new)), "shift": hi_new - hi_old, "beats": n_new}
@@ -0,0 +1,212 @@
+# ================================
+# pipeline_stages.py — Bounded-queue staged executor
+# Stages run on their own worker threads, connected by bounded queues (backpressure)
+# Ordered stages see items in submission order even behind multi-worker stages
+# Optional process pool per stage for CPU-bound work
+# Per-item spans (worker processes included) when a tracer is installed
+# ================================
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from workflow_utils_tracing import get_tracer, run_traced, trace_span
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+DEFAULT_QUEUE_SIZE = 8
+_DONE = object()
+
+
+# -----------------------
+# Stage definition
+# -----------------------
+class Stage:
+    """
+    One step of a staged pipeline.
+    - fn(item) -> item passed downstream
+    - workers: parallel workers for this stage (threads, or pool processes if processes=True)
+    - ordered: fn sees items in submission order; forced to a single worker
+    - processes: run fn in a ProcessPoolExecutor (fn and items must be picklable)
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int = 1,
+                 ordered: bool = False, processes: bool = False):
+        if workers < 1:
+            raise ValueError(f"Stage {name!r} needs at least one worker")
+        if ordered and workers > 1:
+            raise ValueError(f"Ordered stage {name!r} must have a single worker")
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.ordered = ordered
+        self.processes = processes
+
+
+class StageFailed(RuntimeError):
+    def __init__(self, stage: str, seq: int, error: BaseException):
+        super().__init__(f"Stage {stage!r} failed on item {seq}: {error}")
+        self.stage = stage
+        self.seq = seq
+        self.error = error
+
+
+# -----------------------
+# Executor
+# -----------------------
+class StagedExecutor:
+    """
+    Runs items through stages concurrently. Each stage reads from a bounded
+    queue, so a slow stage blocks its producers instead of buffering unboundedly;
+    wall-clock time approaches the slowest stage rather than the sum of stages.
+    The first failure stops the pipeline and is re-raised from run() as StageFailed.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = DEFAULT_QUEUE_SIZE):
+        if not stages:
+            raise ValueError("StagedExecutor needs at least one stage")
+        self.stages = stages
+        self.queue_size = queue_size
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self.wall_s = 0.0
+        self._error: Optional[StageFailed] = None
+        self._abort = threading.Event()
+
+    # -----------------------
+    # Queue helpers (abort-aware so a failure never leaves a thread blocked)
+    # -----------------------
+    def _put(self, q: "queue.Queue", item: Any) -> bool:
+        while not self._abort.is_set():
+            try:
+                q.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: "queue.Queue") -> Any:
+        while not self._abort.is_set():
+            try:
+                return q.get(timeout=0.05)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fail(self, stage: str, seq: int, error: BaseException) -> None:
+        if self._error is None:
+            self._error = StageFailed(stage, seq, error)
+            logger.error(str(self._error))
+        self._abort.set()
+
+    # -----------------------
+    # Stage workers
+    # -----------------------
+    def _run_stage(self, stage: Stage, inbox: "queue.Queue", outbox: "queue.Queue", downstream_workers: int,
+                   pool: Optional[ProcessPoolExecutor], remaining: List[int], lock: threading.Lock) -> None:
+        stats = self.stats[stage.name]
+        tracer = get_tracer()
+        pending: Dict[int, Any] = {}
+        next_seq = 0
+        while True:
+            msg = self._get(inbox)
+            if msg is _DONE:
+                break
+            batch: List[Tuple[int, Any]]
+            if stage.ordered:
+                # Reorder buffer: upstream multi-worker stages may finish out of order
+                pending[msg[0]] = msg[1]
+                batch = []
+                while next_seq in pending:
+                    batch.append((next_seq, pending.pop(next_seq)))
+                    next_seq += 1
+            else:
+                batch = [msg]
+            for seq, item in batch:
+                start = time.perf_counter()
+                try:
+                    if pool and tracer:
+                        # Worker-process spans come back with the result
+                        result, events = pool.submit(run_traced, stage.fn, item, stage.name, {"seq": seq}).result()
+                        tracer.add_events(events)
+                    elif pool:
+                        result = pool.submit(stage.fn, item).result()
+                    else:
+                        with trace_span(stage.name, seq=seq):
+                            result = stage.fn(item)
+                except BaseException as e:
+                    self._fail(stage.name, seq, e)
+                    return
+                with lock:
+                    stats["busy_s"] += time.perf_counter() - start
+                    stats["items"] += 1
+                if not self._put(outbox, (seq, result)):
+                    return
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            # One end marker per downstream worker
+            for _ in range(downstream_workers):
+                self._put(outbox, _DONE)
+
+    def _feed(self, items: Iterable[Any], inbox: "queue.Queue") -> None:
+        try:
+            for seq, item in enumerate(items):
+                if not self._put(inbox, (seq, item)):
+                    return
+        except BaseException as e:
+            self._fail("source", -1, e)
+            return
+        for _ in range(self.stages[0].workers):
+            self._put(inbox, _DONE)
+
+    def run(self, items: Iterable[Any]) -> List[Any]:
+        """Push items through every stage; returns the final stage's results in submission order."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads: List[threading.Thread] = []
+        pools: List[ProcessPoolExecutor] = []
+        self.stats = {s.name: {"busy_s": 0.0, "items": 0} for s in self.stages}
+        self._error = None
+        self._abort.clear()
+        started = time.perf_counter()
+
+        for i, stage in enumerate(self.stages):
+            pool = ProcessPoolExecutor(max_workers=stage.workers) if stage.processes else None
+            if pool:
+                pools.append(pool)
+            downstream = self.stages[i + 1].workers if i + 1 < len(self.stages) else 1
+            remaining, lock = [stage.workers], threading.Lock()
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._run_stage, name=f"stage-{stage.name}", daemon=True,
+                    args=(stage, queues[i], queues[i + 1], downstream, pool, remaining, lock)))
+        threads.append(threading.Thread(target=self._feed, args=(items, queues[0]), name="stage-feeder", daemon=True))
+        for t in threads:
+            t.start()
+
+        results: Dict[int, Any] = {}
+        try:
+            while True:
+                msg = self._get(queues[-1])
+                if msg is _DONE:
+                    break
+                results[msg[0]] = msg[1]
+        except BaseException:
+            self._abort.set()
+            raise
+        finally:
+            for t in threads:
+                t.join()
+            for pool in pools:
+                pool.shutdown()
+
+        self.wall_s = time.perf_counter() - started
+        if self._error is not None:
+            raise self._error
+        return [results[k] for k in sorted(results)]
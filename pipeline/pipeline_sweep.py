@@ -0,0 +1,166 @@
+# ================================
+# pipeline_sweep.py — Arc threshold / window sweeps
+# Labels for a whole grid of settings in one pass over precomputed counts
+# - compute_arcs_adaptive: erotic_peak x rolling window, fast_pacing_word_count
+# - compute_arcs: dominance / emotion / erotic thresholds, chunk / rolling normalization
+# ================================
+
+import json
+import logging
+import sys
+from bisect import bisect_right
+from typing import Dict, Any, Iterable, List, Sequence
+
+from workflow_utils import arc_counts_for, read_passfile
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+# Every finite float is an integer multiple of 2**-1074
+_EXACT_SCALE_BITS = 1074
+ARC_DIMENSIONS = ("dominance", "emotion", "erotic")
+
+DEFAULT_SWEEP_GRID = {
+    "erotic_peak": [0.1, 0.2, 0.3, 0.4, 0.5],
+    "rolling_window": [1, 2, 3, 5, 8],
+    "fast_pacing_word_count": [10, 20, 30, 40, 60],
+}
+
+
+# -----------------------
+# Helpers
+# -----------------------
+def _exact(x: float) -> int:
+    num, den = x.as_integer_ratio()
+    return num << (_EXACT_SCALE_BITS - den.bit_length() + 1)
+
+def rolling_means(values: Sequence[float], window: int) -> List[float]:
+    """
+    The trailing-window means compute_arcs_adaptive takes with statistics.mean,
+    bit for bit: exact integer prefix sums, one correctly rounded division each.
+    """
+    if window < 1:
+        raise ValueError(f"rolling window must be >= 1, got {window}")
+    prefix = [0]
+    for v in values:
+        prefix.append(prefix[-1] + _exact(v))
+    scale = 1 << _EXACT_SCALE_BITS
+    means = []
+    for i in range(len(values)):
+        lo = max(0, i - window + 1)
+        means.append((prefix[i + 1] - prefix[lo]) / (scale * (i + 1 - lo)))
+    return means
+
+def _count_above(sorted_values: Sequence[float], thresholds: Iterable[float]) -> List[int]:
+    # Labels use a strict ">" so count everything right of the threshold
+    n = len(sorted_values)
+    return [n - bisect_right(sorted_values, t) for t in thresholds]
+
+
+# -----------------------
+# compute_arcs_adaptive sweep
+# -----------------------
+def sweep_arcs_adaptive(micro_beat_lists: Iterable[List[Dict[str, Any]]],
+                        erotic_peaks: Sequence[float] = DEFAULT_SWEEP_GRID["erotic_peak"],
+                        rolling_windows: Sequence[int] = DEFAULT_SWEEP_GRID["rolling_window"],
+                        fast_pacing_word_counts: Sequence[int] = DEFAULT_SWEEP_GRID["fast_pacing_word_count"]) -> Dict[str, Any]:
+    """
+    Label distributions compute_arcs_adaptive would produce for every setting,
+    summed over all scenes (each list of micro-beats is one scene; rolling
+    windows never cross scenes).
+    Pacing depends only on fast_pacing_word_count, so it is reported on its own
+    axis rather than repeated for every (erotic_peak, rolling_window) pair.
+    """
+    erotic_values: List[List[float]] = []
+    word_counts: List[int] = []
+    for micro_beats in micro_beat_lists:
+        scene_values = []
+        for beat in micro_beats:
+            counts = beat["keyword_counts"]
+            total = sum(counts.values()) or 1
+            scene_values.append(counts.get("erotic", 0) / total)
+            word_counts.append(len(beat["text"].split()))
+        erotic_values.append(scene_values)
+
+    n = len(word_counts)
+    erotic_arc = []
+    for window in rolling_windows:
+        smoothed = sorted(v for scene_values in erotic_values for v in rolling_means(scene_values, window))
+        for threshold, peaks in zip(erotic_peaks, _count_above(smoothed, erotic_peaks)):
+            erotic_arc.append({"rolling_window": window, "erotic_peak": threshold, "peak": peaks, "build": n - peaks})
+
+    word_counts.sort()
+    pacing = [
+        {"fast_pacing_word_count": threshold, "fast": fast, "steady": n - fast}
+        for threshold, fast in zip(fast_pacing_word_counts, _count_above(word_counts, fast_pacing_word_counts))
+    ]
+    return {"scenes": len(erotic_values), "beats": n, "erotic_arc": erotic_arc, "pacing_strategy_notes": pacing}
+
+
+# -----------------------
+# compute_arcs sweep
+# -----------------------
+def sweep_arcs(beat_lists: Iterable[List[Dict[str, Any]]],
+               thresholds: Dict[str, Sequence[float]],
+               normalize_across: Sequence[str] = ("chunk", "rolling")) -> Dict[str, Any]:
+    """
+    "high" label counts compute_arcs would produce for each threshold, per
+    dimension (dominance / emotion / erotic) and normalization mode.
+    Dimensions are labelled independently, so each has its own threshold axis.
+    """
+    normed: Dict[str, Dict[str, List[float]]] = {mode: {d: [] for d in ARC_DIMENSIONS} for mode in normalize_across}
+    n_beats, n_scenes = 0, 0
+    for beats in beat_lists:
+        counts = arc_counts_for(beats)
+        n = max(1, len(beats))
+        totals = [sum(c[k] for c in counts) for k in range(3)]
+        for mode in normalize_across:
+            if mode not in ("chunk", "rolling"):
+                raise ValueError(f"Unknown normalize_across {mode!r}; expected 'chunk' or 'rolling'")
+            for k, dim in enumerate(ARC_DIMENSIONS):
+                denom = max(1, totals[k]) if mode == "rolling" else n
+                normed[mode][dim].extend(c[k] / denom for c in counts)
+        n_beats += len(beats)
+        n_scenes += 1
+
+    summary: Dict[str, Any] = {"scenes": n_scenes, "beats": n_beats}
+    for mode in normalize_across:
+        per_dim = {}
+        for dim in ARC_DIMENSIONS:
+            grid = list(thresholds.get(dim, ()))
+            values = sorted(normed[mode][dim])
+            per_dim[dim] = [
+                {"threshold": t, "high": high, "low": n_beats - high}
+                for t, high in zip(grid, _count_above(values, grid))
+            ]
+        summary[mode] = per_dim
+    return summary
+
+
+# -----------------------
+# Passfile helpers
+# -----------------------
+def scene_records(passfile: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Scene records in a passfile: dict entries that carry micro_beats or beats."""
+    return [v for v in passfile.values() if isinstance(v, dict) and ("micro_beats" in v or "beats" in v)]
+
+def sweep_passfile(passfile_path: str) -> Dict[str, Any]:
+    records = scene_records(read_passfile(passfile_path))
+    return {
+        "arcs_adaptive": sweep_arcs_adaptive(
+            [r["micro_beats"] for r in records if r.get("micro_beats")]),
+        "arcs": sweep_arcs(
+            [r["beats"] for r in records if r.get("beats")],
+            {dim: [0.1, 0.25, 0.5, 0.75] for dim in ARC_DIMENSIONS}),
+    }
+
+
+# -----------------------
+# Execution
+# -----------------------
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    path = sys.argv[1] if len(sys.argv) > 1 else "passfile.json"
+    print(json.dumps(sweep_passfile(path), indent=2))
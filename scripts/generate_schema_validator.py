@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# scripts/generate_schema_validator.py
+"""
+Generate a specialized validator for data/schema_passfile.json:
+- workflow/workflow_utils_schema_compiled.py
+
+The generated module has straight-line checks for the schema's keywords:
+- is_valid(instance) -> bool, a fast path with no jsonschema import
+- iter_errors(instance) -> jsonschema ValidationErrors, the same ones
+  Draft7Validator(schema).iter_errors yields
+- validate(instance), which raises best_match(iter_errors(instance)) like
+  jsonschema.validate does
+- is_valid_part / iter_part_errors(instance, part): the same checks split into
+  the record's own keywords (part=None) and one top-level property's subtree
+
+Like jsonschema.validate, "format" is annotation-only (no format checker).
+
+A schema using any other keyword is refused with a ValueError at generation
+time. The previously generated module then no longer matches the schema's
+fingerprint, so get_schema_validator falls back to jsonschema.
+
+Run from the repo root, with workflow/ on the path like the other modules:
+    PYTHONPATH=workflow python -m scripts.generate_schema_validator
+"""
+
+import json
+import pprint
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from workflow_utils_schema import SCHEMA_PATH, schema_fingerprint
+
+# --- Config ---
+OUTPUT_PATH = Path(__file__).resolve().parent.parent / "workflow" / "workflow_utils_schema_compiled.py"
+
+# Keywords with no validation effect for Draft 7 without a format checker
+ANNOTATION_KEYWORDS = {"$schema", "$id", "title", "description", "default", "examples", "$comment", "format"}
+SUPPORTED_KEYWORDS = {"type", "required", "properties", "additionalProperties", "items"}
+
+TYPE_CHECKS = {
+    "string": "isinstance({v}, str)",
+    "object": "isinstance({v}, dict)",
+    "array": "isinstance({v}, list)",
+    "boolean": "isinstance({v}, bool)",
+    "null": "{v} is None",
+    "number": "(isinstance({v}, _Number) and not isinstance({v}, bool))",
+    "integer": "_is_integer({v})",
+}
+
+
+# --- Helpers ---
+def _where(schema_path: Tuple[Any, ...]) -> str:
+    return "schema" + "".join(f"[{p!r}]" for p in schema_path)
+
+def _type_list(types: Any) -> List[str]:
+    return [types] if isinstance(types, str) else list(types)
+
+def _type_expr(types: Any, var: str) -> str:
+    # Types are checked against TYPE_CHECKS before anything is emitted
+    checks = [TYPE_CHECKS[t].format(v=var) for t in _type_list(types)]
+    return checks[0] if len(checks) == 1 else "(" + " or ".join(checks) + ")"
+
+def _leaf_check(schema: Dict[str, Any], var: str) -> Any:
+    """Inline expression for subschemas that only constrain the type, else None."""
+    effective = set(schema) - ANNOTATION_KEYWORDS
+    if not effective:
+        return "True"
+    if effective == {"type"}:
+        return _type_expr(schema["type"], var)
+    return None
+
+def _guarded(guard: Any, lines: List[str]) -> List[str]:
+    if guard is None:
+        return lines
+    return [f"if {guard}:"] + ["    " + line for line in lines]
+
+
+class _Generator:
+    """Walks the schema once, emitting a boolean checker and an error iterator per subschema."""
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self.lines: List[str] = []
+        self.subschemas: List[Tuple[str, Tuple[Any, ...]]] = []
+        self.count = 0
+        self.root_children: Dict[Tuple[Any, ...], int] = {}
+
+    def _new_id(self, schema_path: Tuple[Any, ...]) -> int:
+        node_id = self.count
+        self.count += 1
+        expr = "SCHEMA" + "".join(f"[{p!r}]" for p in schema_path)
+        self.subschemas.append((f"_S{node_id}", expr))
+        return node_id
+
+    @staticmethod
+    def _check_keywords(schema: Dict[str, Any], schema_path: Tuple[Any, ...]) -> None:
+        # Refuse to generate rather than emit a validator that would disagree with jsonschema
+        where = _where(schema_path)
+        for k in schema:
+            if k not in SUPPORTED_KEYWORDS and k not in ANNOTATION_KEYWORDS:
+                raise ValueError(f"Unsupported schema keyword {k!r} at {where}")
+        for t in _type_list(schema.get("type", [])):
+            if t not in TYPE_CHECKS:
+                raise ValueError(f"Unsupported type {t!r} at {where}")
+        if "items" in schema and not isinstance(schema["items"], dict):
+            raise ValueError(f"Only single-schema 'items' is supported (at {where})")
+        if not isinstance(schema.get("additionalProperties", True), (bool, dict)):
+            raise ValueError(f"additionalProperties must be a boolean or a schema (at {where})")
+
+    def emit(self, schema: Dict[str, Any], schema_path: Tuple[Any, ...]) -> int:
+        """Emit _valid_N and _errors_N for one subschema; returns N."""
+        self._check_keywords(schema, schema_path)
+        node_id = self._new_id(schema_path)
+        children: Dict[Tuple[Any, ...], int] = {}
+        for key, sub in (schema.get("properties") or {}).items():
+            children[("properties", key)] = self.emit(sub, schema_path + ("properties", key))
+        if isinstance(schema.get("additionalProperties"), dict):
+            children[("additionalProperties",)] = self.emit(schema["additionalProperties"], schema_path + ("additionalProperties",))
+        if "items" in schema:
+            children[("items",)] = self.emit(schema["items"], schema_path + ("items",))
+        if _leaf_check(schema, "inst") is None:
+            self._emit_valid(node_id, schema, children)
+        self._emit_errors(node_id, schema, schema_path, children)
+        if not schema_path:
+            self.root_children = children
+        return node_id
+
+    def emit_parts(self, schema: Dict[str, Any]) -> None:
+        """Root checks without descending into properties, plus checker tables per top-level property."""
+        self._emit_valid(0, schema, self.root_children, name="_valid_shell", descend=False)
+        self._emit_errors(0, schema, (), self.root_children, name="_errors_shell", descend=False)
+        valid, errors = [], []
+        for key, sub in (schema.get("properties") or {}).items():
+            child = self.root_children[("properties", key)]
+            leaf = _leaf_check(sub, "inst")
+            valid.append(f"    {key!r}: " + (f"_valid_{child}" if leaf is None else f"lambda inst: {leaf}") + ",")
+            errors.append(f"    {key!r}: _errors_{child},")
+        self.lines += ["_PART_VALID = {", *valid, "}", "", "_PART_ERRORS = {", *errors, "}", ""]
+
+    # --- boolean fast path ---
+    @staticmethod
+    def _child_check(schema: Dict[str, Any], child_id: int, var: str) -> str:
+        leaf = _leaf_check(schema, var)
+        return leaf if leaf is not None else f"_valid_{child_id}({var})"
+
+    def _emit_valid(self, node_id: int, schema: Dict[str, Any], children: Dict[Tuple[Any, ...], int],
+                    name: str = "", descend: bool = True) -> None:
+        out = self.lines
+        out.append(f"def {name or f'_valid_{node_id}'}(inst):")
+        body = []
+        # Any failure means invalid, so the type check can go first and make
+        # the per-keyword instance checks redundant.
+        if "type" in schema:
+            body.append(f"if not {_type_expr(schema['type'], 'inst')}: return False")
+        declared = _type_list(schema.get("type", []))
+        obj_guard = None if declared == ["object"] else "isinstance(inst, dict)"
+        arr_guard = None if declared == ["array"] else "isinstance(inst, list)"
+        for k, v in schema.items():
+            if k == "required" and v:
+                missing = " or ".join(f"{p!r} not in inst" for p in v)
+                body += _guarded(obj_guard, [f"if {missing}: return False"])
+            elif k == "properties" and descend:
+                lines = []
+                for key, sub in v.items():
+                    check = self._child_check(sub, children[("properties", key)], f"inst[{key!r}]")
+                    if check != "True":
+                        lines.append(f"if {key!r} in inst and not {check}: return False")
+                body += _guarded(obj_guard, lines)
+            elif k == "additionalProperties":
+                known = tuple((schema.get("properties") or {}).keys())
+                if v is False:
+                    cond = f"any(p not in {known!r} for p in inst)" if known else "len(inst) > 0"
+                    body += _guarded(obj_guard, [f"if {cond}: return False"])
+                elif isinstance(v, dict):
+                    check = self._child_check(v, children[("additionalProperties",)], "value")
+                    extras = f"(inst[p] for p in inst if p not in {known!r})" if known else "inst.values()"
+                    body += _guarded(obj_guard, [
+                        f"for value in {extras}:",
+                        f"    if not {check}: return False",
+                    ])
+            elif k == "items":
+                check = self._child_check(v, children[("items",)], "item")
+                body += _guarded(arr_guard, [
+                    "for item in inst:",
+                    f"    if not {check}: return False",
+                ])
+        body.append("return True")
+        out.extend("    " + line for line in body)
+        out.append("")
+
+    # --- error path ---
+    def _emit_errors(self, node_id: int, schema: Dict[str, Any], schema_path: Tuple[Any, ...],
+                     children: Dict[Tuple[Any, ...], int], name: str = "", descend: bool = True) -> None:
+        out = self.lines
+        sub = f"_S{node_id}"
+        out.append(f"def {name or f'_errors_{node_id}'}(inst, path):")
+        body = []
+        for k, v in schema.items():
+            spath = schema_path + (k,)
+            if k == "type":
+                reprs = ", ".join(repr(t) for t in _type_list(v))
+                body.append(f"if not {_type_expr(v, 'inst')}:")
+                body.append(f"    yield (f\"{{inst!r}} is not of type \" + {reprs!r}, 'type', path, {spath!r}, inst, {sub})")
+            elif k == "required":
+                body.append(f"if isinstance(inst, dict):")
+                body.append(f"    for p in {sub}['required']:")
+                body.append(f"        if p not in inst:")
+                body.append(f"            yield (f\"{{p!r}} is a required property\", 'required', path, {spath!r}, inst, {sub})")
+            elif k == "properties" and descend:
+                body.append(f"if isinstance(inst, dict):")
+                for key in v:
+                    child = children[("properties", key)]
+                    body.append(f"    if {key!r} in inst:")
+                    body.append(f"        yield from _errors_{child}(inst[{key!r}], path + ({key!r},))")
+            elif k == "additionalProperties":
+                known = tuple((schema.get("properties") or {}).keys())
+                body.append(f"if isinstance(inst, dict):")
+                body.append(f"    extras = set(p for p in inst if p not in {known!r})")
+                if v is False:
+                    body.append(f"    if extras:")
+                    body.append(f"        extras = sorted(extras, key=str)")
+                    body.append(f"        msg = 'Additional properties are not allowed (%s %s unexpected)' % (")
+                    body.append(f"            ', '.join(repr(e) for e in extras), 'was' if len(extras) == 1 else 'were')")
+                    body.append(f"        yield (msg, 'additionalProperties', path, {spath!r}, inst, {sub})")
+                elif isinstance(v, dict):
+                    child = children[("additionalProperties",)]
+                    body.append(f"    for p in extras:")
+                    body.append(f"        yield from _errors_{child}(inst[p], path + (p,))")
+            elif k == "items":
+                child = children[("items",)]
+                body.append(f"if isinstance(inst, list):")
+                body.append(f"    for i, item in enumerate(inst):")
+                body.append(f"        yield from _errors_{child}(item, path + (i,))")
+        if not body:
+            body.append("return")
+        body.append("yield from ()")
+        out.extend("    " + line for line in body)
+        out.append("")
+
+
+def generate_validator_source(schema: Dict[str, Any], fingerprint: str) -> str:
+    gen = _Generator(schema)
+    gen.emit(schema, ())
+    gen.emit_parts(schema)
+    header = [
+        "# workflow_utils_schema_compiled.py",
+        "# -----------------------",
+        "# GENERATED by scripts/generate_schema_validator.py -- do not edit by hand",
+        f"# Source schema: {schema.get('title', '')}",
+        "# -----------------------",
+        "from numbers import Number as _Number",
+        "",
+        f"SCHEMA_FINGERPRINT = {fingerprint!r}",
+        "SCHEMA = " + pprint.pformat(schema, indent=1, width=100, sort_dicts=False),
+        "",
+    ]
+    header += [f"{name} = {expr}" for name, expr in gen.subschemas]
+    header += [
+        "",
+        "def _is_integer(v):",
+        "    if isinstance(v, bool): return False",
+        "    if isinstance(v, float): return v.is_integer()",
+        "    return isinstance(v, int)",
+        "",
+    ]
+    footer = [
+        "# -----------------------",
+        "# Public API",
+        "# -----------------------",
+        "PARTS = tuple(_PART_VALID)",
+        "",
+        "def is_valid(instance):",
+        "    return _valid_0(instance)",
+        "",
+        "def _validation_errors(raw):",
+        "    from jsonschema.exceptions import ValidationError",
+        "    from jsonschema.validators import Draft7Validator",
+        "    for message, keyword, path, schema_path, inst, subschema in raw:",
+        "        yield ValidationError(",
+        "            message,",
+        "            validator=keyword,",
+        "            path=path,",
+        "            validator_value=subschema[keyword],",
+        "            instance=inst,",
+        "            schema=subschema,",
+        "            schema_path=schema_path,",
+        "            type_checker=Draft7Validator.TYPE_CHECKER,",
+        "        )",
+        "",
+        "def iter_errors(instance):",
+        "    return _validation_errors(_errors_0(instance, ()))",
+        "",
+        "def is_valid_part(instance, part=None):",
+        "    # part=None: the record's own type / required / additionalProperties checks",
+        "    if part is None:",
+        "        return _valid_shell(instance)",
+        "    return not isinstance(instance, dict) or part not in instance or _PART_VALID[part](instance[part])",
+        "",
+        "def iter_part_errors(instance, part=None):",
+        "    if part is None:",
+        "        return _validation_errors(_errors_shell(instance, ()))",
+        "    if not isinstance(instance, dict) or part not in instance:",
+        "        return iter(())",
+        "    return _validation_errors(_PART_ERRORS[part](instance[part], (part,)))",
+        "",
+        "def validate(instance):",
+        "    if _valid_0(instance):",
+        "        return",
+        "    from jsonschema.exceptions import best_match",
+        "    error = best_match(iter_errors(instance))",
+        "    if error is not None:",
+        "        raise error",
+        "",
+    ]
+    return "\n".join(header + gen.lines + footer)
+
+
+def main() -> None:
+    raw = SCHEMA_PATH.read_bytes()
+    source = generate_validator_source(json.loads(raw), schema_fingerprint(raw))
+    OUTPUT_PATH.write_text(source, encoding="utf-8")
+    print(f"Wrote specialized validator to {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
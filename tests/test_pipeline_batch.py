@@ -0,0 +1,80 @@
+# tests/test_pipeline_batch.py
+import json
+import os
+import time
+
+from pipeline_batch import count_scenes, load_manifest, run_batch, schedule_longest_first
+from workflow_utils import write_passfile
+from workflow_utils_sketches import BeatStatistics
+from workflow_utils_tracing import tracing
+
+SCENE_UUID = "0f8e6c1a-1d2b-5c3d-8e4f-123456789abc"
+
+
+def fake_book(entry):
+    if entry["book"] == "broken":
+        raise ValueError("bad passfile")
+    started = time.time()
+    time.sleep(0.01 * entry["scenes"])
+    return {"started": started}
+
+
+def book_with_stats(entry):
+    stats = BeatStatistics()
+    stats.add_micro_beats([{"beat_uuid": "b0", "text": "erotic gaze now",
+                            "keyword_counts": {"erotic": 1, "gaze": entry["scenes"]}}])
+    return {"beat_stats": stats.to_dict()}
+
+
+def test_manifest_and_scene_counts(tmp_path):
+    passfile = tmp_path / "book_a.json"
+    write_passfile({SCENE_UUID: {"scene_uuid": SCENE_UUID}, "chunk_0": {}, "chunk_1": {},
+                    "scene_text": "x", "beat_list": []}, str(passfile))
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps([str(passfile), {"passfile": "missing.json", "book": "B", "scenes": 9}]))
+    entries = load_manifest(manifest)
+    assert entries[0]["book"] == "book_a" and entries[0]["chunk_range"] == [0, 16]
+    assert count_scenes(passfile) == 3
+    assert count_scenes(tmp_path / "missing.json") == 0
+    assert [e["book"] for e in schedule_longest_first(entries)] == ["B", "book_a"]
+
+
+def test_longest_first_results_in_manifest_order():
+    manifest = [{"passfile": f"{n}.json", "book": f"b{n}", "scenes": n} for n in (1, 5, 3, 8)]
+    batch = run_batch(manifest, workers=1, job=fake_book)
+    results = batch["results"]
+    assert [r["book"] for r in results] == ["b1", "b5", "b3", "b8"]
+    started = sorted(results, key=lambda r: r["started"])
+    assert [r["scenes"] for r in started] == [8, 5, 3, 1]
+    summary = batch["summary"]
+    assert summary["books"] == 4 and summary["ok"] == 4 and summary["scenes"] == 17
+    assert summary["workers"] == 1 and summary["slowest_book"] == "b8"
+    assert all(r["worker"] != os.getpid() for r in results)
+
+
+def test_failures_reported_per_book():
+    manifest = [{"passfile": "a.json", "book": "broken", "scenes": 1},
+                {"passfile": "b.json", "book": "fine", "scenes": 2}]
+    batch = run_batch(manifest, workers=2, job=fake_book)
+    broken, fine = batch["results"]
+    assert broken["status"] == "error" and "bad passfile" in broken["error"]
+    assert fine["status"] == "ok"
+    assert batch["summary"]["failed"] == 1 and batch["summary"]["scenes"] == 2
+
+
+def test_book_spans_collected_from_workers():
+    with tracing() as tracer:
+        run_batch([{"passfile": "a.json", "scenes": 1}, {"passfile": "b.json", "scenes": 1}],
+                  workers=2, job=fake_book)
+    books = [e for e in tracer.trace_events() if e["name"] == "book"]
+    assert sorted(e["args"]["book"] for e in books) == ["a", "b"]
+    assert all(e["pid"] != os.getpid() for e in books)
+
+
+def test_beat_statistics_merged_across_books():
+    manifest = [{"passfile": f"{n}.json", "scenes": n} for n in (1, 2, 3)]
+    batch = run_batch(manifest, workers=2, job=book_with_stats)
+    stats = batch["beat_statistics"]
+    assert stats["beats"] == 3
+    assert dict(map(tuple, stats["top"]["keyword"])) == {"gaze": 6, "erotic": 3}
+    assert all("beat_stats" not in r for r in batch["results"])
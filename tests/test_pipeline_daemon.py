@@ -0,0 +1,190 @@
+# tests/test_pipeline_daemon.py
+import json
+import threading
+import time
+
+import pytest
+
+from pipeline_daemon import PipelineDaemon, _Request, submit
+from workflow_utils import update_passfile_scenes
+
+
+def make_chunk(scene, text="original", beat="beat-1", flags=None):
+    return {
+        "scene_metadata": {"book_code": "TESTBOOK", "part": "1", "episode": "1", "scene": scene},
+        "scene_text": text,
+        "beats": [{"beat_uuid": beat, "snippet": text}],
+        "micro_beats": [{"beat_uuid": beat, "text": text, "keyword_counts": {}}],
+        "refs": {"flag_refs": flags or []},
+        "sections": {"connected_completion_arcs": []},
+    }
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    d = PipelineDaemon(socket_path=tmp_path / "d.sock", flush_interval=3600).start()
+    yield d
+    d.stop()
+
+
+def test_merge_submissions_are_held_in_memory_until_flush(daemon, tmp_path):
+    pf_path = tmp_path / "passfile.json"
+    sock = daemon.socket_path
+    r1 = submit({"op": "merge_chunks", "passfile": str(pf_path), "chunks": [make_chunk("1", flags=["a"])]}, sock)
+    r2 = submit({"op": "merge_chunks", "passfile": str(pf_path), "chunks": [make_chunk("1", beat="beat-2", flags=["b"])]}, sock)
+    assert r1["ok"] and r2["ok"]
+    assert not pf_path.exists()
+
+    assert submit({"op": "flush"}, sock)["flushed"] == 1
+    data = json.loads(pf_path.read_text())
+    (scene,) = data.values()
+    assert {b["beat_uuid"] for b in scene["beats"]} == {"beat-1", "beat-2"}
+    assert scene["refs"]["flag_refs"] == ["a", "b"]
+
+
+def test_get_scene_and_stats(daemon, tmp_path):
+    pf_path = str(tmp_path / "passfile.json")
+    submit({"op": "merge_chunks", "passfile": pf_path, "chunks": [make_chunk("2")]}, daemon.socket_path)
+    (scene_uuid,) = daemon.passfiles[str((tmp_path / "passfile.json").resolve())].keys()
+    got = submit({"op": "get_scene", "passfile": pf_path, "key": scene_uuid}, daemon.socket_path)
+    assert got["scene"]["scene_text"] == "original"
+    stats = submit({"op": "stats"}, daemon.socket_path)
+    assert stats["dirty"] == 1 and stats["passfiles"] == 1
+
+
+def test_query_index_follows_merges(daemon, tmp_path):
+    pf_path = str(tmp_path / "passfile.json")
+    submit({"op": "merge_chunks", "passfile": pf_path, "chunks": [make_chunk("4", flags=["a"])]}, daemon.socket_path)
+    assert len(submit({"op": "query", "passfile": pf_path, "query": "flag_ref:a"}, daemon.socket_path)["hits"]) == 1
+    submit({"op": "merge_chunks", "passfile": pf_path, "chunks": [make_chunk("5", flags=["b"])]}, daemon.socket_path)
+    hits = submit({"op": "query", "passfile": pf_path, "query": "flag_ref:a OR flag_ref:b", "level": "beat"},
+                  daemon.socket_path)["hits"]
+    assert len(hits) == 2
+
+
+def test_stop_flushes_pending_writes(tmp_path):
+    pf_path = tmp_path / "passfile.json"
+    d = PipelineDaemon(socket_path=tmp_path / "d.sock", flush_interval=3600).start()
+    submit({"op": "merge_chunks", "passfile": str(pf_path), "chunks": [make_chunk("3")]}, d.socket_path)
+    d.stop()
+    assert len(json.loads(pf_path.read_text())) == 1
+
+
+def test_errors_are_reported(daemon):
+    assert not submit({"op": "nope"}, daemon.socket_path)["ok"]
+    assert not submit({"op": "merge_chunks", "chunks": []}, daemon.socket_path)["ok"]
+
+
+def apply(daemon, *payloads):
+    reqs = [_Request(p) for p in payloads]
+    daemon._apply_batch(reqs)
+    return [r.response for r in reqs]
+
+
+def test_force_overwrite_applies_only_to_its_own_request(tmp_path):
+    pf_path = str(tmp_path / "passfile.json")
+    d = PipelineDaemon(socket_path=tmp_path / "d.sock")
+    apply(d, {"op": "merge_chunks", "passfile": pf_path, "chunks": [make_chunk("1"), make_chunk("2")]})
+    (uuid1, uuid2) = sorted(d.passfiles[str((tmp_path / "passfile.json").resolve())])
+    scenes = d.passfiles[str((tmp_path / "passfile.json").resolve())]
+    apply(d,
+          {"op": "merge_chunks", "passfile": pf_path, "chunks": [make_chunk("1", text="new")],
+           "force_overwrite_text_for": [uuid1, uuid2]},
+          {"op": "merge_chunks", "passfile": pf_path, "chunks": [make_chunk("2", text="new")]})
+    texts = {s["scene_metadata"]["scene"]: s["scene_text"] for s in scenes.values()}
+    assert texts == {"1": "new", "2": "original"}
+
+
+def test_failed_request_is_rolled_back_alone(tmp_path):
+    pf_path = str(tmp_path / "passfile.json")
+    d = PipelineDaemon(socket_path=tmp_path / "d.sock")
+    apply(d, {"op": "merge_chunks", "passfile": pf_path, "chunks": [make_chunk("1", flags=["a"])]})
+    d.flush()
+    scenes = d.passfiles[str((tmp_path / "passfile.json").resolve())]
+    before = json.loads(json.dumps(scenes))
+    bad = make_chunk("1", flags=["b"])
+    bad["micro_beats"] = [{"text": "no uuid"}]  # fails after beats and refs were merged
+    ok, failed, ok2 = apply(d,
+                            {"op": "merge_chunks", "passfile": pf_path, "chunks": [make_chunk("2")]},
+                            {"op": "merge_chunks", "passfile": pf_path, "chunks": [bad]},
+                            {"op": "merge_chunks", "passfile": pf_path, "chunks": [make_chunk("3")]})
+    assert ok["ok"] and ok2["ok"] and not failed["ok"]
+    assert len(scenes) == 3
+    (uuid1,) = before
+    assert scenes[uuid1] == before[uuid1]
+
+
+def test_flush_keeps_scenes_written_by_other_writers(tmp_path):
+    pf_path = tmp_path / "passfile.json"
+    d = PipelineDaemon(socket_path=tmp_path / "d.sock")
+    apply(d, {"op": "merge_chunks", "passfile": str(pf_path), "chunks": [make_chunk("1")]})
+    update_passfile_scenes({"other-writer": {"scene_text": "x"}}, pf_path)
+    assert d.flush() == 1
+    data = json.loads(pf_path.read_text())
+    assert "other-writer" in data and len(data) == 2
+
+
+def test_worker_replies_when_batch_crashes(tmp_path, monkeypatch):
+    d = PipelineDaemon(socket_path=tmp_path / "d.sock", flush_interval=3600).start()
+    try:
+        monkeypatch.setattr(d, "_apply_batch", lambda batch: 1 / 0)
+        r = submit({"op": "merge_chunks", "passfile": str(tmp_path / "p.json"), "chunks": []}, d.socket_path, timeout=5)
+        assert not r["ok"]
+    finally:
+        d.stop()
+
+
+def _in_thread(fn, *args):
+    result = {}
+    t = threading.Thread(target=lambda: result.setdefault("value", fn(*args)), daemon=True)
+    t.start()
+    return t, result
+
+
+def test_stop_while_request_in_flight(tmp_path, monkeypatch):
+    d = PipelineDaemon(socket_path=tmp_path / "d.sock", flush_interval=3600).start()
+    entered, release = threading.Event(), threading.Event()
+    merge = d._merge
+
+    def blocking_merge(path, payload):
+        entered.set()
+        release.wait(5)
+        return merge(path, payload)
+
+    monkeypatch.setattr(d, "_merge", blocking_merge)
+    request = {"op": "merge_chunks", "passfile": str(tmp_path / "p.json"), "chunks": [make_chunk("1")]}
+    handler, response = _in_thread(d.handle, request)
+    assert entered.wait(5)
+    stopper, _ = _in_thread(d.stop)
+    while not d._stop.is_set():
+        time.sleep(0.01)
+    assert d.handle(dict(request)) == {"ok": False, "error": "daemon is shutting down"}
+    release.set()
+    handler.join(5)
+    stopper.join(10)
+    assert not handler.is_alive() and not stopper.is_alive()
+    assert response["value"]["ok"]
+    assert json.loads((tmp_path / "p.json").read_text())
+
+
+def test_stop_cannot_slip_between_check_and_enqueue(tmp_path):
+    d = PipelineDaemon(socket_path=tmp_path / "d.sock", flush_interval=3600).start()
+    put = d._queue.put
+    stoppers, sentinel_posted = [], threading.Event()
+
+    def put_after_stop_starts(item, *args, **kwargs):
+        if item is None:
+            sentinel_posted.set()
+        elif not stoppers:
+            stoppers.append(_in_thread(d.stop)[0])
+            # Without the submit lock stop() posts its sentinel (and the worker exits) in here
+            sentinel_posted.wait(1)
+        put(item, *args, **kwargs)
+
+    d._queue.put = put_after_stop_starts
+    handler, response = _in_thread(d.handle, {"op": "merge_chunks", "passfile": str(tmp_path / "p.json"),
+                                              "chunks": [make_chunk("1")]})
+    handler.join(5)
+    assert not handler.is_alive()
+    assert response["value"]["ok"]
+    stoppers[0].join(10)
@@ -0,0 +1,90 @@
+# tests/test_pipeline_stages.py
+import random
+import threading
+import time
+
+import pytest
+
+from pipeline_stages import Stage, StagedExecutor, StageFailed
+
+
+def square(x):
+    return x * x
+
+
+def test_results_in_submission_order_through_parallel_stage():
+    rng = random.Random(0)
+
+    def jitter(x):
+        time.sleep(rng.random() / 500)
+        return x
+
+    seen = []
+    executor = StagedExecutor([
+        Stage("jitter", jitter, workers=4),
+        Stage("ordered", lambda x: seen.append(x) or x, ordered=True),
+        Stage("more-jitter", jitter, workers=3),
+    ], queue_size=2)
+    assert executor.run(range(50)) == list(range(50))
+    assert seen == list(range(50))
+    assert executor.stats["jitter"]["items"] == 50
+
+
+def test_stages_overlap():
+    def slow(x):
+        time.sleep(0.02)
+        return x
+
+    executor = StagedExecutor([Stage(name, slow) for name in ("a", "b", "c")])
+    executor.run(range(10))
+    # Sequential would be 3 stages x 10 items x 20 ms = 600 ms
+    assert executor.wall_s < 0.45
+
+
+def test_bounded_queues_apply_backpressure():
+    produced = []
+    release = threading.Event()
+
+    def source():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    def blocked(x):
+        release.wait()
+        return x
+
+    executor = StagedExecutor([Stage("blocked", blocked)], queue_size=2)
+    runner = threading.Thread(target=lambda: executor.run(source()))
+    runner.start()
+    time.sleep(0.2)
+    # One item in the stage, two queued, one waiting in the feeder's put
+    assert len(produced) <= 5
+    release.set()
+    runner.join()
+    assert len(produced) == 100
+
+
+def test_failure_stops_pipeline_and_is_reraised():
+    def boom(x):
+        if x == 7:
+            raise ValueError("bad chunk")
+        return x
+
+    executor = StagedExecutor([Stage("ok", lambda x: x, workers=2), Stage("boom", boom, ordered=True)], queue_size=1)
+    with pytest.raises(StageFailed) as info:
+        executor.run(range(1000))
+    assert info.value.stage == "boom" and info.value.seq == 7
+    assert isinstance(info.value.error, ValueError)
+
+
+def test_process_stage():
+    executor = StagedExecutor([Stage("square", square, workers=2, processes=True)])
+    assert executor.run(range(6)) == [0, 1, 4, 9, 16, 25]
+
+
+def test_invalid_stage_configuration():
+    with pytest.raises(ValueError):
+        Stage("x", square, workers=2, ordered=True)
+    with pytest.raises(ValueError):
+        StagedExecutor([])
@@ -0,0 +1,80 @@
+# tests/test_pipeline_sweep.py
+import random
+from statistics import mean
+
+from workflow_utils import compute_arcs
+from pipeline_sweep import rolling_means, sweep_arcs, sweep_arcs_adaptive
+
+KEYWORDS = ["dominance", "submission", "tension", "release", "erotic", "gaze", "posture", "voice", "control"]
+
+
+def random_micro_beats(rng, n):
+    beats = []
+    for i in range(n):
+        counts = {kw: rng.choice([0, 0, 1, 2, 3]) for kw in KEYWORDS}
+        beats.append({"beat_uuid": f"mb-{i}", "text": " ".join(["w"] * rng.randint(1, 60)), "keyword_counts": counts})
+    return beats
+
+
+def reference_adaptive_labels(micro_beats, erotic_peak, window, fast_words):
+    # Same arithmetic as pipeline_full.compute_arcs_adaptive
+    erotic_values, pacing = [], []
+    for beat in micro_beats:
+        counts = beat["keyword_counts"]
+        total = sum(counts.values()) or 1
+        erotic_values.append(counts.get("erotic", 0) / total)
+        pacing.append("fast" if len(beat["text"].split()) > fast_words else "steady")
+    erotic = []
+    for i in range(len(micro_beats)):
+        smoothed = mean(erotic_values[max(0, i - window + 1): i + 1])
+        erotic.append("peak" if smoothed > erotic_peak else "build")
+    return erotic, pacing
+
+
+def test_rolling_means_match_statistics_mean_exactly():
+    rng = random.Random(7)
+    values = [rng.randint(0, 9) / rng.randint(1, 30) for _ in range(300)] + [0.1, 0.2, 0.3, 1 / 3]
+    for window in (1, 2, 3, 7):
+        expected = [mean(values[max(0, i - window + 1): i + 1]) for i in range(len(values))]
+        assert rolling_means(values, window) == expected
+
+
+def test_adaptive_sweep_matches_per_setting_runs():
+    rng = random.Random(11)
+    scenes = [random_micro_beats(rng, rng.randint(1, 40)) for _ in range(6)]
+    peaks, windows, fast = [0.0, 0.1, 0.125, 0.3], [1, 3, 5], [0, 20, 59]
+    summary = sweep_arcs_adaptive(scenes, peaks, windows, fast)
+    assert summary["beats"] == sum(len(s) for s in scenes)
+
+    rows = {(r["rolling_window"], r["erotic_peak"]): r for r in summary["erotic_arc"]}
+    assert len(rows) == len(peaks) * len(windows)
+    for window in windows:
+        for peak in peaks:
+            labels = [l for s in scenes for l in reference_adaptive_labels(s, peak, window, 0)[0]]
+            assert rows[(window, peak)]["peak"] == labels.count("peak")
+            assert rows[(window, peak)]["build"] == labels.count("build")
+    for row in summary["pacing_strategy_notes"]:
+        labels = [l for s in scenes for l in reference_adaptive_labels(s, 0, 1, row["fast_pacing_word_count"])[1]]
+        assert row["fast"] == labels.count("fast")
+
+
+def test_arcs_sweep_matches_compute_arcs():
+    rng = random.Random(3)
+    words = ["pearl", "necklace", "moan", "gasp", "wet", "slick", "arch", "the", "door"]
+    scenes = [
+        [{"snippet": " ".join(rng.choices(words, k=rng.randint(0, 8)))} for _ in range(rng.randint(1, 12))]
+        for _ in range(5)
+    ]
+    grid = {"dominance": [0.0, 0.25, 0.5], "emotion": [0.1, 0.5], "erotic": [0.0, 1.0]}
+    summary = sweep_arcs(scenes, grid)
+    for mode in ("chunk", "rolling"):
+        for dim, thresholds in grid.items():
+            for row, t in zip(summary[mode][dim], thresholds):
+                labels = [
+                    arc[f"{dim}_label"]
+                    for beats in scenes
+                    for arc in compute_arcs(beats, {"dominance": t, "emotion": t, "erotic": t}, normalize_across=mode)
+                ]
+                assert row["threshold"] == t
+                assert row["high"] == labels.count("high")
+                assert row["low"] == labels.count("low")
@@ -0,0 +1,193 @@
+# tests/test_schema_validator_compiled.py
+# Differential tests: generated validator vs. generic jsonschema validation
+import json
+import random
+from copy import deepcopy
+from types import SimpleNamespace
+
+import pytest
+from jsonschema import Draft7Validator
+from jsonschema.exceptions import ValidationError, best_match
+
+import workflow_utils_schema_compiled as compiled
+from scripts.generate_schema_validator import generate_validator_source
+from workflow_utils_schema import (
+    SCHEMA_PATH, CompiledSchemaValidator, SchemaValidator, load_schema_with_fingerprint, validate_parts
+)
+
+SCENE_UUID = "6f1f5a8e-8d1a-5c54-9e3e-6f2b1a9c0d11"
+
+
+def make_valid_record(n_beats: int = 3):
+    beats = [{"snippet": f"pearl beat {i}", "beat_uuid": SCENE_UUID} for i in range(n_beats)]
+    return {
+        "scene_metadata": {"book_code": "B", "part": "1", "episode": "1", "scene": "1",
+                           "scene_uuid": SCENE_UUID, "flags": ["climax"], "merch_refs": ["m1"]},
+        "scene_text": "text",
+        "beats": beats,
+        "micro_beats": [{"beat_uuid": f"b{i}", "text": "t", "keyword_counts": {"erotic": 1, "gaze": 0.5}}
+                        for i in range(n_beats)],
+        "sections": {
+            "emotional_arc": {}, "erotic_arc": {}, "pacing_strategy_notes": {},
+            "connected_completion_arcs": [SCENE_UUID],
+            "trinity_advisory": {"pearls_detected": ["pearl"], "cuffs_detected": [], "moan_detected": [],
+                                 "sexual_actions": [], "erotic_physiology": [],
+                                 "two_condition_rule_triggered": False, "advisory_strength": 0.25},
+        },
+        "refs": {"scene_uuid": SCENE_UUID, "insert_advisory_refs": [], "flag_refs": ["f"]},
+        "cross_references": {"previous_scene": "a", "next_scene": "b"},
+        "scene_uuid": SCENE_UUID,
+        "core_identifier": "B_P1_E1_S1",
+    }
+
+
+MUTATIONS = [
+    lambda r: r.pop("scene_text"),
+    lambda r: r.pop("beats") and r.pop("refs"),
+    lambda r: r.__setitem__("scene_text", 3),
+    lambda r: r.__setitem__("unexpected", 1),
+    lambda r: r.update({"zzz": 1, "aaa": 2}),
+    lambda r: r["scene_metadata"].pop("scene_uuid"),
+    lambda r: r["scene_metadata"].__setitem__("flags", "climax"),
+    lambda r: r["scene_metadata"]["merch_refs"].append(7),
+    lambda r: r["beats"][1].pop("snippet"),
+    lambda r: r["beats"].append("not an object"),
+    lambda r: r["micro_beats"][0]["keyword_counts"].__setitem__("erotic", True),
+    lambda r: r["micro_beats"][2]["keyword_counts"].__setitem__("gaze", "1"),
+    lambda r: r["sections"]["trinity_advisory"].__setitem__("cues", 2),
+    lambda r: r["sections"]["trinity_advisory"].__setitem__("two_condition_rule_triggered", 1),
+    lambda r: r["sections"]["trinity_advisory"].__setitem__("advisory_strength", None),
+    lambda r: r["sections"].pop("trinity_advisory"),
+    lambda r: r["sections"]["connected_completion_arcs"].append(None),
+    lambda r: r["refs"].__setitem__("insert_advisory_refs", {}),
+    lambda r: r.__setitem__("cross_references", []),
+    lambda r: r.__setitem__("sections", "nope"),
+    lambda r: r["scene_metadata"].__setitem__("scene_uuid", "not-a-uuid"),
+]
+
+
+def error_signature(errors):
+    return [(e.message, list(e.path), list(e.schema_path), e.validator) for e in errors]
+
+
+def assert_same_errors(instance):
+    generic = Draft7Validator(compiled.SCHEMA)
+    assert error_signature(compiled.iter_errors(instance)) == error_signature(generic.iter_errors(instance))
+    assert compiled.is_valid(instance) == generic.is_valid(instance)
+    expected, actual = best_match(generic.iter_errors(instance)), best_match(compiled.iter_errors(instance))
+    assert str(expected) == str(actual)
+
+
+def test_compiled_module_is_up_to_date():
+    schema, fingerprint = load_schema_with_fingerprint(SCHEMA_PATH)
+    assert compiled.SCHEMA_FINGERPRINT == fingerprint
+    assert compiled.SCHEMA == schema
+    source = generate_validator_source(schema, fingerprint)
+    assert source == open(compiled.__file__, encoding="utf-8").read()
+
+
+def load_generated(schema):
+    namespace = {}
+    exec(compile(generate_validator_source(schema, "test"), "<generated>", "exec"), namespace)
+    return namespace
+
+
+def test_valid_record_passes():
+    # The shipped schema requires a top-level scene_uuid without declaring it
+    # under additionalProperties: false, so exercise the valid path on a copy
+    # that declares it.
+    schema = deepcopy(compiled.SCHEMA)
+    schema["properties"]["scene_uuid"] = {"type": "string", "format": "uuid"}
+    generated = load_generated(schema)
+    record = make_valid_record()
+    assert Draft7Validator(schema).is_valid(record)
+    assert generated["is_valid"](record)
+    generated["validate"](record)
+    assert not compiled.is_valid(record)
+
+
+@pytest.mark.parametrize("mutation", range(len(MUTATIONS)))
+def test_single_mutations_match_generic(mutation):
+    record = make_valid_record()
+    MUTATIONS[mutation](record)
+    assert_same_errors(record)
+
+
+def test_random_combined_mutations_match_generic():
+    rng = random.Random(1234)
+    for _ in range(200):
+        record = make_valid_record(rng.randint(0, 4))
+        for m in rng.sample(MUTATIONS, rng.randint(1, 4)):
+            try:
+                m(record)
+            except (KeyError, TypeError, AttributeError, IndexError):
+                pass
+        assert_same_errors(json.loads(json.dumps(record)))
+
+
+def test_non_object_instances_match_generic():
+    for instance in [None, [], "x", 1, True]:
+        assert_same_errors(instance)
+
+
+def test_unsupported_keyword_is_rejected():
+    schema = deepcopy(compiled.SCHEMA)
+    schema["properties"]["scene_text"]["minLength"] = 1
+    with pytest.raises(ValueError, match="'minLength' at schema\\['properties'\\]\\['scene_text'\\]"):
+        generate_validator_source(schema, "x")
+    schema = deepcopy(compiled.SCHEMA)
+    schema["properties"]["scene_text"]["type"] = "date"
+    with pytest.raises(ValueError, match="Unsupported type 'date'"):
+        generate_validator_source(schema, "x")
+
+
+def test_schema_the_generator_refuses_falls_back_to_jsonschema(tmp_path):
+    from workflow_utils_schema import get_schema_validator
+    schema = deepcopy(compiled.SCHEMA)
+    schema["properties"]["scene_text"]["minLength"] = 1
+    path = tmp_path / "schema.json"
+    path.write_text(json.dumps(schema))
+    validator = get_schema_validator(path, cache_dir=None)
+    assert isinstance(validator, SchemaValidator)
+    record = make_valid_record()
+    record["scene_text"] = ""
+    assert not validator.is_valid(record)
+
+
+def partial_validators(schema):
+    generated = SimpleNamespace(**load_generated(schema))
+    return CompiledSchemaValidator(generated), SchemaValidator(schema, "partial", cache_dir=None)
+
+
+def test_parts_together_give_the_full_errors():
+    schema = deepcopy(compiled.SCHEMA)
+    schema["properties"]["scene_uuid"] = {"type": "string", "format": "uuid"}
+    generic = Draft7Validator(schema)
+    for validator in partial_validators(schema):
+        assert validator.parts[-1] == "scene_uuid"
+        for mutation in MUTATIONS:
+            record = make_valid_record()
+            mutation(record)
+            full = sorted(error_signature(generic.iter_errors(record)))
+            parts = [None, *validator.parts]
+            assert sorted(error_signature(e for p in parts for e in validator.iter_part_errors(record, p))) == full
+            assert all(validator.is_valid_part(record, p) for p in parts) == (not full)
+
+
+def test_validate_parts_checks_only_dirty_subtrees():
+    schema = deepcopy(compiled.SCHEMA)
+    schema["properties"]["scene_uuid"] = {"type": "string", "format": "uuid"}
+    for validator in partial_validators(schema):
+        record = make_valid_record()
+        record["beats"][1].pop("snippet")
+        validate_parts(validator, record, ["refs", "sections"])
+        with pytest.raises(ValidationError) as partial:
+            validate_parts(validator, record, ["beats", "not_a_field"])
+        with pytest.raises(ValidationError) as full:
+            Draft7Validator(schema).validate(record)
+        assert str(partial.value) == str(full.value)
+        # Record-level checks run whatever is dirty
+        record["beats"][1]["snippet"] = "x"
+        record["extra"] = 1
+        with pytest.raises(ValidationError):
+            validate_parts(validator, record, [])
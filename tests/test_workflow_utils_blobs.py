@@ -0,0 +1,82 @@
+# tests/test_workflow_utils_blobs.py
+import json
+
+from workflow_utils import read_passfile, update_passfile_scenes, write_passfile, write_passfile_strict
+from workflow_utils_blobs import BLOB_PREFIX, pack_passfile, same_text, text_digest, text_hash, unpack_passfile
+
+PARAGRAPH = "The pearls caught the lamplight as she leaned closer, breath held. " * 4
+
+
+def passfile():
+    beats = [{"beat_uuid": f"b{i}", "snippet": PARAGRAPH} for i in range(3)]
+    scene = {"scene_uuid": "s1", "scene_text": PARAGRAPH, "beats": beats, "title": PARAGRAPH}
+    return {"s1": scene, "chunk_0": scene, "scene_text": PARAGRAPH, "short": {"scene_text": "tiny"}}
+
+
+def test_pack_stores_each_text_once_and_round_trips():
+    data = passfile()
+    packed = pack_passfile(data)
+    blobs = [k for k in packed if k.startswith(BLOB_PREFIX)]
+    assert len(blobs) == 1
+    assert packed["s1"]["scene_text"] == {"$blob": blobs[0][len(BLOB_PREFIX):]}
+    assert packed["s1"]["title"] == PARAGRAPH  # only text fields are content-addressed
+    assert packed["short"] is data["short"]  # unchanged records are shared, not copied
+    assert data["s1"]["scene_text"] == PARAGRAPH  # input left alone
+    assert unpack_passfile(json.loads(json.dumps(packed))) == data
+
+
+def test_passfile_round_trip_with_interned_texts(tmp_path):
+    path = tmp_path / "passfile.json"
+    write_passfile(passfile(), str(path), dedupe_text=True)
+    raw = path.read_text()
+    assert raw.count(PARAGRAPH) == 3  # the blob plus the two non-text "title" fields
+    plain = tmp_path / "plain.json"
+    write_passfile(passfile(), str(plain))
+    assert len(plain.read_text()) - len(raw) > 5 * len(PARAGRAPH)
+
+    pf = read_passfile(str(path))
+    assert pf == passfile()
+    assert not any(k.startswith(BLOB_PREFIX) for k in pf)
+    texts = [pf["s1"]["scene_text"], pf["chunk_0"]["scene_text"], pf["scene_text"],
+             *(b["snippet"] for b in pf["s1"]["beats"])]
+    assert all(t is texts[0] for t in texts)
+
+
+def test_rewrites_keep_blobs(tmp_path):
+    path = tmp_path / "passfile.json"
+    write_passfile(passfile(), str(path), dedupe_text=True)
+    update_passfile_scenes({"s2": {"scene_uuid": "s2", "scene_text": PARAGRAPH}}, str(path))
+    write_passfile_strict("beat_list", [], str(path))
+    raw = path.read_text()
+    assert raw.count(PARAGRAPH) == 3
+    assert read_passfile(str(path))["s2"]["scene_text"] == PARAGRAPH
+
+    plain = tmp_path / "plain.json"
+    write_passfile(passfile(), str(plain))
+    update_passfile_scenes({"s2": {"scene_uuid": "s2", "scene_text": PARAGRAPH}}, str(plain))
+    assert BLOB_PREFIX not in plain.read_text()
+
+
+def test_lazy_reads_resolve_blobs(tmp_path):
+    path = tmp_path / "passfile.json"
+    write_passfile(passfile(), str(path), dedupe_text=True)
+    with read_passfile(str(path), lazy=True) as lazy:
+        assert sorted(lazy) == ["chunk_0", "s1", "scene_text", "short"]
+        assert lazy["s1"]["scene_text"] is lazy["chunk_0"]["beats"][2]["snippet"]
+        assert lazy.get_many(["s1"])["s1"] == passfile()["s1"]
+
+
+def test_same_text():
+    a = "x" * 100
+    b = "".join(["x"] * 100)
+    assert a is not b and same_text(a, b)
+    assert not same_text(a, a[:-1] + "y")
+    assert same_text(None, None) and not same_text(None, "")
+
+
+def test_same_text_uses_stored_digests():
+    digest = text_hash(PARAGRAPH)
+    text = unpack_passfile(pack_passfile({"s1": {"scene_text": "".join([PARAGRAPH])}}))["s1"]["scene_text"]
+    assert text_digest(text) == digest
+    assert same_text(text, {"$blob": digest}) and same_text({"$blob": digest}, PARAGRAPH)
+    assert not same_text({"$blob": digest}, {"$blob": text_hash("other")})
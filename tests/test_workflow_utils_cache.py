@@ -0,0 +1,157 @@
+# tests/test_workflow_utils_cache.py
+import pytest
+
+from workflow_utils_cache import AnalysisCache, lexicon_version, set_analysis_cache
+from workflow_utils import compute_arcs, detect_trinity_cues
+
+
+def test_lexicon_version_changes_with_lexicon():
+    assert lexicon_version(["a", "b"]) == lexicon_version(["a", "b"])
+    assert lexicon_version(["a", "b"]) != lexicon_version(["a", "c"])
+
+
+def test_memory_lru_eviction():
+    cache = AnalysisCache(memory_entries=2)
+    for text in ["one", "two", "three"]:
+        cache.put("k", text, "v1", len(text))
+    assert cache.get("k", "one", "v1") is None
+    assert cache.get("k", "three", "v1") == 5
+
+
+def test_get_or_compute_only_computes_once():
+    cache = AnalysisCache()
+    calls = []
+    def compute(text):
+        calls.append(text)
+        return {"n": len(text)}
+    assert cache.get_or_compute("k", "pearl", "v1", compute) == {"n": 5}
+    assert cache.get_or_compute("k", "pearl", "v1", compute) == {"n": 5}
+    assert cache.get_or_compute("k", "pearl", "v2", compute) == {"n": 5}
+    assert calls == ["pearl", "pearl"]
+
+
+def test_disk_cache_survives_reopen(tmp_path):
+    path = tmp_path / "analysis.sqlite"
+    cache = AnalysisCache(path)
+    cache.put("k", "moan", "v1", [1, 2])
+    cache.close()
+    reopened = AnalysisCache(path)
+    assert reopened.get("k", "moan", "v1") == [1, 2]
+    reopened.close()
+
+
+def test_disk_eviction_bounds_size(tmp_path):
+    cache = AnalysisCache(tmp_path / "analysis.sqlite", memory_entries=1, max_disk_entries=10)
+    for i in range(50):
+        cache.put("k", f"text-{i}", "v1", i)
+    cache._evict_disk()
+    (count,) = cache._conn.execute("SELECT COUNT(*) FROM analysis").fetchone()
+    assert count <= 10
+    assert cache.get("k", "text-49", "v1") == 49
+    cache.close()
+
+
+def test_analysis_functions_hit_cache():
+    cache = AnalysisCache()
+    previous = set_analysis_cache(cache)
+    try:
+        beats = [{"snippet": "pearl collar"}, {"snippet": "soft moan, wet"}]
+        first = compute_arcs(beats)
+        record = {"scene_metadata": {"flags": ["climax"]}}
+        cues = detect_trinity_cues("a pearl and a moan", record)
+        misses = cache.misses
+        assert compute_arcs(beats) == first
+        assert detect_trinity_cues("a pearl and a moan", record) == cues
+        assert cache.misses == misses
+        assert cues["pearls"] == ["pearl"] and cues["cues"] == 2
+    finally:
+        set_analysis_cache(previous)
+
+
+def test_disk_hits_touch_last_used_in_batches(tmp_path):
+    cache = AnalysisCache(tmp_path / "analysis.sqlite", memory_entries=1)
+    cache.put("k", "one", "v1", 1)
+    cache.put("k", "two", "v1", 2)
+    cache.flush()
+    assert cache.get("k", "one", "v1") == 1
+    rows = dict(cache._conn.execute("SELECT value, last_used FROM analysis").fetchall())
+    assert rows["1"] < rows["2"]  # the hit is pending, not written
+    cache.close()
+    reopened = AnalysisCache(tmp_path / "analysis.sqlite")
+    rows = dict(reopened._conn.execute("SELECT value, last_used FROM analysis").fetchall())
+    assert rows["1"] > rows["2"]
+    reopened.close()
+
+
+def test_default_cache_is_on_disk(monkeypatch, tmp_path):
+    import workflow_utils_cache
+    monkeypatch.setattr(workflow_utils_cache, "ANALYSIS_CACHE_PATH", tmp_path / "analysis.sqlite")
+    previous = set_analysis_cache(None)
+    try:
+        cache = workflow_utils_cache.get_analysis_cache()
+        assert cache.path == tmp_path / "analysis.sqlite"
+        cache.close()
+    finally:
+        set_analysis_cache(previous)
+
+
+def test_puts_reach_disk_in_one_batch(tmp_path):
+    import sqlite3
+    path = tmp_path / "analysis.sqlite"
+    cache = AnalysisCache(path)
+    for i in range(10):
+        cache.put("k", f"text-{i}", "v1", i)
+    assert cache.get("k", "text-3", "v1") == 3
+    other = sqlite3.connect(str(path))
+    assert other.execute("SELECT COUNT(*) FROM analysis").fetchone() == (0,)
+    cache.flush()
+    assert other.execute("SELECT COUNT(*) FROM analysis").fetchone() == (10,)
+    other.close()
+    cache.close()
+
+
+def test_short_texts_skip_the_cache():
+    cache = AnalysisCache(min_text_chars=10)
+    calls = []
+    def compute(text):
+        calls.append(text)
+        return len(text)
+    for _ in range(2):
+        assert cache.get_or_compute("k", "short", "v1", compute) == 5
+        assert cache.get_or_compute("k", "long enough text", "v1", compute) == 16
+    assert calls == ["short", "long enough text", "short"]
+    assert cache.misses == 1
+
+
+def test_warm_disk_hit_is_cheaper_than_recomputing(tmp_path):
+    import random
+    import time
+    keywords = ["dominance", "submission", "tension", "release", "erotic", "gaze", "posture", "voice", "control"]
+    rng = random.Random(7)
+    words = [rng.choice(keywords + ["the", "she", "slow", "breath", "hand"] * 3) for _ in range(100_000)]
+    text = " ".join(words)
+
+    def rows(text):
+        words = text.split()
+        return [[chunk.count(kw) for kw in keywords]
+                for chunk in (" ".join(words[i:i + 5]).lower() for i in range(0, len(words), 5))]
+
+    path = tmp_path / "analysis.sqlite"
+    cache = AnalysisCache(path)
+    expected = cache.get_or_compute("rows", text, "v1", rows)
+    cache.close()
+
+    def best_of(fn, runs=3):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings), result
+
+    recompute, _ = best_of(lambda: rows(text))
+    # A fresh cache on the same file: the hit comes from disk, as in a new process
+    warm, value = best_of(lambda: AnalysisCache(path, memory_entries=0).get_or_compute(
+        "rows", text, "v1", lambda _: pytest.fail("warm cache recomputed")))
+    assert value == expected
+    assert warm < recompute
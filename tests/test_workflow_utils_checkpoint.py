@@ -0,0 +1,55 @@
+# tests/test_workflow_utils_checkpoint.py
+from workflow_utils import read_passfile, update_passfile_scenes
+from workflow_utils_checkpoint import (
+    CHECKPOINT_KEY, chunk_fingerprint, committed_entry, continuity_stub,
+    load_checkpoint, new_checkpoint, record_chunk
+)
+
+
+def record(uuid, arcs):
+    return {"scene_uuid": uuid, "sections": {"connected_completion_arcs": arcs}}
+
+
+def test_fingerprint_ignores_key_order_but_not_content():
+    a = chunk_fingerprint(scene_text="t", scene_metadata={"a": 1, "b": 2})
+    assert a == chunk_fingerprint(scene_metadata={"b": 2, "a": 1}, scene_text="t")
+    assert a != chunk_fingerprint(scene_text="t2", scene_metadata={"a": 1, "b": 2})
+
+
+def test_committed_entry_requires_matching_fingerprint():
+    checkpoint = new_checkpoint()
+    record_chunk(checkpoint, 0, "fp0", record("s0", ["s0"]))
+    record_chunk(checkpoint, 1, "fp1", record("s1", ["s0", "s1"]))
+    assert checkpoint["last_committed"] == 1
+    assert committed_entry(checkpoint, 1, "fp1")["scene_uuid"] == "s1"
+    assert committed_entry(checkpoint, 1, "changed") is None
+    assert committed_entry(checkpoint, 2, "fp2") is None
+    assert committed_entry(None, 0, "fp0") is None
+    assert continuity_stub(committed_entry(checkpoint, 1, "fp1")) == record("s1", ["s0", "s1"])
+
+
+def test_checkpoint_committed_with_chunk_and_reloaded(tmp_path):
+    path = tmp_path / "passfile.json"
+    checkpoint = record_chunk(new_checkpoint(), 0, "fp0", record("s0", ["s0"]))
+    update_passfile_scenes({"s0": record("s0", ["s0"]), CHECKPOINT_KEY: checkpoint}, path)
+    pf = read_passfile(str(path))
+    assert "s0" in pf
+    assert load_checkpoint(pf)["chunks"]["0"]["fingerprint"] == "fp0"
+    assert load_checkpoint({CHECKPOINT_KEY: {"version": 999}}) is None
+
+
+def test_scene_indexes_skip_the_checkpoint():
+    from workflow_utils_continuity_graph import ContinuityGraph
+    from workflow_utils_inverted_index import InvertedIndex
+    from workflow_utils_merkle import MerkleIndex
+
+    checkpoint = record_chunk(new_checkpoint(), 0, "fp0", record("s0", ["s0"]))
+    pf = {"chunk_0": record("s0", ["s0"]), CHECKPOINT_KEY: checkpoint}
+    merkle = MerkleIndex.build(pf)
+    assert list(merkle.entries) == ["chunk_0"]
+    assert list(InvertedIndex.build(pf).docs) == ["chunk_0"]
+    assert ContinuityGraph.build(pf).scenes() == ["s0"]
+
+    pf[CHECKPOINT_KEY] = record_chunk(checkpoint, 1, "fp1", record("s1", ["s0", "s1"]))
+    merkle.update(pf, [CHECKPOINT_KEY])
+    assert merkle.diff(MerkleIndex.build({"chunk_0": record("s0", ["s0"])})) == []
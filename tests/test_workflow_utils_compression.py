@@ -0,0 +1,84 @@
+# tests/test_workflow_utils_compression.py
+import io
+import json
+
+import pytest
+
+from workflow_utils import read_passfile, update_passfile_scenes, write_passfile, write_passfile_strict
+from workflow_utils_compression import detect_codec, iter_passfile_items, load_passfile_stream
+
+
+def sample_passfile():
+    return {
+        f"scene-{i}": {
+            "scene_text": "Sophie’s office — café au lait, pearls \"quoted\" " * 20,
+            "beats": [{"beat_uuid": f"b{i}-{j}", "weight": j * 0.5, "flag": j % 2 == 0, "x": None} for j in range(5)],
+        }
+        for i in range(30)
+    } | {"count": 12345, "ratio": -1.5e-3, "empty": {}, "list": []}
+
+
+@pytest.mark.parametrize("name,codec", [
+    ("passfile.json.gz", "gzip"),
+    ("passfile.json.xz", "lzma"),
+    ("passfile.json.zz", "zlib"),
+])
+def test_codec_chosen_by_extension_roundtrips(tmp_path, name, codec):
+    path = tmp_path / name
+    data = sample_passfile()
+    write_passfile(data, str(path))
+    assert detect_codec(path) == codec
+    assert read_passfile(str(path)) == data
+
+
+def test_codec_flag_and_sniffed_read(tmp_path):
+    plain, packed = tmp_path / "plain.json", tmp_path / "packed.json"
+    data = sample_passfile()
+    write_passfile(data, str(plain))
+    write_passfile(data, str(packed), compression="lzma")
+    assert detect_codec(packed) == "lzma"
+    assert packed.stat().st_size < plain.stat().st_size / 5
+    assert read_passfile(str(packed)) == data
+    with pytest.raises(ValueError):
+        write_passfile(data, str(packed), compression="bz2")
+
+
+def test_compact_mode_drops_indent(tmp_path):
+    plain, compact = tmp_path / "plain.json", tmp_path / "compact.json"
+    data = sample_passfile()
+    write_passfile(data, str(plain))
+    write_passfile(data, str(compact), compact=True)
+    assert "\n" not in compact.read_text(encoding="utf-8")
+    assert compact.stat().st_size < plain.stat().st_size
+    assert json.loads(compact.read_text(encoding="utf-8")) == data
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_streaming_decoder_handles_tokens_split_across_reads(chunk_size, indent):
+    data = sample_passfile()
+    text = json.dumps(data, ensure_ascii=False, indent=indent)
+    assert dict(iter_passfile_items(io.StringIO(text), chunk_size)) == data
+    assert load_passfile_stream(io.BytesIO(text.encode("utf-8")), chunk_size) == data
+
+
+@pytest.mark.parametrize("text", ["", "[1, 2]", '{"a": 1,}', '{"a": 1'])
+def test_streaming_decoder_rejects_malformed_input(text):
+    with pytest.raises(json.JSONDecodeError):
+        dict(iter_passfile_items(io.StringIO(text), 2))
+
+
+def test_lazy_read_refuses_compressed_passfile(tmp_path):
+    path = tmp_path / "passfile.json.gz"
+    write_passfile({"a": 1}, str(path))
+    with pytest.raises(ValueError):
+        read_passfile(str(path), lazy=True)
+
+
+def test_rewrites_keep_the_stored_codec(tmp_path):
+    path = tmp_path / "passfile.json"
+    write_passfile({"a": {"x": 1}}, str(path), compression="lzma")
+    update_passfile_scenes({"b": {"x": 2}}, path)
+    write_passfile_strict("c", {"x": 3}, str(path))
+    assert detect_codec(path) == "lzma"
+    assert read_passfile(str(path)) == {"a": {"x": 1}, "b": {"x": 2}, "c": {"x": 3}}
@@ -0,0 +1,56 @@
+# tests/test_workflow_utils_continuity.py
+import random
+
+import pytest
+
+from workflow_utils import iter_continuity_inflections
+
+
+def neighbour_reference(records, i, window):
+    points = []
+    for j in range(max(0, i - window), min(len(records), i + window + 1)):
+        points += records[j]["inflection_points"]
+    return list(dict.fromkeys(points))
+
+
+def make_records(rng, n):
+    return [
+        {"scene_uuid": f"s{i}", "inflection_points": [f"b{rng.randint(0, 12)}" for _ in range(rng.randint(0, 4))]}
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 5, 17])
+@pytest.mark.parametrize("window", [0, 1, 2, 6])
+def test_matches_neighbour_concatenation(n, window):
+    records = make_records(random.Random(n * 31 + window), n)
+    out = list(iter_continuity_inflections(iter(records), window))
+    assert [r["scene_uuid"] for r, _ in out] == [r["scene_uuid"] for r in records]
+    for i, (_, points) in enumerate(out):
+        assert points == neighbour_reference(records, i, window)
+
+
+def test_window_one_matches_previous_own_next_order():
+    records = [
+        {"scene_uuid": "a", "inflection_points": ["x", "y"]},
+        {"scene_uuid": "b", "inflection_points": ["z", "x"]},
+        {"scene_uuid": "c"},
+    ]
+    assert [p for _, p in iter_continuity_inflections(records)] == [["x", "y", "z"], ["x", "y", "z"], ["z", "x"]]
+
+
+def test_streams_lazily():
+    def scenes():
+        for i in range(1000):
+            yield {"scene_uuid": f"s{i}", "inflection_points": [f"p{i}"]}
+            if i == 3:
+                return
+
+    gen = iter_continuity_inflections(scenes(), window=1)
+    record, points = next(gen)
+    assert record["scene_uuid"] == "s0" and points == ["p0", "p1"]
+
+
+def test_negative_window_rejected():
+    with pytest.raises(ValueError):
+        list(iter_continuity_inflections([], window=-1))
@@ -0,0 +1,106 @@
+# tests/test_workflow_utils_continuity_graph.py
+import random
+
+from workflow_utils_continuity_graph import ARC, ContinuityGraph, scene_edges
+from workflow_utils_merge_v5_13 import merge_chunks_v5_13
+
+
+def scene(uuid, prev=None, nxt=None, arcs=()):
+    return {
+        "scene_uuid": uuid,
+        "cross_references": {"previous_scene": prev, "next_scene": nxt},
+        "sections": {"connected_completion_arcs": list(arcs)},
+    }
+
+
+def chain_passfile():
+    return {
+        "s1": scene("s1", nxt="s2"),
+        "s2": scene("s2", prev="s1", nxt="s3", arcs=["s1"]),
+        "s3": scene("s3", prev="s2", arcs=["s1", "s2", "s3"]),
+        "s9": scene("s9"),
+        "scene_text": "not a scene",
+    }
+
+
+def test_edges_from_cross_references_metadata_and_arcs():
+    record = scene("b", prev="a", arcs=["x", "b"])
+    record["scene_metadata"] = {"next_scene": "c"}
+    assert scene_edges("b", record) == [("a", "b", "sequence"), ("b", "c", "sequence"), ("x", "b", "arc")]
+
+
+def test_walk_reachability_and_feeders():
+    graph = ContinuityGraph.build(chain_passfile())
+    assert list(graph.walk("s1")) == ["s1", "s2", "s3"]
+    assert list(graph.walk("s3", reverse=True)) == ["s3", "s2", "s1"]
+    assert graph.reachable("s1") == {"s2", "s3"}
+    assert graph.reachable("s3", kinds=(ARC,)) == set()
+    assert graph.feeders("s3") == {"s1", "s2"}
+    assert graph.orphans() == {"s9"}
+    assert graph.dangling() == set()
+    assert graph.cycles() == []
+
+
+def test_incremental_update_tracks_orphans_dangling_and_cycles():
+    pf = chain_passfile()
+    graph = ContinuityGraph.build(pf)
+    assert graph.reachable("s1") == {"s2", "s3"}
+
+    pf["s3"] = scene("s3", prev="s2", nxt="s1")
+    pf["s9"] = scene("s9", nxt="s10")
+    graph.update(pf, ["s3", "s9"])
+    assert graph.cycles() == [["s1", "s2", "s3"]]
+    assert graph.feeders("s3") == set()
+    assert graph.orphans() == set()
+    assert graph.dangling() == {"s10"}
+
+    del pf["s9"]
+    graph.update(pf, ["s9"])
+    assert graph.dangling() == set()
+    assert "s9" not in graph.scenes()
+
+
+def test_shared_edges_survive_one_side_being_removed():
+    pf = chain_passfile()
+    graph = ContinuityGraph.build(pf)
+    pf["s1"] = scene("s1")  # s2 still says previous_scene = s1
+    graph.update(pf, ["s1"])
+    assert graph.successors("s1") == ["s2"]
+
+
+def test_merge_updates_graph():
+    graph = ContinuityGraph()
+    chunk = {
+        "scene_metadata": {"book_code": "TB", "part": "1", "episode": "1", "scene": "1"},
+        "scene_text": "text",
+        "beats": [],
+        "micro_beats": [],
+        "refs": {},
+        "sections": {"connected_completion_arcs": ["earlier-scene"]},
+    }
+    pf = merge_chunks_v5_13({}, [chunk], graph=graph)
+    (uuid,) = pf.keys()
+    assert graph.feeders(uuid) == {"earlier-scene"}
+    assert graph.dangling() == {"earlier-scene"}
+
+
+def test_top_level_scene_metadata_is_not_a_scene():
+    pf = chain_passfile()
+    pf["scene_metadata"] = {"scene_uuid": "s1", "book_code": "TB", "next_scene": "s2"}
+    assert ContinuityGraph.build(pf).scenes() == ["s1", "s2", "s3", "s9"]
+    assert ContinuityGraph.build(pf).successors("s1") == ["s2"]
+
+
+def test_incremental_cycles_match_full_recompute():
+    rng = random.Random(7)
+    names = [f"s{i}" for i in range(30)]
+    pf = {n: scene(n) for n in names}
+    graph = ContinuityGraph.build(pf)
+    graph.cycles()
+    for _ in range(300):
+        n = rng.choice(names)
+        pf[n] = scene(n, prev=rng.choice(names + [None] * 10), nxt=rng.choice(names + [None] * 10))
+        graph.update(pf, [n])
+        if rng.random() < 0.3:
+            assert graph.cycles() == ContinuityGraph.build(pf).cycles()
+    assert graph.cycles() == ContinuityGraph.build(pf).cycles()
@@ -0,0 +1,145 @@
+# tests/test_workflow_utils_delta.py
+import json
+import logging
+from copy import deepcopy
+from pathlib import Path
+
+import pytest
+
+from workflow_utils_delta import (
+    apply_text_ops, diff_text, is_delta_chunk, make_delta_chunk, merge_delta_chunks, text_hash
+)
+from workflow_utils_merge_v5_13 import merge_chunks_v5_13
+
+METADATA = {"book_code": "B", "part": "1", "episode": "1", "scene": "1"}
+
+
+def beat(uuid, snippet):
+    return {"beat_uuid": uuid, "snippet": snippet}
+
+
+def scene(text, beats, micro, refs=None, arcs=None):
+    return {"scene_metadata": dict(METADATA), "scene_text": text, "beats": beats, "micro_beats": micro,
+            "refs": refs or {"flag_refs": [], "insert_advisory_refs": [], "feedback_summary_ref": []},
+            "sections": {"connected_completion_arcs": arcs or []}}
+
+
+def normalized(pf):
+    # Advisory lists are built from sets, so only their contents are comparable
+    pf = deepcopy(pf)
+    for record in pf.values():
+        for key, value in record.get("sections", {}).get("trinity_advisory", {}).items():
+            if isinstance(value, list):
+                record["sections"]["trinity_advisory"][key] = sorted(value)
+    return pf
+
+
+@pytest.mark.parametrize("old,new", [
+    ("abc", "abc"), ("", "new text"), ("old text", ""),
+    ("one\ntwo\nthree\nfour\n", "one\nTWO\nthree\nfour and more\n"),
+    ("the cat sat", "the dog sat"),
+])
+def test_text_ops_round_trip(old, new):
+    assert apply_text_ops(old, diff_text(old, new)) == new
+
+
+def test_text_ops_stay_local():
+    old = "".join(f"line {i}\n" for i in range(1000))
+    new = old.replace("line 10\n", "line ten\n").replace("line 900\n", "line nine hundred\n")
+    ops = diff_text(old, new)
+    assert len(ops) == 2 and sum(len(op[2]) for op in ops) < 40
+
+
+def test_delta_merge_matches_whole_chunk_merge():
+    old = scene("She gasped.\nThe cuff held.\n", [beat("b1", "gaze"), beat("b3", "voice")],
+                [beat("m1", "a"), beat("m2", "b")], arcs=["x"])
+    base = merge_chunks_v5_13({}, [deepcopy(old)])
+    scene_uuid = next(iter(base))
+
+    new = deepcopy(base[scene_uuid])
+    new["scene_text"] = "She gasped.\nThe leather cuff held; a moan.\n"
+    new["beats"].append(beat("b2", "posture"))
+    new["micro_beats"][1]["snippet"] = "edited"
+    new["micro_beats"].append(beat("m0", "inserted"))
+    new["refs"]["flag_refs"] = ["f1"]
+    new["sections"]["connected_completion_arcs"].append("y")
+
+    delta = make_delta_chunk(base[scene_uuid], new)
+    assert is_delta_chunk(delta) and "scene_metadata" not in delta
+    assert [b["beat_uuid"] for b in delta["beats"]["upsert"]] == ["b2"]
+    assert len(json.dumps(delta)) < len(json.dumps(new))
+
+    whole = merge_chunks_v5_13(deepcopy(base), [deepcopy(new)], force_overwrite_text_for=[scene_uuid])
+    by_delta = merge_delta_chunks(deepcopy(base), [delta], force_overwrite_text_for=[scene_uuid])
+    assert normalized(by_delta) == normalized(whole)
+
+
+def test_delete_and_text_conflict_rules(caplog):
+    base = merge_chunks_v5_13({}, [scene("first", [beat("b1", "x"), beat("b2", "y")], [])])
+    scene_uuid = next(iter(base))
+    new = deepcopy(base[scene_uuid])
+    new["scene_text"] = "second"
+    del new["beats"][0]
+    delta = make_delta_chunk(base[scene_uuid], new)
+    assert delta["beats"] == {"delete": ["b1"]}
+
+    with caplog.at_level(logging.WARNING):
+        merged = merge_delta_chunks(deepcopy(base), [delta])
+    assert merged[scene_uuid]["scene_text"] == "first"
+    assert [b["beat_uuid"] for b in merged[scene_uuid]["beats"]] == ["b2"]
+    assert "[CONFLICT]" in caplog.text
+
+    # Patch made against text the scene no longer has: never applied, even when forced
+    stale = deepcopy(base)
+    stale[scene_uuid]["scene_text"] = "changed meanwhile"
+    merge_delta_chunks(stale, [delta], force_overwrite_text_for=[scene_uuid])
+    assert stale[scene_uuid]["scene_text"] == "changed meanwhile"
+    assert delta["text"]["base"] == text_hash("first")
+
+
+def test_unknown_scene_skipped_and_bad_version():
+    pf = {}
+    assert merge_delta_chunks(pf, [{"delta_version": 1, "scene_uuid": "missing"}]) == {}
+    with pytest.raises(ValueError):
+        merge_delta_chunks({"s": {"scene_uuid": "s"}}, [{"delta_version": 99, "scene_uuid": "s"}])
+
+
+def test_merges_validate_touched_scenes_by_dirty_field(caplog):
+    schema = json.loads((Path(__file__).parent.parent / "data" / "schema_passfile.json").read_text())
+    schema["properties"]["scene_uuid"] = {"type": "string"}
+    schema["properties"]["folder_map"] = {"type": "object"}
+    records = []
+    for number in ("1", "2"):
+        record = scene("text", [beat("b1", "x")], [])
+        record["scene_metadata"]["scene"] = number  # no scene_uuid: invalid, but never dirty below
+        record["sections"].update(emotional_arc={}, erotic_arc={}, pacing_strategy_notes={})
+        records.append(record)
+    base = merge_chunks_v5_13({}, records)
+    first, second = base
+    for scene_uuid, record in base.items():
+        record["refs"]["scene_uuid"] = scene_uuid
+        record["core_identifier"] = "c"
+        record["folder_map"] = {}
+
+    with caplog.at_level(logging.ERROR):
+        good = deepcopy(base[first])
+        good["beats"].append(beat("b2", "y"))
+        merge_chunks_v5_13(deepcopy(base), [good], schema=schema)
+        new = deepcopy(base[first])
+        new["beats"].append(beat("b2", "y"))
+        merge_delta_chunks(deepcopy(base), [make_delta_chunk(base[first], new)], schema=schema)
+    assert "Schema validation failed" not in caplog.text
+
+    with caplog.at_level(logging.ERROR):
+        bad = deepcopy(base[first])
+        bad["beats"].append({"beat_uuid": "b2"})
+        merge_chunks_v5_13(deepcopy(base), [bad], schema=schema)
+    assert f"Schema validation failed for scene_uuid {first}" in caplog.text
+    assert second not in caplog.text
+
+    caplog.clear()
+    with caplog.at_level(logging.ERROR):
+        new = deepcopy(base[first])
+        new["beats"].append({"beat_uuid": "b2"})
+        merge_delta_chunks(deepcopy(base), [make_delta_chunk(base[first], new)], schema=schema)
+    assert f"Schema validation failed for scene_uuid {first}" in caplog.text
@@ -0,0 +1,108 @@
+# tests/test_workflow_utils_inverted_index.py
+import os
+
+import pytest
+
+from workflow_utils import update_passfile_scenes, write_passfile
+from workflow_utils_inverted_index import (
+    InvertedIndex, load_or_build_inverted_index, parse_query, terms_path_for
+)
+
+
+def make_scene(n, flags=(), merch=(), flag_refs=(), cuffs=(), triggered=False, keywords=None):
+    return {
+        "scene_uuid": f"chunk_{n}",
+        "scene_metadata": {"flags": list(flags), "merch_refs": list(merch)},
+        "refs": {"flag_refs": list(flag_refs)},
+        "sections": {"trinity_advisory": {"cuffs_detected": list(cuffs), "two_condition_rule_triggered": triggered}},
+        "micro_beats": [
+            {"beat_uuid": f"b{n}-{j}", "keyword_counts": counts}
+            for j, counts in enumerate(keywords or [{}])
+        ],
+    }
+
+
+def make_passfile():
+    return {
+        "chunk_1": make_scene(1, flags=["climax"], cuffs=["leather"], triggered=True,
+                              keywords=[{"tension": 2}, {"tension": 0, "gaze": 1}]),
+        "chunk_2": make_scene(2, flags=["kink"], cuffs=["strap"], triggered=True, merch=["pearl-necklace"]),
+        "chunk_3": make_scene(3, cuffs=["leather"], flag_refs=["needs-review"], keywords=[{"gaze": 3}]),
+        "scene_text": "scratch value, not a scene",
+        "scene_metadata": {"flags": ["climax"]},
+        "__pipeline_checkpoint__": {"version": 1, "chunks": {}, "sections": {}},
+    }
+
+
+def test_scene_queries():
+    index = InvertedIndex.build(make_passfile())
+    assert index.query("two_condition_rule_triggered AND cuffs_detected:leather") == ["chunk_1"]
+    assert index.query("cuffs_detected:leather OR merch:pearl-necklace") == ["chunk_1", "chunk_2", "chunk_3"]
+    assert index.query(("and", "cuffs_detected:leather", ("or", "flag:climax", "flag_ref:needs-review"))) == \
+        ["chunk_1", "chunk_3"]
+    assert index.query("keyword:gaze AND (flag:climax OR flag:kink)") == ["chunk_1"]
+    assert index.query("flag:nothing") == []
+
+
+def test_beat_queries_expand_scene_terms():
+    index = InvertedIndex.build(make_passfile())
+    assert index.query("keyword:tension", level="beat") == [("chunk_1", "b1-0")]
+    assert index.query("keyword:gaze", level="beat") == [("chunk_1", "b1-1"), ("chunk_3", "b3-0")]
+    assert index.query("keyword:gaze AND flag:climax", level="beat") == [("chunk_1", "b1-1")]
+
+
+def test_incremental_update_matches_rebuild():
+    pf = make_passfile()
+    index = InvertedIndex.build(pf)
+    pf["chunk_1"] = make_scene(1, flags=["finale"])
+    del pf["chunk_2"]
+    pf["chunk_4"] = make_scene(4, cuffs=["leather"], triggered=True)
+    index.update(pf, ["chunk_1", "chunk_2", "chunk_4"])
+    rebuilt = InvertedIndex.build(pf)
+    assert index.docs == rebuilt.docs
+    assert dict(index.scene_postings) == dict(rebuilt.scene_postings)
+    assert dict(index.beat_postings) == dict(rebuilt.beat_postings)
+    assert index.query("two_condition_rule_triggered AND cuffs_detected:leather") == ["chunk_4"]
+
+
+def test_parse_query_precedence_and_errors():
+    assert parse_query("a OR b AND c") == ("or", "a", ("and", "b", "c"))
+    assert parse_query("(a OR b) AND c") == ("and", ("or", "a", "b"), "c")
+    for bad in ["", "a AND", "(a OR b", "a b", "AND a"]:
+        with pytest.raises(ValueError):
+            parse_query(bad)
+
+
+def test_sidecar_refreshed_from_write_paths(tmp_path):
+    path = tmp_path / "passfile.json"
+    write_passfile(make_passfile(), str(path))
+    assert not terms_path_for(path).exists()
+    assert load_or_build_inverted_index(path).query("flag:climax") == ["chunk_1"]
+    assert terms_path_for(path).exists()
+
+    update_passfile_scenes({"chunk_3": make_scene(3, flags=["climax"])}, path)
+    stored = InvertedIndex.load(path)
+    assert stored is not None
+    assert stored.query("flag:climax") == ["chunk_1", "chunk_3"]
+
+
+def test_only_scene_keys_are_indexed():
+    index = InvertedIndex.build(make_passfile())
+    assert sorted(index.docs) == ["chunk_1", "chunk_2", "chunk_3"]
+    assert index.query("flag:climax") == ["chunk_1"]
+
+
+def test_refresh_rewrites_only_touched_buckets(tmp_path):
+    path = tmp_path / "passfile.json"
+    pf = {f"chunk_{n}": make_scene(n, flags=["climax"]) for n in range(200)}
+    write_passfile(pf, str(path))
+    load_or_build_inverted_index(path)
+    for f in terms_path_for(path).glob("bucket-*.json"):
+        os.utime(f, ns=(0, 0))
+
+    update_passfile_scenes({"chunk_7": make_scene(7, flags=["finale"])}, path)
+    rewritten = [f.name for f in terms_path_for(path).glob("bucket-*.json") if f.stat().st_mtime_ns]
+    assert len(rewritten) == 1
+    stored = InvertedIndex.load(path)
+    assert stored.query("flag:finale") == ["chunk_7"]
+    assert len(stored.query("flag:climax")) == 199
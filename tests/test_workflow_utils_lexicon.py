@@ -0,0 +1,23 @@
+# tests/test_workflow_utils_lexicon.py
+import re
+
+from workflow_utils_lexicon import token_matcher
+
+TEXTS = [
+    "She wore a pearl necklace; a soft moan escaped.",
+    "Handcuffs, not a cuff. Pearls, not a pearl?",
+    "",
+    "PEARL-collar (wrist) tie-tied",
+]
+KEYWORDS = ["pearl", "necklace", "cuff", "handcuff", "moan", "collar", "wrist", "tie", "co-star"]
+
+
+def test_token_matcher_matches_per_keyword_regex():
+    match = token_matcher(KEYWORDS)
+    for text in TEXTS:
+        expected = [k for k in KEYWORDS if re.search(rf"\b{re.escape(k)}\b", text.lower())]
+        assert match(text) == expected
+
+
+def test_token_matcher_is_memoized():
+    assert token_matcher(["a", "b"]) is token_matcher(("a", "b"))
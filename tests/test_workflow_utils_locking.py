@@ -0,0 +1,92 @@
+# tests/test_workflow_utils_locking.py
+import json
+import multiprocessing
+import threading
+
+import pytest
+
+from workflow_utils import update_passfile_scenes, read_passfile
+from workflow_utils_locking import GroupCommitWriter, passfile_lock
+
+
+def _worker(path, worker_id, n):
+    for i in range(n):
+        update_passfile_scenes({f"scene-{worker_id}-{i}": {"worker": worker_id, "i": i}}, path)
+
+
+def test_concurrent_processes_do_not_lose_scenes(tmp_path):
+    path = str(tmp_path / "passfile.json")
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_worker, args=(path, w, 10)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+    assert all(p.exitcode == 0 for p in procs)
+    assert len(read_passfile(path)) == 40
+
+
+def test_merge_fn_resolves_same_scene_updates(tmp_path):
+    path = str(tmp_path / "passfile.json")
+    union = lambda old, new: {"flags": sorted(set(old["flags"]) | set(new["flags"]))}
+    update_passfile_scenes({"s": {"flags": ["a"]}}, path, merge_fn=union)
+    update_passfile_scenes({"s": {"flags": ["b"]}}, path, merge_fn=union)
+    assert read_passfile(path)["s"]["flags"] == ["a", "b"]
+
+
+def test_group_commit_folds_concurrent_writers(tmp_path):
+    path = tmp_path / "passfile.json"
+    writer = GroupCommitWriter(path, max_delay=0.05)
+    barrier = threading.Barrier(16)
+
+    def commit(i):
+        barrier.wait()
+        writer.commit({f"scene-{i}": {"i": i}})
+
+    threads = [threading.Thread(target=commit, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+    assert len(json.loads(path.read_text())) == 16
+    assert writer.writes < 16
+
+
+def test_group_commit_reports_write_errors(tmp_path):
+    path = tmp_path / "passfile.json"
+    writer = GroupCommitWriter(path)
+    with pytest.raises(TypeError):
+        writer.commit({"s": object()})
+    writer.commit({"s": 1})
+    assert read_passfile(str(path)) == {"s": 1}
+
+
+def test_lock_timeout(tmp_path):
+    path = tmp_path / "passfile.json"
+    held = threading.Event()
+    release = threading.Event()
+
+    def holder():
+        with passfile_lock(path):
+            held.set()
+            release.wait(5)
+
+    t = threading.Thread(target=holder)
+    t.start()
+    held.wait(5)
+    try:
+        with pytest.raises(TimeoutError):
+            with passfile_lock(path, timeout=0.1):
+                pass
+    finally:
+        release.set()
+        t.join()
+
+
+@pytest.mark.parametrize("content", [b'{"a": {"x": 1}, "b": {"x"', b"\x1f\x8b\x08\x00truncated"])
+def test_unreadable_passfile_is_not_overwritten(tmp_path, content):
+    path = tmp_path / "passfile.json"
+    path.write_bytes(content)
+    with pytest.raises(Exception):
+        update_passfile_scenes({"s": {"i": 1}}, path)
+    assert path.read_bytes() == content
@@ -0,0 +1,90 @@
+# tests/test_workflow_utils_marketing_sink.py
+import threading
+
+import pytest
+
+from workflow_utils_marketing_sink import (
+    MarketingCopySink, close_marketing_sinks, get_marketing_sink,
+    marketing_copy_path_for, read_marketing_copy
+)
+
+
+def test_batches_on_size_and_reader_keeps_latest(tmp_path):
+    path = tmp_path / "copy.marketing.jsonl"
+    sink = MarketingCopySink(path, batch_size=4, flush_interval=60)
+    for i in range(8):
+        sink.save(f"s{i % 3}", {"refs": [i]})
+    sink.flush()
+    assert 1 <= sink.batches <= 2
+    assert len(path.read_text().splitlines()) == 8
+    assert read_marketing_copy(path) == {"s0": {"refs": [6]}, "s1": {"refs": [7]}, "s2": {"refs": [5]}}
+    sink.close()
+    with pytest.raises(RuntimeError):
+        sink.save("s0", {})
+
+
+def test_flush_on_interval(tmp_path):
+    path = tmp_path / "copy.marketing.jsonl"
+    sink = MarketingCopySink(path, batch_size=1000, flush_interval=0.05)
+    sink.save("s0", {"refs": ["a"]})
+    for _ in range(100):
+        if path.exists():
+            break
+        threading.Event().wait(0.02)
+    assert read_marketing_copy(path) == {"s0": {"refs": ["a"]}}
+    sink.close()
+
+
+def test_concurrent_writers(tmp_path):
+    sink = MarketingCopySink(tmp_path / "copy.marketing.jsonl", batch_size=16)
+
+    def work(n):
+        for i in range(50):
+            sink.save(f"w{n}-{i}", i)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    sink.close()
+    assert len(read_marketing_copy(sink.path)) == 200
+
+
+def test_write_error_surfaces_and_batch_is_retried(tmp_path):
+    path = tmp_path / "missing" / "copy.marketing.jsonl"
+    sink = MarketingCopySink(path, batch_size=1)
+    sink.save("s0", 1)
+    with pytest.raises(FileNotFoundError):
+        sink.flush()
+    path.parent.mkdir()
+    sink.flush()
+    sink.close()
+    assert read_marketing_copy(path) == {"s0": 1}
+
+
+def test_shared_sink_per_passfile_and_torn_line(tmp_path):
+    passfile = tmp_path / "passfile.json"
+    sink = get_marketing_sink(passfile)
+    assert get_marketing_sink(str(passfile)) is sink
+    sink.save("s0", {"refs": ["a"]})
+    close_marketing_sinks()
+    with open(marketing_copy_path_for(passfile), "a", encoding="utf-8") as f:
+        f.write('{"scene_uuid": "s1", "merch')
+    assert read_marketing_copy(passfile) == {"s0": {"refs": ["a"]}}
+    assert get_marketing_sink(passfile) is not sink
+    close_marketing_sinks()
+
+
+def test_failing_writes_back_off(tmp_path, caplog):
+    sink = MarketingCopySink(tmp_path, batch_size=1, flush_interval=0.1)  # a directory: every write fails
+    for i in range(5):
+        try:
+            sink.save(f"s{i}", i)
+        except OSError:
+            pass
+    threading.Event().wait(0.5)
+    failures = [r for r in caplog.records if "Failed to write marketing copy" in r.getMessage()]
+    assert 1 <= len(failures) <= 8
+    with pytest.raises(OSError):
+        sink.close()
@@ -0,0 +1,88 @@
+# tests/test_workflow_utils_merch_catalog.py
+import json
+import os
+
+import pytest
+
+import workflow_utils_merch_catalog
+from workflow_utils_merch_catalog import MerchCatalog, default_merch_catalog, get_merch_catalog, normalize_merch_ref
+
+CATALOG = {
+    "pearl-necklace": {"aliases": ["Pearl Necklace", "pearls_strand"], "sku": "P-1"},
+    "leather-cuffs-black": ["Black Leather Cuffs"],
+    "leather-cuffs-red": ["Red Leather Cuffs"],
+    "silk-tie": [],
+}
+
+
+def test_normalize():
+    assert normalize_merch_ref("  Leather_Cuffs (Black) ") == "leather-cuffs-black"
+    assert normalize_merch_ref(None) == ""
+
+
+def test_exact_alias_and_unique_prefix():
+    catalog = MerchCatalog(CATALOG)
+    assert catalog.canonicalize("PEARL necklace") == "pearl-necklace"
+    assert catalog.canonicalize("pearls strand") == "pearl-necklace"
+    assert catalog.canonicalize("black leather") == "leather-cuffs-black"
+    assert catalog.canonicalize("silk") == "silk-tie"
+    # Shared prefix of two items, too-short prefix, and no match at all
+    assert catalog.canonicalize("leather-cuffs") is None
+    assert catalog.canonicalize("si") is None
+    assert catalog.canonicalize("velvet rope") is None
+    assert "Silk Tie" in catalog and "rope" not in catalog
+    assert catalog.entries["pearl-necklace"]["sku"] == "P-1"
+
+
+def test_batch_reports_unknown_refs():
+    catalog = MerchCatalog(CATALOG)
+    report = catalog.canonicalize_batch({
+        "s1": ["Pearl Necklace", "pearl-necklace", "rope"],
+        "s2": ["Red Leather Cuffs"],
+        "s3": ["rope", 7],
+    })
+    assert report["refs"] == {"s1": ["pearl-necklace"], "s2": ["leather-cuffs-red"], "s3": []}
+    assert report["unknown"] == {"s1": ["rope"], "s3": ["rope", 7]}
+    assert report["unknown_counts"] == {"7": 1, "rope": 2}
+    assert report["prefix"] == {}
+
+
+def test_prefix_matches_reported_apart_from_exact():
+    catalog = MerchCatalog(CATALOG)
+    assert catalog.lookup("Pearl Necklace") == ("pearl-necklace", True)
+    assert catalog.lookup("pea") == ("pearl-necklace", False)
+    assert catalog.lookup("rope") == (None, False)
+    report = catalog.canonicalize_batch({"s1": ["pea", "Silk Tie"], "s2": ["silk tie"]})
+    assert report["refs"] == {"s1": ["pearl-necklace", "silk-tie"], "s2": ["silk-tie"]}
+    assert report["prefix"] == {"s1": {"pea": "pearl-necklace"}}
+    assert report["unknown"] == {}
+
+
+def test_canonicalize_passfile_in_place():
+    catalog = MerchCatalog(CATALOG)
+    pf = {"a": {"scene_metadata": {"merch_refs": ["silk tie", "x"]}},
+          "b": {"scene_metadata": {}}, "beat_list": []}
+    report = catalog.canonicalize_passfile(pf)
+    assert pf["a"]["scene_metadata"]["merch_refs"] == ["silk-tie"]
+    assert "merch_refs" not in pf["b"]["scene_metadata"]
+    assert report["unknown"] == {"a": ["x"]}
+
+
+def test_catalog_loaded_once_per_file_version(tmp_path):
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps(CATALOG))
+    catalog = get_merch_catalog(path)
+    assert get_merch_catalog(path) is catalog
+    path.write_text(json.dumps({"rope": []}))
+    os.utime(path, ns=(1, 1))
+    reloaded = get_merch_catalog(path)
+    assert reloaded is not catalog and reloaded.canonicalize("rope") == "rope"
+
+
+def test_missing_default_catalog(tmp_path, monkeypatch):
+    monkeypatch.setattr(workflow_utils_merch_catalog, "MERCH_CATALOG_PATH", tmp_path / "merch_catalog.json")
+    assert default_merch_catalog() is None
+    with pytest.raises(FileNotFoundError, match="merch_catalog.json"):
+        get_merch_catalog()
+    (tmp_path / "merch_catalog.json").write_text(json.dumps(CATALOG))
+    assert default_merch_catalog() is get_merch_catalog()
@@ -0,0 +1,116 @@
+# tests/test_workflow_utils_merkle.py
+import copy
+
+from workflow_utils import read_passfile, update_passfile_scenes, write_passfile
+from workflow_utils_merkle import (
+    MerkleIndex, _bucket_of, diff_passfiles, load_or_build_merkle_index, merkle_path_for
+)
+
+
+def make_scene(n, text="original"):
+    return {
+        "scene_uuid": f"scene-{n}",
+        "scene_text": text,
+        "beats": [{"beat_uuid": f"b{n}-{j}", "snippet": f"beat {j}"} for j in range(3)],
+        "micro_beats": [{"beat_uuid": f"b{n}-0", "micro_beat_index": 0}],
+        "refs": {"flag_refs": [f"flag-{n}"]},
+        "sections": {"connected_completion_arcs": ["arc-a"]},
+    }
+
+
+def make_passfile(count=50):
+    return {f"scene-{n}": make_scene(n) for n in range(count)}
+
+
+def test_identical_passfiles_have_equal_roots_and_no_diff():
+    a, b = MerkleIndex.build(make_passfile()), MerkleIndex.build(make_passfile())
+    assert a.root == b.root
+    assert a.diff(b) == []
+
+
+def test_diff_reports_exact_paths():
+    before = make_passfile()
+    after = copy.deepcopy(before)
+    after["scene-3"]["beats"][1]["snippet"] = "edited"
+    after["scene-7"]["refs"]["flag_refs"].append("flag-new")
+    after["scene-9"]["beats"].append({"beat_uuid": "b9-9", "snippet": "new"})
+    del after["scene-11"]
+    after["scene-99"] = make_scene(99)
+    changes = MerkleIndex.build(before).diff(MerkleIndex.build(after))
+    assert sorted(changes) == sorted([
+        (("scene-3", "beats", "b3-1", "snippet"), "changed"),
+        (("scene-7", "refs", "flag_refs", 1), "added"),
+        (("scene-9", "beats", "b9-9"), "added"),
+        (("scene-11",), "removed"),
+        (("scene-99",), "added"),
+    ])
+    assert MerkleIndex.build(before).changed_entries(MerkleIndex.build(after)) == {
+        "scene-3", "scene-7", "scene-9", "scene-11", "scene-99"
+    }
+
+
+def test_reordered_keyed_list_is_a_change():
+    before = make_passfile(1)
+    after = copy.deepcopy(before)
+    after["scene-0"]["beats"].reverse()
+    assert MerkleIndex.build(before).diff(MerkleIndex.build(after)) == [(("scene-0", "beats"), "changed")]
+
+
+def test_incremental_update_matches_full_build():
+    pf = make_passfile()
+    index = MerkleIndex.build(pf)
+    pf["scene-4"]["scene_text"] = "rewritten"
+    pf["scene-100"] = make_scene(100)
+    del pf["scene-5"]
+    index.update(pf, ["scene-4", "scene-5", "scene-100", "never-existed"])
+    rebuilt = MerkleIndex.build(pf)
+    assert index.root == rebuilt.root
+    assert index.buckets == rebuilt.buckets
+
+
+def test_sidecar_only_maintained_once_created(tmp_path):
+    path = tmp_path / "passfile.json"
+    write_passfile(make_passfile(), str(path))
+    assert not merkle_path_for(path).exists()
+
+    stored = load_or_build_merkle_index(path)
+    assert merkle_path_for(path).exists()
+    assert MerkleIndex.load(path).root == stored.root
+
+    update_passfile_scenes({"scene-2": make_scene(2, text="changed")}, path)
+    refreshed = MerkleIndex.load(path)
+    assert refreshed is not None
+    assert refreshed.root == MerkleIndex.build(read_passfile(str(path))).root
+    assert stored.changed_entries(refreshed) == {"scene-2"}
+
+
+def test_stale_sidecar_is_ignored_and_rebuilt(tmp_path):
+    path = tmp_path / "passfile.json"
+    pf = make_passfile(5)
+    write_passfile(pf, str(path))
+    load_or_build_merkle_index(path)
+    path.write_text("{}", encoding="utf-8")  # written behind the index's back
+    assert MerkleIndex.load(path) is None
+    assert load_or_build_merkle_index(path).entries == {}
+
+
+def test_diff_passfiles_on_disk(tmp_path):
+    a, b = tmp_path / "a.json", tmp_path / "b.json"
+    pf = make_passfile(10)
+    write_passfile(pf, str(a))
+    pf["scene-1"]["scene_text"] = "other"
+    write_passfile(pf, str(b))
+    assert diff_passfiles(a, b) == [(("scene-1", "scene_text"), "changed")]
+
+
+def test_update_rewrites_only_touched_buckets(tmp_path):
+    path = tmp_path / "passfile.json"
+    write_passfile(make_passfile(), str(path))
+    load_or_build_merkle_index(path)
+    sidecar = merkle_path_for(path)
+    before = {f.name: f.stat().st_mtime_ns for f in sidecar.glob("bucket-*.json")}
+    update_passfile_scenes({"scene-2": make_scene(2, text="changed")}, path)
+    after = {f.name: f.stat().st_mtime_ns for f in sidecar.glob("bucket-*.json")}
+    assert after.keys() == before.keys()
+    assert [name for name in after if after[name] != before[name]] == ["bucket-%02x.json" % _bucket_of("scene-2")]
+    assert MerkleIndex.load(path).entries == MerkleIndex.build(read_passfile(str(path))).entries
@@ -0,0 +1,68 @@
+# tests/test_workflow_utils_passfile_index.py
+import json
+import os
+
+import pytest
+
+from workflow_utils import read_passfile, write_passfile
+from workflow_utils_passfile_index import LazyPassfile, index_path_for, scan_top_level_spans
+
+
+def sample_passfile():
+    return {
+        "scene-a": {"scene_text": "Sophie’s office — café au lait", "beats": [{"beat_uuid": "b1"}]},
+        "scene-b": {"scene_text": "pearls\n\"quoted\"", "refs": {"flag_refs": ["x"]}},
+        "scene_text": "top-level string",
+        "count": 3,
+        "nothing": None,
+        "flags": [True, False],
+    }
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_spans_decode_to_the_same_values(indent):
+    data = sample_passfile()
+    raw = json.dumps(data, ensure_ascii=False, indent=indent).encode("utf-8")
+    spans = scan_top_level_spans(raw)
+    assert list(spans) == list(data)
+    for key, (start, end) in spans.items():
+        assert json.loads(raw[start:end]) == data[key]
+
+
+def test_lazy_passfile_behaves_like_the_dict(tmp_path):
+    path = tmp_path / "passfile.json"
+    write_passfile(sample_passfile(), str(path))
+    with read_passfile(str(path), lazy=True) as lazy:
+        assert isinstance(lazy, LazyPassfile)
+        assert dict(lazy) == read_passfile(str(path))
+        assert "scene-b" in lazy and "missing" not in lazy
+        assert lazy.get("missing") is None
+        assert lazy.get_many(["scene-a", "missing"]) == {"scene-a": sample_passfile()["scene-a"]}
+    assert index_path_for(path).exists()
+
+
+def test_index_is_reused_and_rebuilt_on_change(tmp_path):
+    path = tmp_path / "passfile.json"
+    write_passfile(sample_passfile(), str(path))
+    LazyPassfile(path).close()
+    idx = json.loads(index_path_for(path).read_text())
+
+    lazy = LazyPassfile(path)
+    assert lazy["count"] == 3
+    data = sample_passfile()
+    data["scene-c"] = {"scene_text": "new"}
+    data["count"] = 4
+    write_passfile(data, str(path))
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert lazy["count"] == 4
+    assert lazy["scene-c"] == {"scene_text": "new"}
+    assert json.loads(index_path_for(path).read_text())["size"] != idx["size"]
+    lazy.close()
+
+
+def test_missing_and_empty_passfiles(tmp_path):
+    assert len(LazyPassfile(tmp_path / "missing.json")) == 0
+    path = tmp_path / "empty.json"
+    path.write_text("{}")
+    assert dict(LazyPassfile(path)) == {}
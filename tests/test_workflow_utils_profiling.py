@@ -0,0 +1,65 @@
+# tests/test_workflow_utils_profiling.py
+import json
+import tracemalloc
+
+from workflow_utils import merge_passfile_chunks
+from workflow_utils_profiling import (
+    MemoryProfiler, get_memory_profiler, memory_profiling, memory_stage
+)
+
+
+def test_memory_stage_is_a_no_op_when_off():
+    assert get_memory_profiler() is None
+    with memory_stage("anything"):
+        pass
+    assert memory_stage("a") is memory_stage("b")
+
+
+def test_peak_and_retained_per_stage(tmp_path):
+    report_path = tmp_path / "memory.json"
+    kept = []
+    with memory_profiling(report_path, top_n=3) as profiler:
+        with memory_stage("transient"):
+            scratch = bytearray(2_000_000)
+            del scratch
+        with memory_stage("retained"):
+            kept.append(bytearray(1_000_000))
+    assert not tracemalloc.is_tracing()
+    assert get_memory_profiler() is None
+
+    report = json.loads(report_path.read_text())
+    transient, retained = report["stages"]["transient"], report["stages"]["retained"]
+    assert transient["calls"] == 1
+    assert transient["peak_bytes"] >= 2_000_000
+    assert transient["retained_bytes"] < 100_000
+    assert 1_000_000 <= retained["retained_bytes"] < 1_100_000
+    top = retained["top_allocations"][0]
+    assert "test_workflow_utils_profiling.py:" in top["site"]
+    assert top["size_bytes"] >= 1_000_000
+    assert profiler.report()["stages"].keys() == report["stages"].keys()
+
+
+def test_nested_stage_peak_rolls_up_to_parent():
+    profiler = MemoryProfiler(top_n=0)
+    profiler.start()
+    try:
+        with profiler.stage("outer"):
+            with profiler.stage("inner"):
+                scratch = bytearray(3_000_000)
+                del scratch
+            small = bytearray(10_000)
+        del small
+    finally:
+        profiler.stop()
+    assert profiler.stages["inner"]["peak_bytes"] >= 3_000_000
+    assert profiler.stages["outer"]["peak_bytes"] >= profiler.stages["inner"]["peak_bytes"]
+
+
+def test_merge_stages_reported(tmp_path):
+    chunks = [{"scene_metadata": {"book_code": "B", "part": "1", "episode": "1", "scene": str(i)},
+               "scene_text": "text " * 100} for i in range(5)]
+    with memory_profiling() as profiler:
+        merge_passfile_chunks(chunks, str(tmp_path / "passfile.json"))
+    stages = profiler.stages
+    for name in ("merge.validate", "merge.read", "merge.apply", "merge.write"):
+        assert stages[name]["calls"] == 1
@@ -0,0 +1,92 @@
+# tests/test_workflow_utils_schema.py
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from jsonschema import validate as jsonschema_validate, ValidationError
+
+from workflow_utils_schema import (
+    SCHEMA_PATH,
+    get_schema_validator,
+    load_schema,
+    validation_error_type,
+)
+
+
+def test_schema_path_points_at_repo_schema():
+    assert SCHEMA_PATH.exists()
+    assert load_schema()["title"] == "Passfile Scene Record"
+
+
+def test_validator_matches_generic_jsonschema(tmp_path):
+    schema = load_schema()
+    validator = get_schema_validator(SCHEMA_PATH, cache_dir=tmp_path)
+    bad = {"scene_text": 3}
+    with pytest.raises(ValidationError) as generic:
+        jsonschema_validate(instance=bad, schema=schema)
+    with pytest.raises(validation_error_type()) as cached:
+        validator.validate(bad)
+    assert str(generic.value) == str(cached.value)
+
+
+def test_checked_marker_written_once(tmp_path):
+    schema_copy = tmp_path / "schema.json"
+    schema_copy.write_text(json.dumps(load_schema()))
+    get_schema_validator(schema_copy, cache_dir=tmp_path / "cache")
+    assert len(list((tmp_path / "cache").glob("schema-*.checked"))) == 1
+
+
+def test_default_cache_dir_does_not_follow_cwd(tmp_path, monkeypatch):
+    from workflow_utils_schema import PIPELINE_CACHE_DIR
+    assert PIPELINE_CACHE_DIR.is_absolute()
+    monkeypatch.chdir(tmp_path)
+    schema_copy = tmp_path / "schema.json"
+    schema_copy.write_text(json.dumps(dict(load_schema(), description="cwd check")))
+    get_schema_validator(schema_copy, compiled=False)
+    assert not (tmp_path / ".pipeline_cache").exists()
+
+
+def test_importing_workflow_utils_does_not_import_jsonschema():
+    root = Path(__file__).resolve().parent.parent
+    code = "import sys, workflow_utils; print('jsonschema' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=root, capture_output=True, text=True,
+        env={"PYTHONPATH": str(root / "workflow")},
+    )
+    assert out.stdout.strip() == "False", out.stderr
+
+
+def test_minimal_canonical_validates_dirty_subtrees_only(tmp_path):
+    from workflow_utils import validate_minimal_canonical
+
+    uuid = "6f1f5a8e-8d1a-5c54-9e3e-6f2b1a9c0d11"
+    schema = load_schema()
+    schema["properties"]["scene_uuid"] = {"type": "string"}
+    schema["properties"]["folder_map"] = {"type": "object"}
+    schema_path = tmp_path / "schema.json"
+    schema_path.write_text(json.dumps(schema))
+    record = {
+        "scene_metadata": {"book_code": "B", "part": "1", "episode": "1", "scene": "1", "scene_uuid": uuid},
+        "scene_text": "t", "beats": [{"beat_uuid": uuid}],  # missing snippet
+        "sections": {"emotional_arc": {}, "erotic_arc": {}, "pacing_strategy_notes": {},
+                     "connected_completion_arcs": [], "trinity_advisory": {}},
+        "refs": {"scene_uuid": uuid, "insert_advisory_refs": [], "flag_refs": []},
+        "scene_uuid": uuid, "core_identifier": "B_P1_E1_S1",
+    }
+    assert validate_minimal_canonical([record], schema_path=schema_path) == []
+    [kept] = validate_minimal_canonical([record], schema_path=schema_path, dirty={uuid: ["refs"]})
+    assert kept["beats"] is record["beats"]
+    assert validate_minimal_canonical([record], schema_path=schema_path, dirty={uuid: ["beats"]}) == []
+    # Fields filled in by the defaults are checked even when not marked dirty
+    del record["refs"]
+    record["beats"][0]["snippet"] = "s"
+    assert validate_minimal_canonical([record], schema_path=schema_path, dirty={uuid: []}) == []
+    # Nothing dirty and nothing filled in: the record is taken as still valid
+    record["refs"] = {"scene_uuid": uuid, "insert_advisory_refs": [], "flag_refs": []}
+    record["folder_map"] = {}
+    del record["beats"][0]["snippet"]
+    assert len(validate_minimal_canonical([record], schema=schema, dirty={uuid: []})) == 1
+    assert validate_minimal_canonical([record], schema=schema, dirty={uuid: ["beats"]}) == []
@@ -0,0 +1,95 @@
+# tests/test_workflow_utils_sketches.py
+import json
+import random
+from collections import Counter
+
+import pytest
+
+from workflow_utils_sketches import BeatStatistics, CountMinSketch, HeavyHitters, QuantileSketch
+
+
+def zipf_stream(rng, n, keys=500):
+    weights = [1 / (i + 1) for i in range(keys)]
+    return rng.choices([f"k{i}" for i in range(keys)], weights=weights, k=n)
+
+
+def test_count_min_within_bound_and_mergeable():
+    rng = random.Random(1)
+    stream = zipf_stream(rng, 20000)
+    exact = Counter(stream)
+    left, right = CountMinSketch(width=256, depth=4), CountMinSketch(width=256, depth=4)
+    for i, key in enumerate(stream):
+        (left if i % 2 else right).add(key)
+    merged = left.merge(right)
+    assert merged.total == len(stream)
+    bound = merged.error_bound()
+    over = [merged.estimate(k) - c for k, c in exact.items()]
+    assert min(over) >= 0
+    assert sum(o > bound for o in over) <= 0.05 * len(over)
+    with pytest.raises(ValueError):
+        merged.merge(CountMinSketch(width=128, depth=4))
+
+
+def test_heavy_hitters_keep_frequent_keys():
+    rng = random.Random(2)
+    stream = zipf_stream(rng, 20000)
+    exact = Counter(stream)
+    parts = [HeavyHitters(k=20) for _ in range(3)]
+    for i, key in enumerate(stream):
+        parts[i % 3].add(key)
+    merged = parts[0].merge(parts[1]).merge(parts[2])
+    assert len(merged.counters) <= 20
+    bound = merged.error_bound()
+    for key, c in exact.items():
+        if c > bound:
+            assert key in merged.counters
+    for key, c in merged.counters.items():
+        assert exact[key] - bound <= c <= exact[key]
+    assert merged.top(1)[0][0] == "k0"
+
+
+def test_quantiles_within_relative_accuracy():
+    rng = random.Random(3)
+    values = [0.0] * 50 + [rng.lognormvariate(0, 1.5) for _ in range(5000)]
+    a, b = QuantileSketch(0.02), QuantileSketch(0.02)
+    for i, v in enumerate(values):
+        (a if i % 2 else b).add(v)
+    sketch = QuantileSketch.from_dict(json.loads(json.dumps(a.merge(b).to_dict())))
+    ordered = sorted(values)
+    for q in (0.0, 0.005, 0.1, 0.5, 0.9, 0.99, 1.0):
+        exact = ordered[int(q * (len(values) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.02, abs=1e-12)
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_quantile_bins_bounded():
+    sketch = QuantileSketch(0.01, max_bins=64)
+    for i in range(1, 10000):
+        sketch.add(i * 1.37)
+    assert len(sketch.bins) <= 64
+    assert sketch.quantile(0.99) == pytest.approx(9899 * 1.37, rel=0.01)
+
+
+def test_beat_statistics_from_scene_records():
+    record = {
+        "micro_beats": [
+            {"beat_uuid": "synthetic_0", "text": "erotic gaze and erotic voice", "keyword_counts": {"erotic": 2, "gaze": 1, "voice": 1}},
+            {"beat_uuid": "synthetic_1", "text": "", "keyword_counts": {}},
+        ],
+        "sections": {"pacing_strategy_notes": {"synthetic_0": "steady", "synthetic_1": "steady"},
+                     "trinity_advisory": {"pearls_detected": ["pearl"], "moan_detected": ["moan", "gasp"]}},
+    }
+    books = []
+    for _ in range(2):
+        stats = BeatStatistics(width=64, depth=3)
+        stats.add_scene_record(record)
+        books.append(BeatStatistics.from_dict(json.loads(json.dumps(stats.to_dict()))))
+    merged = books[0].merge(books[1])
+    summary = merged.summary(top_n=2)
+    assert summary["beats"] == 4 and summary["scenes"] == 2
+    assert summary["top"]["keyword"][0] == ["erotic", 4]
+    assert summary["top"]["pacing"] == [["steady", 4]]
+    assert merged.estimate("cue", "gasp") >= 2
+    assert summary["beat_length"]["0.99"] == pytest.approx(5, rel=0.01)
+    assert summary["keyword_density"]["0.5"] == 0.0
+    assert 0 < summary["error_bounds"]["count_confidence"] < 1
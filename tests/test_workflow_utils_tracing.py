@@ -0,0 +1,83 @@
+# tests/test_workflow_utils_tracing.py
+import json
+import os
+
+from pipeline_stages import Stage, StagedExecutor
+from workflow_utils import merge_passfile_chunks
+from workflow_utils_merge_v5_13 import merge_chunks_v5_13
+from workflow_utils_tracing import get_tracer, trace_iter, trace_span, tracing
+
+
+def double(x):
+    with trace_span("inner", value=x):
+        return x * 2
+
+
+def spans(tracer, name):
+    return [e for e in tracer.trace_events() if e["ph"] == "X" and e["name"] == name]
+
+
+def chunks(n):
+    return [{"scene_metadata": {"book_code": "B", "part": "1", "episode": "1", "scene": str(i)},
+             "scene_text": f"text {i}"} for i in range(n)]
+
+
+def test_off_by_default_and_no_op():
+    assert get_tracer() is None
+    items = [1, 2, 3]
+    assert trace_iter(items, "loop") is items
+    assert trace_span("a") is trace_span("b")
+
+
+def test_trace_file_is_chrome_trace_json(tmp_path):
+    path = tmp_path / "trace.json"
+    with tracing(path):
+        with trace_span("outer", chunk=1):
+            for _ in trace_iter(range(3), "step"):
+                pass
+    events = json.loads(path.read_text())["traceEvents"]
+    complete = [e for e in events if e["ph"] == "X"]
+    assert [e["name"] for e in complete] == ["outer", "step", "step", "step"]
+    outer = complete[0]
+    assert outer["args"] == {"chunk": 1} and outer["pid"] == os.getpid()
+    assert all(outer["ts"] <= e["ts"] and e["ts"] + e["dur"] <= outer["ts"] + outer["dur"] for e in complete[1:])
+    assert [e["args"]["index"] for e in complete[1:]] == [0, 1, 2]
+    assert {e["name"] for e in events if e["ph"] == "M"} == {"process_name", "thread_name"}
+
+
+def test_span_marks_errors_but_not_early_loop_exit():
+    with tracing() as tracer:
+        try:
+            with trace_span("fails"):
+                raise KeyError("x")
+        except KeyError:
+            pass
+        for _ in trace_iter(range(5), "loop"):
+            break
+    assert spans(tracer, "fails")[0]["args"] == {"error": "KeyError"}
+    assert spans(tracer, "loop")[0]["args"] == {"index": 0}
+
+
+def test_merge_spans(tmp_path):
+    with tracing() as tracer:
+        merge_passfile_chunks(chunks(3), str(tmp_path / "passfile.json"))
+        merge_chunks_v5_13({}, chunks(2))
+    for name in ("merge.validate", "merge.read", "merge.apply", "merge.write",
+                 "merge_v5_13.chunks", "merge_v5_13.order"):
+        assert len(spans(tracer, name)) == 1, name
+    assert len(spans(tracer, "merge.chunk")) == 3
+    assert len(spans(tracer, "merge_v5_13.chunk")) == 2
+
+
+def test_worker_process_spans_are_collected():
+    with tracing() as tracer:
+        executor = StagedExecutor([Stage("double", double, workers=2, processes=True),
+                                   Stage("collect", lambda x: x, ordered=True)])
+        assert executor.run(range(4)) == [0, 2, 4, 6]
+    worker = spans(tracer, "double")
+    assert len(worker) == 4 and all(e["pid"] != os.getpid() for e in worker)
+    assert sorted(e["args"]["seq"] for e in worker) == [0, 1, 2, 3]
+    assert len(spans(tracer, "inner")) == 4
+    assert {e["pid"] for e in spans(tracer, "collect")} == {os.getpid()}
+    names = [e for e in tracer.trace_events() if e["name"] == "process_name"]
+    assert any(e["args"]["name"].startswith("worker ") for e in names)
@@ -3,12 +3,23 @@
 # Added: optional strict validation, test scaffolding notes
 # -----------------------
 import re, uuid, json, logging, tempfile, shutil
+from collections import deque
 from pathlib import Path
 from copy import deepcopy
-from typing import List, Dict, Any, Optional, Union
-from jsonschema import validate as jsonschema_validate, ValidationError
-
-logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
+from workflow_utils_cache import get_analysis_cache, lexicon_version
+from workflow_utils_lexicon import token_matcher
+from workflow_utils_schema import get_schema_validator, get_schema_validator_for, validate_parts, validation_error_type
+from workflow_utils_locking import passfile_lock, fold_updates, MergeFn
+from workflow_utils_passfile_index import LazyPassfile
+from workflow_utils_compression import (
+    codec_for_path, detect_codec, open_compressed, dump_passfile_stream, load_passfile_stream
+)
+from workflow_utils_merkle import MerkleRefresh
+from workflow_utils_inverted_index import InvertedIndexRefresh
+from workflow_utils_profiling import memory_stage
+from workflow_utils_blobs import is_blob_key, pack_passfile, unpack_passfile
+from workflow_utils_tracing import trace_iter, trace_span
 
 # -----------------------
 # Constants
@@ -63,29 +74,42 @@ def generate_core_identifier(scene_metadata: Dict[str, Any]) -> str:
 # -----------------------
 # Canonical Validator & Passfile I/O
 # -----------------------
+def record_scene_uuid(rec: Dict[str, Any]) -> str:
+    # The key validate_minimal_canonical (and its dirty map) identifies a record by
+    return rec.get("scene_uuid") or generate_scene_uuid_from_metadata(rec.get("scene_metadata", {}))
+
 def validate_minimal_canonical(scene_records: Union[Dict[str, Any], List[Dict[str, Any]]],
                                schema_path: Optional[Path] = SCHEMA_PATH,
                                merge: bool = False,
-                               raise_on_invalid: bool = False) -> Union[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+                               raise_on_invalid: bool = False,
+                               dirty: Optional[Dict[str, Iterable[str]]] = None,
+                               schema: Optional[Dict[str, Any]] = None) -> Union[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    # schema: in-memory schema to validate against instead of schema_path
+    # dirty: record_scene_uuid -> top-level fields a merge/pipeline step changed. Those records
+    # are shallow-copied and only their dirty subtrees (plus record-level checks) validated;
+    # a record with nothing dirty is taken as still valid. uuid uniqueness is still checked
+    # across every record.
     single_input = isinstance(scene_records, dict)
     records = [scene_records] if single_input else scene_records
     validated = {}
     seen_uuids = set()
 
-    schema = None
-    if schema_path and schema_path.exists():
+    validator = None
+    if schema is not None or (schema_path and schema_path.exists()):
         try:
-            with open(schema_path) as f:
-                schema = json.load(f)
+            validator = get_schema_validator_for(schema) if schema is not None else get_schema_validator(schema_path)
         except Exception as e:
             logging.error(f"Failed to load schema: {e}")
             if raise_on_invalid:
                 raise
 
     for rec in records:
-        rec_copy = deepcopy(rec)
+        scene_uuid = record_scene_uuid(rec)
+        dirty_fields = dirty.get(scene_uuid) if dirty else None
+        # Defaults only add top-level keys, so a shallow copy is enough for a partial check
+        rec_copy = dict(rec) if dirty_fields is not None else deepcopy(rec)
         metadata = rec_copy.get("scene_metadata", {})
-        rec_copy.setdefault("scene_uuid", generate_scene_uuid_from_metadata(metadata))
+        rec_copy.setdefault("scene_uuid", scene_uuid)
         rec_copy.setdefault("core_identifier", metadata.get("core_identifier", "unknown_core"))
         rec_copy.setdefault("refs", {"flag_refs": [], "insert_advisory_refs": [], "feedback_summary_ref": []})
         rec_copy.setdefault("folder_map", {})
@@ -95,10 +119,16 @@ def validate_minimal_canonical(scene_records: Union[Dict[str, Any], List[Dict[st
             continue
         seen_uuids.add(rec_copy["scene_uuid"])
 
-        if schema:
+        if validator:
             try:
-                jsonschema_validate(instance=rec_copy, schema=schema)
-            except ValidationError as e:
+                if dirty_fields is not None:
+                    # Fields filled in above are new to the record, so they count as dirty too
+                    changed = set(dirty_fields) | (rec_copy.keys() - rec.keys())
+                    if changed:
+                        validate_parts(validator, rec_copy, changed)
+                else:
+                    validator.validate(rec_copy)
+            except validation_error_type() as e:
                 logging.error(f"Schema validation failed for scene_uuid {rec_copy['scene_uuid']}: {e}")
                 if raise_on_invalid:
                     raise
@@ -108,18 +138,78 @@ def validate_minimal_canonical(scene_records: Union[Dict[str, Any], List[Dict[st
 
     return next(iter(validated.values()), {}) if single_input else (validated if merge else list(validated.values()))
 
-def read_passfile(path: Optional[str] = None) -> Dict[str, Any]:
+def _load_stored_passfile(p: Path) -> Optional[Dict[str, Any]]:
+    # On-disk form (text blobs unresolved); None when the file doesn't exist
+    try:
+        codec = detect_codec(p)
+    except FileNotFoundError:
+        return None
+    if codec:
+        with open_compressed(p, "rb", codec) as f:
+            return load_passfile_stream(f)
+    with open(p, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def load_passfile(path: Optional[str] = None) -> Dict[str, Any]:
+    # Strict read for read-modify-write: a missing file is empty, anything
+    # unreadable (bad JSON, truncated or corrupt compressed data, I/O errors) raises
+    stored = _load_stored_passfile(Path(path) if path else PASSFILE_PATH)
+    return unpack_passfile(stored) if stored is not None else {}
+
+def load_passfile_for_rewrite(path: Optional[str] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # load_passfile plus the write_passfile options that keep its stored format
+    # (codec and text blobs), so a rewrite doesn't silently inline or decompress it
     p = Path(path) if path else PASSFILE_PATH
+    stored = _load_stored_passfile(p)
+    if stored is None:
+        return {}, {"compression": None, "dedupe_text": False}
+    dedupe_text = any(is_blob_key(key) for key in stored)
+    return unpack_passfile(stored), {"compression": stored_compression(p), "dedupe_text": dedupe_text}
+
+def stored_compression(path: Optional[str] = None) -> Optional[str]:
+    # The codec an existing passfile is stored with ("none" for plain JSON), for
+    # rewrites to keep; None when the file doesn't exist yet (write_passfile then
+    # picks the codec from the extension)
     try:
-        if p.exists():
-            with open(p, "r", encoding="utf-8") as f:
-                return json.load(f)
+        return detect_codec(Path(path) if path else PASSFILE_PATH) or "none"
+    except FileNotFoundError:
+        return None
+
+def read_passfile(path: Optional[str] = None, lazy: bool = False) -> Union[Dict[str, Any], LazyPassfile]:
+    # lazy=True: read-only Mapping that decodes scenes on demand via a byte-offset index
+    # gzip/lzma/zlib passfiles are detected from their magic bytes and decoded as a stream
+    # Text blobs (see write_passfile dedupe_text) are resolved to shared, interned strings
+    # Errors are logged and read as an empty passfile; rewrites use load_passfile instead
+    p = Path(path) if path else PASSFILE_PATH
+    if lazy:
+        try:
+            codec = detect_codec(p) if p.exists() else None
+        except OSError as e:
+            logging.error(f"Failed to read passfile {p}: {e}")
+            return {}
+        if codec:
+            raise ValueError(f"Lazy reads need an uncompressed passfile; {p} is {codec}-compressed")
+        return LazyPassfile(p)
+    try:
+        return load_passfile(p)
     except Exception as e:
         logging.error(f"Failed to read passfile {p}: {e}")
     return {}
 
-def write_passfile(data: Dict[str, Any], path: Optional[str] = None, overwrite: bool = True) -> None:
+def write_passfile(data: Dict[str, Any], path: Optional[str] = None, overwrite: bool = True,
+                   compression: Optional[str] = None, compact: bool = False,
+                   changed: Optional[Iterable[str]] = None, dedupe_text: bool = False) -> None:
+    # compression: None = by extension (.gz/.xz/.lzma/.zz/.zlib), "none", "gzip", "lzma" or "zlib"
+    # compact=True drops the indent
+    # changed: top-level keys modified since the last write; lets existing
+    # sidecar indexes (.merkle/, .terms.json) be refreshed incrementally instead of rebuilt
+    # dedupe_text=True stores each long scene_text / snippet / text once, content-addressed;
+    # the lock-holding rewrites (update_passfile_scenes etc.) keep whatever the file already uses
     p = Path(path) if path else PASSFILE_PATH
+    codec = codec_for_path(p, compression)
+    changed = list(changed) if changed is not None else None
+    payload = pack_passfile(data) if dedupe_text else data
+    sidecars = [MerkleRefresh(p), InvertedIndexRefresh(p)]
     tmp_file = None
     try:
         if p.exists() and not overwrite:
@@ -127,11 +217,19 @@ def write_passfile(data: Dict[str, Any], path: Optional[str] = None, overwrite:
             p.rename(backup_path)
             logging.info(f"Existing passfile backed up to {backup_path}")
 
-        tmp_file = tempfile.NamedTemporaryFile("w", delete=False, dir=p.parent, encoding="utf-8")
-        json.dump(data, tmp_file, ensure_ascii=False, indent=2)
-        tmp_file.close()
+        if codec or compact:
+            tmp_file = tempfile.NamedTemporaryFile("wb", delete=False, dir=p.parent)
+            tmp_file.close()
+            with (open_compressed(tmp_file.name, "wb", codec) if codec else open(tmp_file.name, "wb")) as f:
+                dump_passfile_stream(payload, f, compact=compact)
+        else:
+            tmp_file = tempfile.NamedTemporaryFile("w", delete=False, dir=p.parent, encoding="utf-8")
+            json.dump(payload, tmp_file, ensure_ascii=False, indent=2)
+            tmp_file.close()
         shutil.move(tmp_file.name, p)
         logging.info(f"Passfile written successfully to {p}")
+        for sidecar in sidecars:
+            sidecar.apply(data, changed)
     except Exception as e:
         logging.error(f"Failed to write passfile {p}: {e}")
         if tmp_file:
@@ -141,38 +239,66 @@ def write_passfile(data: Dict[str, Any], path: Optional[str] = None, overwrite:
 
 def write_passfile_strict(key: str, data: Any, path: Optional[str] = None, overwrite: bool = True) -> None:
     try:
-        pf = read_passfile(path)
-        pf[key] = data
-        write_passfile(pf, path, overwrite=overwrite)
+        with passfile_lock(Path(path) if path else PASSFILE_PATH):
+            pf, stored = load_passfile_for_rewrite(path)
+            pf[key] = data
+            write_passfile(pf, path, overwrite=overwrite, changed=[key], **stored)
     except Exception as e:
         logging.error(f"Failed to write key '{key}' to passfile: {e}")
         raise
 
+def update_passfile_scenes(updates: Dict[str, Any],
+                           path: Optional[str] = None,
+                           merge_fn: Optional[MergeFn] = None) -> Dict[str, Any]:
+    """
+    Apply scene-level updates to the current on-disk passfile under the passfile lock.
+    Scenes written by other workers since our last read are preserved; merge_fn
+    (existing, incoming) -> record resolves updates to the same scene. A passfile
+    that can't be read raises instead of being overwritten with only the updates.
+    """
+    p = Path(path) if path else PASSFILE_PATH
+    with passfile_lock(p):
+        pf, stored = load_passfile_for_rewrite(p)
+        fold_updates(pf, updates, merge_fn)
+        write_passfile(pf, p, overwrite=True, changed=updates.keys(), **stored)
+    return pf
+
+def update_passfile_scene_record(path: Optional[str], scene_record: Dict[str, Any],
+                                 merge_fn: Optional[MergeFn] = None) -> Dict[str, Any]:
+    return update_passfile_scenes({scene_record["scene_uuid"]: scene_record}, path, merge_fn=merge_fn)
+
 def merge_passfile_chunks(chunks: List[Dict[str, Any]],
                           path: Optional[str] = None,
                           overwrite_existing: bool = False) -> None:
     pf_path = Path(path) if path else PASSFILE_PATH
-    passfile_data = read_passfile(pf_path)
     try:
-        validated_chunks = validate_minimal_canonical(chunks, merge=True)
+        with memory_stage("merge.validate"), trace_span("merge.validate"):
+            validated_chunks = validate_minimal_canonical(chunks, merge=True)
     except Exception as e:
         logging.error(f"Validation failed during merge: {e}")
         return
 
-    for scene_uuid, chunk in validated_chunks.items():
-        if scene_uuid in passfile_data:
-            if overwrite_existing:
-                logging.info(f"Overwriting existing scene_uuid {scene_uuid}.")
-            else:
-                logging.warning(f"Scene UUID {scene_uuid} exists. Skipping merge.")
-                continue
-        passfile_data[scene_uuid] = chunk
+    with passfile_lock(pf_path):
+        with memory_stage("merge.read"), trace_span("merge.read"):
+            passfile_data, stored = load_passfile_for_rewrite(pf_path)
+        written = []
+        with memory_stage("merge.apply"), trace_span("merge.apply"):
+            for scene_uuid, chunk in trace_iter(validated_chunks.items(), "merge.chunk", lambda kv: {"scene_uuid": kv[0]}):
+                if scene_uuid in passfile_data:
+                    if overwrite_existing:
+                        logging.info(f"Overwriting existing scene_uuid {scene_uuid}.")
+                    else:
+                        logging.warning(f"Scene UUID {scene_uuid} exists. Skipping merge.")
+                        continue
+                passfile_data[scene_uuid] = chunk
+                written.append(scene_uuid)
 
-    try:
-        write_passfile(passfile_data, pf_path, overwrite=True)
-    except Exception as e:
-        logging.error(f"Failed to write merged passfile: {e}")
-        raise
+        try:
+            with memory_stage("merge.write"), trace_span("merge.write"):
+                write_passfile(passfile_data, pf_path, overwrite=True, changed=written, **stored)
+        except Exception as e:
+            logging.error(f"Failed to write merged passfile: {e}")
+            raise
 
 # -----------------------
 # Micro-Beat, Arc & Continuity Utilities
@@ -190,22 +316,33 @@ def assign_micro_beat_uuids(beats: List[Dict[str, Any]], scene_metadata: Dict[st
             )
     return beats
 
+def _arc_counts(snippet: str) -> List[int]:
+    s = (snippet or "").lower()
+    return [
+        sum(1 for w in TRINITY_TOKENS["pearls"] if w in s),
+        sum(1 for w in TRINITY_TOKENS["moan"] if w in s),
+        sum(1 for w in EROTIC_PHYSIOLOGY if w in s)
+    ]
+
+def arc_counts_for(beats: List[Dict[str, Any]]) -> List[List[int]]:
+    # [dominance, emotion, erotic] keyword counts per beat snippet
+    cache = get_analysis_cache()
+    version = lexicon_version(TRINITY_TOKENS["pearls"], TRINITY_TOKENS["moan"], EROTIC_PHYSIOLOGY)
+    return [cache.get_or_compute("arc_counts", b.get("snippet") or "", version, _arc_counts) for b in beats]
+
 def compute_arcs(beats: List[Dict[str, Any]],
                  thresholds: Optional[Dict[str,float]] = None,
                  normalize_across: str = "chunk") -> List[Dict[str, Any]]:
     thresholds = thresholds or {"dominance":0.5, "emotion":0.5, "erotic":0.5}
     n = max(1, len(beats))
+    counts = arc_counts_for(beats)
     
-    total_dom = sum(sum(1 for w in TRINITY_TOKENS["pearls"] if w in (b.get("snippet") or "").lower()) for b in beats)
-    total_emo = sum(sum(1 for w in TRINITY_TOKENS["moan"] if w in (b.get("snippet") or "").lower()) for b in beats)
-    total_erot = sum(sum(1 for w in EROTIC_PHYSIOLOGY if w in (b.get("snippet") or "").lower()) for b in beats)
+    total_dom = sum(c[0] for c in counts)
+    total_emo = sum(c[1] for c in counts)
+    total_erot = sum(c[2] for c in counts)
     
     arcs = []
-    for i, b in enumerate(beats):
-        dom_count = sum(1 for w in TRINITY_TOKENS["pearls"] if w in (b.get("snippet") or "").lower())
-        emo_count = sum(1 for w in TRINITY_TOKENS["moan"] if w in (b.get("snippet") or "").lower())
-        erot_count = sum(1 for w in EROTIC_PHYSIOLOGY if w in (b.get("snippet") or "").lower())
-        
+    for i, (dom_count, emo_count, erot_count) in enumerate(counts):
         if normalize_across == "rolling":
             dom_norm = dom_count / max(1, total_dom)
             emo_norm = emo_count / max(1, total_emo)
@@ -240,17 +377,57 @@ def enforce_continuity(beats: List[Dict[str, Any]],
     
     return beats
 
+def iter_continuity_inflections(scene_records: Iterable[Dict[str, Any]],
+                                window: int = 1,
+                                points_key: str = "inflection_points") -> Iterator[Tuple[Dict[str, Any], List[str]]]:
+    """
+    Stream scenes in book order; yield (scene_record, continuity points) where the points
+    are those of the `window` previous scenes, the scene itself and the `window` next
+    scenes, in that order, first occurrence kept. window=1 matches
+    propagate_inflection_points_across_chunks with the neighbouring records.
+    Holds at most 2 * window + 1 scenes.
+    """
+    if window < 0:
+        raise ValueError(f"window must be >= 0, got {window}")
+    ring: deque = deque()
+    emit_at = 0  # ring position of the next scene to yield
+
+    def emit() -> Tuple[Dict[str, Any], List[str]]:
+        lo = max(0, emit_at - window)
+        points: Dict[str, None] = {}
+        for i in range(lo, min(len(ring), emit_at + window + 1)):
+            points.update(dict.fromkeys(ring[i][1]))
+        return ring[emit_at][0], list(points)
+
+    for record in scene_records:
+        ring.append((record, record.get(points_key) or []))
+        if len(ring) > 2 * window + 1:
+            ring.popleft()
+            emit_at -= 1
+        if len(ring) - 1 - emit_at >= window:
+            yield emit()
+            emit_at += 1
+    while emit_at < len(ring):
+        yield emit()
+        emit_at += 1
+
 # -----------------------
 # Trinity Advisory
 # -----------------------
+def _scan_trinity_tokens(text: str) -> Dict[str, List[str]]:
+    return {
+        "pearls": token_matcher(TRINITY_TOKENS["pearls"])(text),
+        "cuffs": token_matcher(TRINITY_TOKENS["cuffs"])(text),
+        "moan": token_matcher(TRINITY_TOKENS["moan"])(text),
+        "sexact": token_matcher(SEXUAL_ACTION_KEYWORDS)(text),
+        "erophys": token_matcher(EROTIC_PHYSIOLOGY)(text)
+    }
+
 def detect_trinity_cues(scene_text: str, scene_record: dict) -> dict:
-    def find_tokens(text, keywords): 
-        return [k for k in keywords if re.search(rf"\b{re.escape(k)}\b", (text or "").lower())]
-    pearls = find_tokens(scene_text, TRINITY_TOKENS["pearls"])
-    cuffs = find_tokens(scene_text, TRINITY_TOKENS["cuffs"])
-    moan = find_tokens(scene_text, TRINITY_TOKENS["moan"])
-    sexact = find_tokens(scene_text, SEXUAL_ACTION_KEYWORDS)
-    erophys = find_tokens(scene_text, EROTIC_PHYSIOLOGY)
+    version = lexicon_version(TRINITY_TOKENS, SEXUAL_ACTION_KEYWORDS, EROTIC_PHYSIOLOGY)
+    found = get_analysis_cache().get_or_compute("trinity_cues", scene_text or "", version, _scan_trinity_tokens)
+    pearls, cuffs, moan = list(found["pearls"]), list(found["cuffs"]), list(found["moan"])
+    sexact, erophys = list(found["sexact"]), list(found["erophys"])
     cues = sum([len(moan)>0, len(sexact)>0, len(erophys)>0, any(f in scene_record.get("scene_metadata",{}).get("flags",[]) for f in ["climax","kink","part_end","finale"])])
     return {"pearls":pearls,"cuffs":cuffs,"moan":moan,"sexact":sexact,"erophys":erophys,"cues":cues}
 
@@ -0,0 +1,150 @@
+# workflow_utils_blobs.py
+# -----------------------
+# Content-addressed text store inside the passfile
+# Long scene_text / snippet / text strings are written once as top-level
+# "__blob__:<hash>" entries and records hold {"$blob": "<hash>"} in their place.
+# read_passfile resolves them; every copy of a text comes back as one interned string
+# that remembers its digest, so text equality is a digest comparison
+# -----------------------
+import hashlib
+import logging
+import sys
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+BLOB_PREFIX = "__blob__:"
+BLOB_REF = "$blob"
+BLOB_FIELDS = frozenset({"scene_text", "snippet", "text"})
+MIN_BLOB_LEN = 32  # shorter strings cost less inline than as a reference
+DIGEST_MEMO_SIZE = 4096
+
+# id(text) -> (text, digest); holding the text keeps its id from being reused
+_digests: "OrderedDict[int, Tuple[str, str]]" = OrderedDict()
+
+
+def text_hash(text: Optional[str]) -> str:
+    return hashlib.blake2b((text or "").encode("utf-8"), digest_size=16).hexdigest()
+
+def is_blob_key(key: str) -> bool:
+    return key.startswith(BLOB_PREFIX)
+
+def _remember_digest(text: str, digest: str) -> None:
+    _digests[id(text)] = (text, digest)
+    _digests.move_to_end(id(text))
+    if len(_digests) > DIGEST_MEMO_SIZE:
+        _digests.popitem(last=False)
+
+def intern_text(text: str, digest: Optional[str] = None) -> str:
+    """
+    One shared object per distinct text, so equal texts compare by identity.
+    digest: the text's stored blob hash, remembered for text_digest().
+    """
+    text = sys.intern(text)
+    if digest is not None:
+        _remember_digest(text, digest)
+    return text
+
+def text_digest(value: Any) -> Optional[str]:
+    """
+    Content digest of a text or blob reference (None for anything else).
+    Texts read from blobs carry their stored hash; any other text is hashed
+    once and the digest memoized for that string object.
+    """
+    if is_blob_ref(value):
+        return value[BLOB_REF]
+    if not isinstance(value, str):
+        return None
+    entry = _digests.get(id(value))
+    if entry is not None and entry[0] is value:
+        return entry[1]
+    digest = text_hash(value)
+    _remember_digest(value, digest)
+    return digest
+
+def same_text(a: Any, b: Any) -> bool:
+    """Text equality by content digest; texts and blob references compare alike."""
+    if a is b:
+        return True
+    digest_a, digest_b = text_digest(a), text_digest(b)
+    if digest_a is None or digest_b is None:
+        return a == b
+    return digest_a == digest_b
+
+
+# -----------------------
+# Packing (write side)
+# -----------------------
+def _pack(value: Any, blobs: Dict[str, str]) -> Any:
+    # Returns value itself when nothing below it changes, so unchanged records aren't copied
+    if isinstance(value, dict):
+        out = None
+        for k, v in value.items():
+            if k in BLOB_FIELDS and isinstance(v, str) and len(v) >= MIN_BLOB_LEN:
+                digest = text_digest(v)
+                blobs.setdefault(digest, v)
+                packed: Any = {BLOB_REF: digest}
+            else:
+                packed = _pack(v, blobs)
+            if packed is not v:
+                if out is None:
+                    out = dict(value)
+                out[k] = packed
+        return value if out is None else out
+    if isinstance(value, list):
+        packed_items = [_pack(v, blobs) for v in value]
+        return value if all(p is v for p, v in zip(packed_items, value)) else packed_items
+    return value
+
+def pack_passfile(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The on-disk form of data: texts moved into blob entries, each stored once.
+    Blob entries are rebuilt from scratch, so texts no longer referenced are dropped.
+    """
+    blobs: Dict[str, str] = {}
+    packed = dict(_pack({key: value for key, value in data.items() if not is_blob_key(key)}, blobs))
+    for digest in sorted(blobs):
+        packed[BLOB_PREFIX + digest] = blobs[digest]
+    return packed
+
+
+# -----------------------
+# Resolution (read side)
+# -----------------------
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and BLOB_REF in value
+
+def resolve_blobs(value: Any, lookup: Callable[[str], str]) -> Any:
+    """Replace blob references in place (dicts/lists are mutated); lookup(hash) -> text."""
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if k in BLOB_FIELDS and is_blob_ref(v):
+                value[k] = lookup(v[BLOB_REF])
+            elif isinstance(v, (dict, list)):
+                resolve_blobs(v, lookup)
+    elif isinstance(value, list):
+        for v in value:
+            if isinstance(v, (dict, list)):
+                resolve_blobs(v, lookup)
+    return value
+
+def unpack_passfile(data: Dict[str, Any]) -> Dict[str, Any]:
+    """In-memory form of a passfile read from disk: blob entries removed, references resolved."""
+    table = {}
+    for key in [k for k in data if is_blob_key(k)]:
+        digest = key[len(BLOB_PREFIX):]
+        table[digest] = intern_text(data.pop(key), digest)
+    if not table:
+        return data
+
+    def lookup(digest: str) -> str:
+        try:
+            return table[digest]
+        except KeyError:
+            raise KeyError(f"Passfile references missing text blob {digest}") from None
+
+    return resolve_blobs(data, lookup)
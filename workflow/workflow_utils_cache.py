@@ -0,0 +1,273 @@
+# workflow_utils_cache.py
+# -----------------------
+# Content-addressed analysis cache
+# Keyed by hash(kind + lexicon version + text); LRU in memory, sqlite on disk
+# The process-wide cache persists under PIPELINE_CACHE_DIR (env var, or .pipeline_cache
+# at the repo root) so warm re-runs in a new process reuse earlier results
+# -----------------------
+import os
+import json
+import atexit
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+DEFAULT_MEMORY_ENTRIES = 4096
+DEFAULT_MAX_DISK_ENTRIES = 200_000
+# Fraction of max_disk_entries kept after an eviction pass
+_EVICT_TO_RATIO = 0.9
+# Number of puts between on-disk size checks
+_EVICT_CHECK_INTERVAL = 512
+# Disk hits whose last_used is written back in one batch
+_TOUCH_FLUSH_INTERVAL = 256
+# New entries written to disk in one transaction
+_PUT_FLUSH_INTERVAL = 1024
+# Texts shorter than this are cheaper to re-scan than to hash and look up
+DEFAULT_MIN_TEXT_CHARS = 2048
+
+PIPELINE_CACHE_DIR = Path(os.environ.get("PIPELINE_CACHE_DIR") or Path(__file__).resolve().parent.parent / ".pipeline_cache")
+ANALYSIS_CACHE_PATH = PIPELINE_CACHE_DIR / "analysis.sqlite"
+
+
+# -----------------------
+# Keys
+# -----------------------
+def lexicon_version(*lexicons: Any) -> str:
+    """Short stable fingerprint of the lexicon(s) a computation depends on."""
+    payload = json.dumps(lexicons, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def content_key(kind: str, text: str, version: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(kind.encode("utf-8"))
+    h.update(b"\x00")
+    h.update(version.encode("utf-8"))
+    h.update(b"\x00")
+    h.update((text or "").encode("utf-8"))
+    return h.hexdigest()
+
+
+# -----------------------
+# Cache
+# -----------------------
+class AnalysisCache:
+    """
+    Maps hash(kind, lexicon version, text) to a JSON-serializable analysis result.
+    - In-memory LRU front (memory_entries)
+    - Optional sqlite backing file, evicted least-recently-used past max_disk_entries;
+      new entries and disk hits' last_used are buffered and written back in one
+      transaction per batch (and on flush/close)
+    - get_or_compute skips the cache for texts shorter than min_text_chars
+    Cached values are shared: callers must copy before mutating.
+    """
+
+    def __init__(self,
+                 path: Optional[Union[str, Path]] = None,
+                 memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES,
+                 min_text_chars: int = 0):
+        self.path = Path(path) if path else None
+        self.memory_entries = memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.min_text_chars = min_text_chars
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._clock = 0
+        self._puts_since_check = 0
+        self._touched: Dict[str, int] = {}
+        self._pending: Dict[str, Tuple[str, int]] = {}
+        if self.path:
+            self._open_disk()
+
+    def _open_disk(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._pid = os.getpid()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " last_used INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS analysis_last_used ON analysis(last_used)")
+        row = self._conn.execute("SELECT COALESCE(MAX(last_used), 0) FROM analysis").fetchone()
+        self._clock = row[0]
+
+    # -----------------------
+    # Memory LRU
+    # -----------------------
+    def _remember(self, key: str, value: Any) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # -----------------------
+    # Disk
+    # -----------------------
+    def _disk(self) -> Optional[sqlite3.Connection]:
+        # A sqlite connection must not cross fork(): pool workers reopen the file
+        if self._conn is not None and self._pid != os.getpid():
+            self._touched = {}
+            self._pending = {}
+            self._open_disk()
+        return self._conn
+
+    def _disk_get(self, key: str) -> Optional[Any]:
+        pending = self._pending.get(key)
+        if pending is not None:
+            self._clock += 1
+            self._pending[key] = (pending[0], self._clock)
+            return json.loads(pending[0])
+        row = self._conn.execute("SELECT value FROM analysis WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._clock += 1
+        self._touched[key] = self._clock
+        if len(self._touched) >= _TOUCH_FLUSH_INTERVAL:
+            self._flush_disk()
+        return json.loads(row[0])
+
+    def _flush_disk(self) -> None:
+        # Buffered puts and last_used updates, in one transaction
+        if not self._touched and not self._pending:
+            return
+        touched, self._touched = self._touched, {}
+        pending, self._pending = self._pending, {}
+        # The connection autocommits (isolation_level=None), so the transaction is explicit
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany("INSERT OR REPLACE INTO analysis (key, value, last_used) VALUES (?, ?, ?)",
+                                   [(key, value, clock) for key, (value, clock) in pending.items()])
+            self._conn.executemany("UPDATE analysis SET last_used = ? WHERE key = ?",
+                                   [(clock, key) for key, clock in touched.items()])
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _disk_put(self, key: str, value: Any) -> None:
+        self._clock += 1
+        self._pending[key] = (json.dumps(value, ensure_ascii=False), self._clock)
+        self._touched.pop(key, None)
+        if len(self._pending) >= _PUT_FLUSH_INTERVAL:
+            self._flush_disk()
+        self._puts_since_check += 1
+        if self._puts_since_check >= _EVICT_CHECK_INTERVAL:
+            self._puts_since_check = 0
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        self._flush_disk()
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM analysis").fetchone()
+        if count <= self.max_disk_entries:
+            return
+        keep = int(self.max_disk_entries * _EVICT_TO_RATIO)
+        self._conn.execute(
+            "DELETE FROM analysis WHERE key IN ("
+            " SELECT key FROM analysis ORDER BY last_used ASC LIMIT ?)",
+            (count - keep,)
+        )
+        logger.info(f"Analysis cache evicted {count - keep} entries from {self.path}")
+
+    # -----------------------
+    # Public API
+    # -----------------------
+    def get(self, kind: str, text: str, version: str) -> Optional[Any]:
+        key = content_key(kind, text, version)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+            if self._disk() is not None:
+                value = self._disk_get(key)
+                if value is not None:
+                    self._remember(key, value)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, kind: str, text: str, version: str, value: Any) -> None:
+        key = content_key(kind, text, version)
+        with self._lock:
+            self._remember(key, value)
+            if self._disk() is not None:
+                self._disk_put(key, value)
+
+    def get_or_compute(self, kind: str, text: str, version: str, compute: Callable[[str], Any]) -> Any:
+        if len(text) < self.min_text_chars:
+            return compute(text)
+        value = self.get(kind, text, version)
+        if value is None:
+            value = compute(text)
+            self.put(kind, text, version, value)
+        return value
+
+    def flush(self) -> None:
+        """Write buffered entries and last_used updates to disk."""
+        with self._lock:
+            if self._disk() is not None:
+                self._flush_disk()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            self._pending.clear()
+            if self._disk() is not None:
+                self._conn.execute("DELETE FROM analysis")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._evict_disk()
+                self._conn.close()
+                self._conn = None
+
+
+# -----------------------
+# Process-wide default
+# -----------------------
+_analysis_cache: Optional[AnalysisCache] = None
+
+
+def _default_analysis_cache() -> AnalysisCache:
+    try:
+        cache = AnalysisCache(ANALYSIS_CACHE_PATH, min_text_chars=DEFAULT_MIN_TEXT_CHARS)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Analysis cache {ANALYSIS_CACHE_PATH} unavailable ({e}); caching in memory only")
+        return AnalysisCache(min_text_chars=DEFAULT_MIN_TEXT_CHARS)
+    atexit.register(cache.close)
+    return cache
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """The installed cache; opens the on-disk default on first use."""
+    global _analysis_cache
+    if _analysis_cache is None:
+        _analysis_cache = _default_analysis_cache()
+    return _analysis_cache
+
+
+def set_analysis_cache(cache: Optional[AnalysisCache]) -> Optional[AnalysisCache]:
+    """Install the cache used by the analysis functions (None: the on-disk default); returns the previous one."""
+    global _analysis_cache
+    previous, _analysis_cache = _analysis_cache, cache
+    return previous
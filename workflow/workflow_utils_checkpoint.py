@@ -0,0 +1,75 @@
+# workflow_utils_checkpoint.py
+# -----------------------
+# Pipeline checkpoints
+# Kept inside the passfile under CHECKPOINT_KEY, so each one is written in the
+# same atomic passfile replace as the chunk it records; indexes that treat
+# top-level entries as scenes skip it (is_checkpoint_key), or only take scene
+# keys in the first place (is_scene_key)
+# -----------------------
+import hashlib
+import json
+import re
+from typing import Any, Dict, Optional
+
+# -----------------------
+# Constants
+# -----------------------
+CHECKPOINT_KEY = "__pipeline_checkpoint__"
+CHECKPOINT_VERSION = 1
+# chunk_<n> (pipeline_full) or a scene_uuid (merges); never the checkpoint or pipeline scratch fields
+SCENE_KEY_RE = re.compile(r"^(chunk_\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$")
+
+
+def is_checkpoint_key(key: str) -> bool:
+    return key == CHECKPOINT_KEY
+
+def is_scene_key(key: str) -> bool:
+    return SCENE_KEY_RE.match(key) is not None
+
+
+# -----------------------
+# Fingerprints
+# -----------------------
+def chunk_fingerprint(**inputs: Any) -> str:
+    """Content hash of everything a chunk's output depends on (key order independent)."""
+    raw = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# -----------------------
+# Checkpoint record
+# -----------------------
+def new_checkpoint() -> Dict[str, Any]:
+    return {"version": CHECKPOINT_VERSION, "last_committed": None, "chunks": {}}
+
+def load_checkpoint(passfile: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    checkpoint = passfile.get(CHECKPOINT_KEY)
+    if isinstance(checkpoint, dict) and checkpoint.get("version") == CHECKPOINT_VERSION:
+        return checkpoint
+    return None
+
+def record_chunk(checkpoint: Dict[str, Any], chunk_index: int, fingerprint: str,
+                 scene_record: Dict[str, Any]) -> Dict[str, Any]:
+    """Note a committed chunk: its input fingerprint and the continuity state later chunks read."""
+    checkpoint["chunks"][str(chunk_index)] = {
+        "fingerprint": fingerprint,
+        "scene_uuid": scene_record.get("scene_uuid"),
+        "connected_completion_arcs": list(scene_record.get("sections", {}).get("connected_completion_arcs", [])),
+    }
+    checkpoint["last_committed"] = chunk_index
+    return checkpoint
+
+def committed_entry(checkpoint: Optional[Dict[str, Any]], chunk_index: int,
+                    fingerprint: str) -> Optional[Dict[str, Any]]:
+    """The checkpoint entry for chunk_index if it was committed from identical inputs."""
+    if checkpoint is None:
+        return None
+    entry = checkpoint["chunks"].get(str(chunk_index))
+    if entry is None or entry.get("fingerprint") != fingerprint:
+        return None
+    return entry
+
+def continuity_stub(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Stand-in for a skipped chunk's record: just what update_continuity_arcs reads."""
+    return {"scene_uuid": entry["scene_uuid"],
+            "sections": {"connected_completion_arcs": list(entry["connected_completion_arcs"])}}
@@ -0,0 +1,248 @@
+# workflow_utils_compression.py
+# -----------------------
+# Compressed passfile storage (gzip / lzma / zlib, stdlib only)
+# - codec chosen by flag or extension on write, sniffed from magic bytes on read
+# - streaming encode: one top-level record serialized at a time
+# - streaming decode: top-level records parsed from a bounded text buffer
+# -----------------------
+import gzip
+import io
+import json
+import lzma
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+# -----------------------
+# Constants
+# -----------------------
+# Storage and network-filesystem reads matter more than compression CPU
+GZIP_LEVEL = 9
+LZMA_PRESET = 6
+ZLIB_LEVEL = 9
+
+CODEC_EXTENSIONS = {".gz": "gzip", ".xz": "lzma", ".lzma": "lzma", ".zz": "zlib", ".zlib": "zlib"}
+CODECS = ("gzip", "lzma", "zlib")
+READ_CHUNK_SIZE = 1 << 16
+_WS = " \t\n\r"
+
+
+# -----------------------
+# Codec selection
+# -----------------------
+def codec_for_path(path: Union[str, Path], compression: Optional[str] = None) -> Optional[str]:
+    """
+    compression=None picks the codec from the extension (.gz/.xz/.lzma/.zz/.zlib);
+    "none" forces plain JSON; "gzip"/"lzma"/"zlib" force that codec.
+    """
+    if compression is not None:
+        if compression == "none":
+            return None
+        if compression not in CODECS:
+            raise ValueError(f"Unknown passfile compression {compression!r}; expected one of {CODECS} or 'none'")
+        return compression
+    return CODEC_EXTENSIONS.get(Path(path).suffix.lower())
+
+def sniff_codec(head: bytes) -> Optional[str]:
+    # A JSON passfile starts with '{' or whitespace, so none of these collide
+    if head[:2] == b"\x1f\x8b":
+        return "gzip"
+    if head[:6] == b"\xfd7zXZ\x00":
+        return "lzma"
+    if len(head) >= 2 and head[0] == 0x78 and (head[0] * 256 + head[1]) % 31 == 0:
+        return "zlib"
+    return None
+
+def detect_codec(path: Union[str, Path]) -> Optional[str]:
+    with open(path, "rb") as f:
+        return sniff_codec(f.read(6))
+
+
+# -----------------------
+# zlib streams (no stdlib file object)
+# -----------------------
+class _ZlibWriter(io.RawIOBase):
+    def __init__(self, raw, level: int = ZLIB_LEVEL):
+        self._raw = raw
+        self._compressor = zlib.compressobj(level)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._raw.write(self._compressor.compress(b))
+        return len(b)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._raw.write(self._compressor.flush())
+            self._raw.close()
+        super().close()
+
+class _ZlibReader(io.RawIOBase):
+    def __init__(self, raw):
+        self._raw = raw
+        self._decompressor = zlib.decompressobj()
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._pending:
+            if self._decompressor.eof:
+                return 0
+            data = self._decompressor.unconsumed_tail or self._raw.read(READ_CHUNK_SIZE)
+            if not data:
+                self._pending = self._decompressor.flush()
+                if not self._pending:
+                    raise EOFError("Compressed zlib passfile ended before the end-of-stream marker")
+                break
+            self._pending = self._decompressor.decompress(data, len(b))
+        n = min(len(b), len(self._pending))
+        b[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            self._raw.close()
+        super().close()
+
+def open_compressed(path: Union[str, Path], mode: str, codec: str):
+    """Binary file object for 'rb' / 'wb' that (de)compresses on the fly."""
+    if codec == "gzip":
+        return gzip.open(path, mode, compresslevel=GZIP_LEVEL) if "w" in mode else gzip.open(path, mode)
+    if codec == "lzma":
+        return lzma.open(path, mode, preset=LZMA_PRESET) if "w" in mode else lzma.open(path, mode)
+    if codec == "zlib":
+        raw = open(path, mode)
+        return io.BufferedWriter(_ZlibWriter(raw)) if "w" in mode else io.BufferedReader(_ZlibReader(raw))
+    raise ValueError(f"Unknown passfile compression {codec!r}")
+
+
+# -----------------------
+# Streaming encode
+# -----------------------
+def iter_encode_passfile(data: Dict[str, Any], compact: bool = False) -> Iterator[str]:
+    """
+    Yield the passfile's JSON text piece by piece.
+    compact=True drops the indent and item whitespace, encoding each top-level
+    record in one C-accelerated json.dumps call.
+    """
+    if not compact:
+        yield from json.JSONEncoder(ensure_ascii=False, indent=2).iterencode(data)
+        return
+    first = True
+    yield "{"
+    for key, value in data.items():
+        if not isinstance(key, str):
+            key = json.dumps(key)  # same coercion json.dump applies to int/bool/None keys
+        yield ("" if first else ",") + json.dumps(key, ensure_ascii=False) + ":" \
+            + json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        first = False
+    yield "}"
+
+def dump_passfile_stream(data: Dict[str, Any], fh, compact: bool = False) -> None:
+    """Write to a binary file object (compressed or not) without building the full string."""
+    text = io.TextIOWrapper(fh, encoding="utf-8", write_through=False)
+    try:
+        for piece in iter_encode_passfile(data, compact):
+            text.write(piece)
+        text.flush()
+    finally:
+        text.detach()
+
+
+# -----------------------
+# Streaming decode
+# -----------------------
+class _TextBuffer:
+    """Sliding window over a text stream; the parser asks for more when a token is cut off."""
+
+    def __init__(self, text_fh, chunk_size: int):
+        self._fh = text_fh
+        self._chunk_size = chunk_size
+        self.buf = ""
+        self.eof = False
+
+    def more(self) -> bool:
+        if self.eof:
+            return False
+        # Grow the read size with the buffer so one large record is not reparsed per chunk
+        data = self._fh.read(max(self._chunk_size, len(self.buf)))
+        if not data:
+            self.eof = True
+            return False
+        self.buf += data
+        return True
+
+    def skip_ws(self, i: int) -> int:
+        while True:
+            n = len(self.buf)
+            while i < n and self.buf[i] in _WS:
+                i += 1
+            if i < n or not self.more():
+                return i
+
+    def char(self, i: int) -> str:
+        i = self.skip_ws(i)
+        if i >= len(self.buf):
+            raise json.JSONDecodeError("Unexpected end of passfile", self.buf, i)
+        return self.buf[i]
+
+    def parse(self, fn, i: int) -> Tuple[Any, int]:
+        while True:
+            try:
+                value, end = fn(self.buf, i)
+            except json.JSONDecodeError:
+                if self.more():
+                    continue
+                raise
+            # A number at the end of the window may continue in the next chunk
+            if end < len(self.buf) or self.eof:
+                return value, end
+            if not self.more():
+                return value, end
+
+def iter_passfile_items(text_fh, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Tuple[str, Any]]:
+    """Yield (key, value) for each top-level entry; holds about one record of text at a time."""
+    decoder = json.JSONDecoder()
+    src = _TextBuffer(text_fh, chunk_size)
+    i = src.skip_ws(0)
+    if i >= len(src.buf):
+        raise json.JSONDecodeError("Expecting value", src.buf, i)
+    if src.buf[i] != "{":
+        raise json.JSONDecodeError("Passfile top level is not a JSON object", src.buf, i)
+    i = src.skip_ws(i + 1)
+    if src.char(i) == "}":
+        return
+    while True:
+        i = src.skip_ws(i)
+        if src.char(i) != '"':
+            raise json.JSONDecodeError("Expecting property name enclosed in double quotes", src.buf, i)
+        key, i = src.parse(lambda s, j: json.decoder.scanstring(s, j + 1), i)
+        i = src.skip_ws(i)
+        if src.char(i) != ":":
+            raise json.JSONDecodeError("Expecting ':' delimiter", src.buf, i)
+        i = src.skip_ws(i + 1)
+        value, i = src.parse(decoder.raw_decode, i)
+        yield key, value
+        # Drop the consumed prefix so the window stays bounded
+        src.buf, i = src.buf[i:], 0
+        i = src.skip_ws(i)
+        c = src.char(i)
+        if c == ",":
+            i += 1
+            continue
+        if c == "}":
+            return
+        raise json.JSONDecodeError("Expecting ',' delimiter", src.buf, i)
+
+def load_passfile_stream(fh, chunk_size: int = READ_CHUNK_SIZE) -> Dict[str, Any]:
+    """Decode a passfile from a binary file object without reading it into one string."""
+    text = io.TextIOWrapper(fh, encoding="utf-8")
+    try:
+        return dict(iter_passfile_items(text, chunk_size))
+    finally:
+        text.detach()
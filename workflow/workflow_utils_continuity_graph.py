@@ -0,0 +1,353 @@
+# workflow_utils_continuity_graph.py
+# -----------------------
+# Continuity graph over passfile scenes
+# - "sequence" edges: previous_scene -> scene -> next_scene
+#   (cross_references and scene_metadata)
+# - "arc" edges: each connected_completion_arcs member -> the scene listing it
+# Updated incrementally per scene record; reachability results are cached
+# -----------------------
+import logging
+from collections import Counter, defaultdict, deque
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+from workflow_utils_checkpoint import is_checkpoint_key
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+SEQUENCE = "sequence"
+ARC = "arc"
+EDGE_KINDS = (SEQUENCE, ARC)
+
+Edge = Tuple[str, str, str]  # (from scene, to scene, kind)
+
+
+# -----------------------
+# Edge extraction
+# -----------------------
+def scene_node_id(key: str, record: Dict[str, Any]) -> str:
+    return record.get("scene_uuid") or key
+
+def scene_edges(key: str, record: Dict[str, Any]) -> List[Edge]:
+    """Edges a single scene record contributes to the graph."""
+    node = scene_node_id(key, record)
+    metadata = record.get("scene_metadata") or {}
+    xrefs = record.get("cross_references") or {}
+    edges: Set[Edge] = set()
+    for prev in (xrefs.get("previous_scene"), metadata.get("previous_scene")):
+        if isinstance(prev, str) and prev and prev != node:
+            edges.add((prev, node, SEQUENCE))
+    for nxt in (xrefs.get("next_scene"), metadata.get("next_scene")):
+        if isinstance(nxt, str) and nxt and nxt != node:
+            edges.add((node, nxt, SEQUENCE))
+    arcs = (record.get("sections") or {}).get("connected_completion_arcs")
+    if isinstance(arcs, list):
+        for src in arcs:
+            if isinstance(src, str) and src and src != node:
+                edges.add((src, node, ARC))
+    return sorted(edges)
+
+def _is_scene(record: Any) -> bool:
+    # A scene record carries its own sections / cross_references / scene_metadata;
+    # a bare scene_uuid isn't enough (pipeline_full's top-level scene_metadata has one)
+    return isinstance(record, dict) and any(
+        isinstance(record.get(field), dict) for field in ("sections", "cross_references", "scene_metadata")
+    )
+
+def _tarjan(adj: Dict[str, Set[str]], nodes: Iterable[str], within: Optional[Set[str]] = None) -> List[List[str]]:
+    """Strongly connected components (iterative Tarjan) reachable from nodes, optionally over the subgraph within."""
+    def children(node: str) -> Iterator[str]:
+        return iter(sorted(c for c in adj.get(node, ()) if within is None or c in within))
+
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    on_stack: Set[str] = set()
+    stack: List[str] = []
+    result: List[List[str]] = []
+    counter = 0
+    for root in sorted(nodes):
+        if root in index:
+            continue
+        work = [(root, children(root))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, pending = work[-1]
+            child = next(pending, None)
+            if child is not None:
+                if child not in index:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, children(child)))
+                elif child in on_stack:
+                    low[node] = min(low[node], index[child])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                result.append(sorted(component))
+    return result
+
+
+# -----------------------
+# Graph
+# -----------------------
+class ContinuityGraph:
+    """
+    Adjacency lists (forward and reverse, per edge kind) with reference-counted
+    edges, so two records describing the same link (A.next_scene = B and
+    B.previous_scene = A) can be updated independently.
+    Orphans and dangling references are maintained on every update; reachability
+    results are cached until the next change. Once cycles() has run for an edge
+    kind, later changes only re-split or merge the components they touch.
+    """
+
+    def __init__(self):
+        self._out: Dict[str, Dict[str, Set[str]]] = {k: defaultdict(set) for k in EDGE_KINDS}
+        self._in: Dict[str, Dict[str, Set[str]]] = {k: defaultdict(set) for k in EDGE_KINDS}
+        self._edge_refs: Counter = Counter()
+        self._degree: Counter = Counter()
+        self._contributions: Dict[str, Tuple[Optional[str], List[Edge]]] = {}
+        self._scene_sources: Dict[str, Set[str]] = defaultdict(set)
+        self._orphans: Set[str] = set()
+        self._dangling: Set[str] = set()
+        self._reach_cache: Dict[Tuple[str, Tuple[str, ...], bool], FrozenSet[str]] = {}
+        # Per edge kind, once cycles() has run: node -> label of its multi-scene component,
+        # label -> members, and edge changes (edge, added) not yet folded in
+        self._scc_of: Dict[str, Dict[str, str]] = {}
+        self._scc_members: Dict[str, Dict[str, Set[str]]] = {}
+        self._scc_pending: Dict[str, List[Tuple[Edge, bool]]] = {}
+        self._cycles_cache: Dict[str, List[List[str]]] = {}
+
+    @classmethod
+    def build(cls, passfile: Dict[str, Any]) -> "ContinuityGraph":
+        graph = cls()
+        graph.update(passfile, passfile.keys())
+        return graph
+
+    # -----------------------
+    # Maintenance
+    # -----------------------
+    def _refresh_node(self, node: str) -> None:
+        is_scene = bool(self._scene_sources.get(node))
+        linked = self._degree[node] > 0
+        if is_scene and not linked:
+            self._orphans.add(node)
+        else:
+            self._orphans.discard(node)
+        if linked and not is_scene:
+            self._dangling.add(node)
+        else:
+            self._dangling.discard(node)
+
+    def _add_edge(self, edge: Edge) -> bool:
+        self._edge_refs[edge] += 1
+        if self._edge_refs[edge] > 1:
+            return False
+        src, dst, kind = edge
+        self._out[kind][src].add(dst)
+        self._in[kind][dst].add(src)
+        self._degree[src] += 1
+        self._degree[dst] += 1
+        self._note_scc_change(edge, True)
+        return True
+
+    def _remove_edge(self, edge: Edge) -> bool:
+        self._edge_refs[edge] -= 1
+        if self._edge_refs[edge] > 0:
+            return False
+        del self._edge_refs[edge]
+        src, dst, kind = edge
+        for adj, a, b in ((self._out[kind], src, dst), (self._in[kind], dst, src)):
+            adj[a].discard(b)
+            if not adj[a]:
+                del adj[a]
+        for node in (src, dst):
+            self._degree[node] -= 1
+            if not self._degree[node]:
+                del self._degree[node]
+        self._note_scc_change(edge, False)
+        return True
+
+    def _note_scc_change(self, edge: Edge, added: bool) -> None:
+        kind = edge[2]
+        if kind in self._scc_pending:
+            self._scc_pending[kind].append((edge, added))
+            self._cycles_cache.pop(kind, None)
+
+    def update(self, passfile: Dict[str, Any], keys: Iterable[str]) -> None:
+        """Replace the edges contributed by the given top-level entries (absent ones are dropped)."""
+        touched: Set[str] = set()
+        changed = False
+        for key in keys:
+            node, old_edges = self._contributions.pop(key, (None, []))
+            if node is not None:
+                self._scene_sources[node].discard(key)
+                if not self._scene_sources[node]:
+                    del self._scene_sources[node]
+                touched.add(node)
+            for edge in old_edges:
+                changed |= self._remove_edge(edge)
+                touched.update(edge[:2])
+
+            record = passfile.get(key)
+            if is_checkpoint_key(key) or not _is_scene(record):
+                continue
+            node = scene_node_id(key, record)
+            edges = scene_edges(key, record)
+            self._contributions[key] = (node, edges)
+            self._scene_sources[node].add(key)
+            touched.add(node)
+            for edge in edges:
+                changed |= self._add_edge(edge)
+                touched.update(edge[:2])
+        for node in touched:
+            self._refresh_node(node)
+        if changed:
+            self._reach_cache.clear()
+
+    # -----------------------
+    # Queries
+    # -----------------------
+    def scenes(self) -> List[str]:
+        return sorted(self._scene_sources)
+
+    def successors(self, node: str, kind: str = SEQUENCE) -> List[str]:
+        return sorted(self._out[kind].get(node, ()))
+
+    def predecessors(self, node: str, kind: str = SEQUENCE) -> List[str]:
+        return sorted(self._in[kind].get(node, ()))
+
+    def walk(self, start: str, reverse: bool = False) -> Iterator[str]:
+        """
+        Follow the sequence chain from start (next_scene, or previous_scene if reverse),
+        yielding each scene once. Branches are followed in sorted order; a repeat ends the walk.
+        """
+        adj = self._in[SEQUENCE] if reverse else self._out[SEQUENCE]
+        seen = {start}
+        node = start
+        yield node
+        while True:
+            nxt = next((n for n in sorted(adj.get(node, ())) if n not in seen), None)
+            if nxt is None:
+                return
+            if len(adj[node]) > 1:
+                logger.warning(f"Continuity branch at {node}: {sorted(adj[node])}")
+            seen.add(nxt)
+            node = nxt
+            yield node
+
+    def reachable(self, start: str, kinds: Iterable[str] = EDGE_KINDS, reverse: bool = False) -> FrozenSet[str]:
+        """Scenes reachable from start (excluding start) over the given edge kinds; cached until the next change."""
+        kinds = tuple(sorted(kinds))
+        key = (start, kinds, reverse)
+        cached = self._reach_cache.get(key)
+        if cached is not None:
+            return cached
+        adjs = [(self._in if reverse else self._out)[k] for k in kinds]
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            for adj in adjs:
+                for nxt in adj.get(node, ()):
+                    if nxt not in seen:
+                        seen.add(nxt)
+                        queue.append(nxt)
+        seen.discard(start)
+        result = frozenset(seen)
+        self._reach_cache[key] = result
+        return result
+
+    def feeders(self, node: str) -> FrozenSet[str]:
+        """Scenes that feed, directly or transitively, into node's completion arcs."""
+        return self.reachable(node, kinds=(ARC,), reverse=True)
+
+    def orphans(self) -> Set[str]:
+        """Scenes with no sequence or arc links at all."""
+        return set(self._orphans)
+
+    def dangling(self) -> Set[str]:
+        """Scene ids referenced by links but not present in the passfile."""
+        return set(self._dangling)
+
+    def cycles(self, kind: str = SEQUENCE) -> List[List[str]]:
+        """Strongly connected components with more than one scene; cached, updated incrementally."""
+        cached = self._cycles_cache.get(kind)
+        if cached is not None:
+            return cached
+        if kind not in self._scc_pending:
+            self._scc_of[kind], self._scc_members[kind] = {}, {}
+            self._set_components(kind, _tarjan(self._out[kind], self._out[kind]))
+        else:
+            self._fold_scc_changes(kind)
+        self._scc_pending[kind] = []
+        result = sorted(sorted(members) for members in self._scc_members[kind].values())
+        self._cycles_cache[kind] = result
+        return result
+
+    def _component(self, kind: str, node: str) -> str:
+        return self._scc_of[kind].get(node, node)
+
+    def _set_components(self, kind: str, components: Iterable[List[str]]) -> None:
+        for component in components:
+            if len(component) > 1:
+                label = component[0]
+                self._scc_members[kind][label] = set(component)
+                for member in component:
+                    self._scc_of[kind][member] = label
+
+    def _drop_component(self, kind: str, label: str) -> Set[str]:
+        members = self._scc_members[kind].pop(label, {label})
+        for member in members:
+            self._scc_of[kind].pop(member, None)
+        return members
+
+    def _fold_scc_changes(self, kind: str) -> None:
+        out, inc = self._out[kind], self._in[kind]
+        pending = self._scc_pending[kind]
+        # A removed edge inside a component may split it: re-run Tarjan on that component only
+        scc_of = self._scc_of[kind]
+        split = {scc_of[src] for (src, dst, _), added in pending
+                 if not added and src in scc_of and scc_of.get(dst) == scc_of[src]}
+        for label in split:
+            # One component at a time: its pieces must stay within it for the merge step below
+            members = self._drop_component(kind, label)
+            self._set_components(kind, _tarjan(out, members, within=members))
+        # An added edge src -> dst between components merges every component on a path dst ~> src
+        for (src, dst, _), added in pending:
+            if not added or dst not in out.get(src, ()) or self._component(kind, src) == self._component(kind, dst):
+                continue
+            forward = self._reach(out, dst)
+            if src not in forward:
+                continue
+            merged: Set[str] = set()
+            for node in self._reach(inc, src, within=forward):
+                if self._component(kind, node) not in merged:
+                    merged |= self._drop_component(kind, self._component(kind, node))
+            self._set_components(kind, [sorted(merged)])
+
+    @staticmethod
+    def _reach(adj: Dict[str, Set[str]], start: str, within: Optional[Set[str]] = None) -> Set[str]:
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            for nxt in adj.get(queue.popleft(), ()):
+                if nxt not in seen and (within is None or nxt in within):
+                    seen.add(nxt)
+                    queue.append(nxt)
+        return seen
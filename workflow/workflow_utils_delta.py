@@ -0,0 +1,243 @@
+# workflow_utils_delta.py
+# -----------------------
+# Delta chunks: only what an edit changed in one scene
+# - beats / micro_beats: upsert (whole beat) and delete, keyed by beat_uuid
+# - scene_text: character patch against the hash of the text it was made from
+# - refs / connected_completion_arcs: additions
+# Applied in place with the v5.13 merge rules; work is proportional to the edit
+# -----------------------
+import logging
+from bisect import bisect_left
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from workflow_utils_blobs import text_hash
+from workflow_utils import assign_micro_beat_uuids, insert_trinity_advisory, record_scene_uuid, validate_minimal_canonical
+from workflow_utils_continuity_graph import ContinuityGraph
+from workflow_utils_merge_v5_13 import handle_scene_text_conflict
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+DELTA_VERSION = 1
+BEAT_FIELDS = ("beats", "micro_beats")
+REF_KEYS = ("flag_refs", "insert_advisory_refs", "feedback_summary_ref")
+
+TextOp = Tuple[int, int, str]  # replace base[start:end] with text
+
+
+def is_delta_chunk(chunk: Dict[str, Any]) -> bool:
+    return isinstance(chunk, dict) and "delta_version" in chunk
+
+def delta_dirty_fields(delta: Dict[str, Any]) -> set:
+    """Top-level scene fields applying delta can change (for partial validation)."""
+    fields = {field for field in BEAT_FIELDS if field in delta}
+    if "text" in delta:
+        # A text change also recomputes the advisory, which touches sections and refs
+        fields |= {"scene_text", "sections", "refs"}
+    if "refs" in delta:
+        fields.add("refs")
+    if "connected_completion_arcs" in delta:
+        fields.add("sections")
+    return fields
+
+
+# -----------------------
+# Text patches
+# -----------------------
+def diff_text(old: str, new: str) -> List[TextOp]:
+    """
+    Replace ops turning old into new. The common prefix/suffix is trimmed first,
+    so a single local edit costs O(len(text)) with no quadratic matching; the
+    remaining middle is split into lines to keep separate edits separate.
+    """
+    if old == new:
+        return []
+    lo, limit = 0, min(len(old), len(new))
+    while lo < limit and old[lo] == new[lo]:
+        lo += 1
+    hi_old, hi_new = len(old), len(new)
+    while hi_old > lo and hi_new > lo and old[hi_old - 1] == new[hi_new - 1]:
+        hi_old -= 1
+        hi_new -= 1
+    a_lines = old[lo:hi_old].splitlines(keepends=True)
+    b_lines = new[lo:hi_new].splitlines(keepends=True)
+    if len(a_lines) < 2 or len(b_lines) < 2:
+        return [(lo, hi_old, new[lo:hi_new])]
+    a_offsets = [lo]
+    for line in a_lines:
+        a_offsets.append(a_offsets[-1] + len(line))
+    ops = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, a_lines, b_lines, autojunk=False).get_opcodes():
+        if tag != "equal":
+            ops.append((a_offsets[i1], a_offsets[i2], "".join(b_lines[j1:j2])))
+    return ops
+
+def apply_text_ops(base: str, ops: Iterable[TextOp]) -> str:
+    """Apply non-overlapping replace ops (offsets into base)."""
+    parts, pos = [], 0
+    for start, end, text in sorted(ops, key=lambda op: op[0]):
+        if start < pos or end < start or end > len(base):
+            raise ValueError(f"Bad text op ({start}, {end}) for text of length {len(base)}")
+        parts.append(base[pos:start])
+        parts.append(text)
+        pos = end
+    parts.append(base[pos:])
+    return "".join(parts)
+
+
+# -----------------------
+# Delta generation
+# -----------------------
+def _beat_delta(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Dict[str, Any]:
+    old_by_uuid = {b["beat_uuid"]: b for b in old}
+    new_uuids = set()
+    upsert = []
+    for beat in new:
+        new_uuids.add(beat["beat_uuid"])
+        if old_by_uuid.get(beat["beat_uuid"]) != beat:
+            upsert.append(beat)
+    delete = sorted(u for u in old_by_uuid if u not in new_uuids)
+    out: Dict[str, Any] = {}
+    if upsert:
+        out["upsert"] = upsert
+    if delete:
+        out["delete"] = delete
+    return out
+
+def make_delta_chunk(old_scene: Dict[str, Any], new_scene: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Delta turning old_scene into new_scene. Micro-beats without a
+    micro_beat_uuid get one from their position in new_scene, as a whole-chunk
+    merge would. Ref and arc removals are not representable (merges only add).
+    """
+    new_scene = dict(new_scene)
+    new_scene["micro_beats"] = assign_micro_beat_uuids(
+        [dict(mb) for mb in new_scene.get("micro_beats", [])], new_scene.get("scene_metadata", {}))
+    delta: Dict[str, Any] = {"delta_version": DELTA_VERSION,
+                             "scene_uuid": new_scene.get("scene_uuid") or old_scene["scene_uuid"]}
+    for field in BEAT_FIELDS:
+        beats = _beat_delta(old_scene.get(field, []), new_scene.get(field, []))
+        if beats:
+            delta[field] = beats
+    old_text, new_text = old_scene.get("scene_text", ""), new_scene.get("scene_text", "")
+    if old_text != new_text:
+        delta["text"] = {"base": text_hash(old_text), "ops": [list(op) for op in diff_text(old_text, new_text)]}
+    old_refs, new_refs = old_scene.get("refs", {}), new_scene.get("refs", {})
+    refs = {k: sorted(set(new_refs.get(k, [])) - set(old_refs.get(k, []))) for k in REF_KEYS}
+    refs = {k: v for k, v in refs.items() if v}
+    if refs:
+        delta["refs"] = refs
+    old_arcs = set(old_scene.get("sections", {}).get("connected_completion_arcs", []))
+    arcs = sorted(set(new_scene.get("sections", {}).get("connected_completion_arcs", [])) - old_arcs)
+    if arcs:
+        delta["connected_completion_arcs"] = arcs
+    return delta
+
+
+# -----------------------
+# Delta application
+# -----------------------
+def _beat_key(beat: Dict[str, Any]) -> str:
+    return beat["beat_uuid"]
+
+def _apply_beat_ops(scene: Dict[str, Any], field: str, ops: Dict[str, Any]) -> bool:
+    """Upsert/delete on a list kept sorted by beat_uuid; returns True if beats were added or removed."""
+    beats = scene.setdefault(field, [])
+    if any(beats[i]["beat_uuid"] > beats[i + 1]["beat_uuid"] for i in range(len(beats) - 1)):
+        # Merged scenes are already in beat_uuid order; others get the order a merge would give them
+        beats.sort(key=_beat_key)
+    reshaped = False
+    for beat_uuid in ops.get("delete", []):
+        i = bisect_left(beats, beat_uuid, key=_beat_key)
+        if i < len(beats) and beats[i]["beat_uuid"] == beat_uuid:
+            del beats[i]
+            reshaped = True
+    for beat in ops.get("upsert", []):
+        beat = dict(beat)
+        i = bisect_left(beats, beat["beat_uuid"], key=_beat_key)
+        if i < len(beats) and beats[i]["beat_uuid"] == beat["beat_uuid"]:
+            if field == "micro_beats":
+                # Same slot, so enforce_continuity's index / arcs flag carry over
+                beat["micro_beat_index"] = beats[i].get("micro_beat_index", i)
+                beat.setdefault("sections", {})["connected_completion_arcs"] = False
+            beats[i] = beat
+        else:
+            beats.insert(i, beat)
+            reshaped = True
+    if reshaped and field == "micro_beats":
+        for i, mb in enumerate(beats):
+            mb["micro_beat_index"] = i
+            mb.setdefault("sections", {})["connected_completion_arcs"] = False
+    return reshaped
+
+def apply_delta_chunk(scene: Dict[str, Any], delta: Dict[str, Any],
+                      force_overwrite_text_for: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Apply one delta to its existing scene record in place.
+    Text changes go through handle_scene_text_conflict like a whole-chunk
+    merge: logged and preserved unless the scene is in force_overwrite_text_for.
+    A patch made against different text than the scene now holds cannot be
+    rebuilt, so it is always reported as a conflict and skipped.
+    """
+    if delta.get("delta_version") != DELTA_VERSION:
+        raise ValueError(f"Unsupported delta_version {delta.get('delta_version')!r}")
+    for field in BEAT_FIELDS:
+        if field in delta:
+            _apply_beat_ops(scene, field, delta[field])
+
+    text_changed = False
+    if "text" in delta:
+        current = scene.get("scene_text", "")
+        if text_hash(current) != delta["text"]["base"]:
+            logger.warning(f"[CONFLICT] Scene text patch for {scene['scene_uuid']} was made against "
+                           f"different text; preserved existing.")
+        else:
+            incoming = apply_text_ops(current, [tuple(op) for op in delta["text"]["ops"]])
+            handle_scene_text_conflict(scene, {"scene_text": incoming}, force_overwrite_text_for or [])
+            text_changed = scene.get("scene_text") == incoming
+
+    refs = scene.setdefault("refs", {})
+    for key, added in delta.get("refs", {}).items():
+        refs[key] = sorted(set(refs.get(key, [])) | set(added))
+    if "connected_completion_arcs" in delta:
+        sections = scene.setdefault("sections", {})
+        sections["connected_completion_arcs"] = sorted(
+            set(sections.get("connected_completion_arcs", [])) | set(delta["connected_completion_arcs"]))
+
+    # The advisory only depends on scene_text and flags, neither of which changes otherwise
+    if text_changed:
+        insert_trinity_advisory(scene)
+    return scene
+
+def merge_delta_chunks(existing_passfile: Dict[str, Any],
+                       deltas: List[Dict[str, Any]],
+                       schema: Optional[Dict[str, Any]] = None,
+                       force_overwrite_text_for: Optional[List[str]] = None,
+                       graph: Optional[ContinuityGraph] = None) -> Dict[str, Any]:
+    """
+    merge_chunks_v5_13 for delta chunks: only the touched scenes are patched,
+    validated and updated in graph. Deltas for scenes not in the passfile are
+    logged and skipped (send the whole chunk instead).
+    """
+    touched: Dict[str, None] = {}
+    # Dirty fields keyed the way validate_minimal_canonical looks records up
+    dirty: Dict[str, set] = {}
+    for delta in deltas:
+        scene_uuid = delta.get("scene_uuid")
+        scene = existing_passfile.get(scene_uuid)
+        if not isinstance(scene, dict):
+            logger.error(f"Delta for unknown scene_uuid {scene_uuid}; skipped.")
+            continue
+        apply_delta_chunk(scene, delta, force_overwrite_text_for)
+        touched[scene_uuid] = None
+        dirty.setdefault(record_scene_uuid(scene), set()).update(delta_dirty_fields(delta))
+
+    if schema and touched:
+        validate_minimal_canonical([existing_passfile[u] for u in touched], schema_path=None,
+                                   schema=schema, dirty=dirty)
+    if graph is not None and touched:
+        graph.update(existing_passfile, set(touched))
+    return existing_passfile
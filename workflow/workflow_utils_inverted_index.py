@@ -0,0 +1,393 @@
+# workflow_utils_inverted_index.py
+# -----------------------
+# Inverted index over passfile scenes and beats
+# Terms -> scene / beat posting lists, boolean AND / OR queries
+# Stored next to the passfile in <passfile>.terms/ (manifest + one file per bucket),
+# refreshed by write_passfile; an update rewrites only the buckets it touched
+# -----------------------
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+from workflow_utils_checkpoint import is_scene_key
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+TERMS_SUFFIX = ".terms"
+TERMS_VERSION = 2
+MANIFEST_NAME = "manifest.json"
+BUCKET_COUNT = 256
+
+# sections.trinity_advisory list fields indexed as "<field>:<token>"
+ADVISORY_LIST_FIELDS = ["pearls_detected", "cuffs_detected", "moan_detected", "sexual_actions", "erotic_physiology"]
+ADVISORY_BOOL_FIELDS = ["two_condition_rule_triggered"]
+
+BeatId = Tuple[str, str]  # (scene key, beat_uuid)
+Query = Union[str, Tuple[Any, ...]]
+
+
+def terms_path_for(path: Union[str, Path]) -> Path:
+    p = Path(path)
+    return p.with_name(p.name + TERMS_SUFFIX)
+
+
+# -----------------------
+# Term extraction
+# -----------------------
+def scene_terms(scene: Dict[str, Any]) -> List[str]:
+    """
+    Scene-level terms:
+    - flag:<f>, merch:<ref> from scene_metadata.flags / merch_refs
+    - flag_ref:<ref> from refs.flag_refs
+    - <advisory field>:<token> and two_condition_rule_triggered from sections.trinity_advisory
+    """
+    terms: Set[str] = set()
+    metadata = scene.get("scene_metadata") or {}
+    terms.update(f"flag:{f}" for f in metadata.get("flags") or [])
+    terms.update(f"merch:{m}" for m in metadata.get("merch_refs") or [])
+    terms.update(f"flag_ref:{r}" for r in (scene.get("refs") or {}).get("flag_refs") or [])
+    advisory = (scene.get("sections") or {}).get("trinity_advisory") or {}
+    for field in ADVISORY_LIST_FIELDS:
+        terms.update(f"{field}:{token}" for token in advisory.get(field) or [])
+    terms.update(field for field in ADVISORY_BOOL_FIELDS if advisory.get(field) is True)
+    return sorted(terms)
+
+def beat_terms(beat: Dict[str, Any]) -> List[str]:
+    """keyword:<kw> for each keyword_counts entry above zero."""
+    counts = beat.get("keyword_counts") or {}
+    return sorted(f"keyword:{kw}" for kw, n in counts.items() if n)
+
+def _document(scene: Dict[str, Any]) -> Dict[str, Any]:
+    beats: Dict[str, List[str]] = {}
+    for field in ("beats", "micro_beats"):
+        for beat in scene.get(field) or []:
+            beat_uuid = beat.get("beat_uuid") if isinstance(beat, dict) else None
+            if beat_uuid:
+                terms = beat_terms(beat)
+                beats[beat_uuid] = sorted(set(beats.get(beat_uuid, [])) | set(terms))
+    return {"terms": scene_terms(scene), "beats": beats}
+
+
+# -----------------------
+# Query parsing
+# -----------------------
+_TOKEN_RE = re.compile(r"\(|\)|[^\s()]+")
+
+def parse_query(text: str) -> Query:
+    """
+    'A AND (B OR C)' -> ("and", "A", ("or", "B", "C")). AND binds tighter than OR;
+    terms are any run of non-space, non-parenthesis characters.
+    """
+    tokens = _TOKEN_RE.findall(text)
+    pos = 0
+
+    def peek() -> Optional[str]:
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take() -> str:
+        nonlocal pos
+        if pos >= len(tokens):
+            raise ValueError(f"Unexpected end of query: {text!r}")
+        pos += 1
+        return tokens[pos - 1]
+
+    def parse_or() -> Query:
+        parts = [parse_and()]
+        while peek() == "OR":
+            take()
+            parts.append(parse_and())
+        return parts[0] if len(parts) == 1 else ("or", *parts)
+
+    def parse_and() -> Query:
+        parts = [parse_atom()]
+        while peek() == "AND":
+            take()
+            parts.append(parse_atom())
+        return parts[0] if len(parts) == 1 else ("and", *parts)
+
+    def parse_atom() -> Query:
+        token = take()
+        if token == "(":
+            inner = parse_or()
+            if take() != ")":
+                raise ValueError(f"Expected ')' in query: {text!r}")
+            return inner
+        if token in ("AND", "OR", ")"):
+            raise ValueError(f"Unexpected {token!r} in query: {text!r}")
+        return token
+
+    result = parse_or()
+    if pos != len(tokens):
+        raise ValueError(f"Unexpected {tokens[pos]!r} in query: {text!r}")
+    return result
+
+
+# -----------------------
+# Index
+# -----------------------
+class InvertedIndex:
+    """
+    Posting lists for the passfile's scene records (is_scene_key entries; the
+    checkpoint and pipeline scratch fields are never scenes). Beat-level terms
+    (keyword:*) also post their scene, so scene queries can mix scene and beat
+    terms; beat queries expand scene-level terms to all beats of the matching scenes.
+    Forward documents are grouped into BUCKET_COUNT buckets by key hash. On disk
+    (<passfile>.terms/) each bucket is a file of its own next to a small manifest;
+    a loaded index reads bucket files on first use, builds the postings on the
+    first query, and save() rewrites only the buckets that changed.
+    """
+
+    def __init__(self):
+        self._buckets: List[Optional[Dict[str, Dict[str, Any]]]] = [{} for _ in range(BUCKET_COUNT)]
+        self._scene_postings: Dict[str, Set[str]] = defaultdict(set)
+        self._beat_postings: Dict[str, Set[BeatId]] = defaultdict(set)
+        self._postings_built = True
+        self._source: Optional[Path] = None      # sidecar the unloaded buckets come from
+        self._changed: Set[int] = set(range(BUCKET_COUNT))  # buckets the sidecar doesn't have yet
+
+    @classmethod
+    def build(cls, passfile: Dict[str, Any]) -> "InvertedIndex":
+        index = cls()
+        index.update(passfile, passfile.keys())
+        return index
+
+    @property
+    def docs(self) -> Dict[str, Dict[str, Any]]:
+        """Every scene's document (reads all bucket files of a loaded index)."""
+        out: Dict[str, Dict[str, Any]] = {}
+        for bucket in range(BUCKET_COUNT):
+            out.update(self._bucket(bucket))
+        return out
+
+    @property
+    def scene_postings(self) -> Dict[str, Set[str]]:
+        self._build_postings()
+        return self._scene_postings
+
+    @property
+    def beat_postings(self) -> Dict[str, Set[BeatId]]:
+        self._build_postings()
+        return self._beat_postings
+
+    def _bucket(self, bucket: int) -> Dict[str, Dict[str, Any]]:
+        entries = self._buckets[bucket]
+        if entries is None:
+            entries = self._read_bucket(bucket)
+            self._buckets[bucket] = entries
+        return entries
+
+    # -----------------------
+    # Maintenance
+    # -----------------------
+    def _build_postings(self) -> None:
+        if self._postings_built:
+            return
+        for bucket in range(BUCKET_COUNT):
+            for key, doc in self._bucket(bucket).items():
+                self._post(key, doc)
+        self._postings_built = True
+
+    def _post(self, key: str, doc: Dict[str, Any]) -> None:
+        for term in doc["terms"]:
+            self._scene_postings[term].add(key)
+        for beat_uuid, terms in doc["beats"].items():
+            for term in terms:
+                self._beat_postings[term].add((key, beat_uuid))
+                self._scene_postings[term].add(key)
+
+    def _unpost(self, key: str, doc: Dict[str, Any]) -> None:
+        all_terms = set(doc["terms"])
+        for beat_uuid, terms in doc["beats"].items():
+            all_terms.update(terms)
+            for term in terms:
+                self._discard(self._beat_postings, term, (key, beat_uuid))
+        for term in all_terms:
+            self._discard(self._scene_postings, term, key)
+
+    @staticmethod
+    def _discard(postings: Dict[str, Set[Any]], term: str, item: Any) -> None:
+        bucket = postings.get(term)
+        if bucket is not None:
+            bucket.discard(item)
+            if not bucket:
+                del postings[term]
+
+    def update(self, passfile: Dict[str, Any], keys: Iterable[str]) -> None:
+        """Re-index only the given top-level entries (absent or non-scene ones are dropped)."""
+        for key in keys:
+            scene = passfile.get(key)
+            doc = _document(scene) if is_scene_key(key) and isinstance(scene, dict) else None
+            bucket = _bucket_of(key)
+            entries = self._bucket(bucket)
+            old = entries.pop(key, None)
+            if doc is not None:
+                entries[key] = doc
+            if old == doc:
+                continue
+            if self._postings_built:
+                if old is not None:
+                    self._unpost(key, old)
+                if doc is not None:
+                    self._post(key, doc)
+            self._changed.add(bucket)
+
+    # -----------------------
+    # Queries
+    # -----------------------
+    def terms(self) -> List[str]:
+        return sorted(self.scene_postings)
+
+    def _beats_of(self, scenes: Iterable[str]) -> Set[BeatId]:
+        return {(key, beat_uuid) for key in scenes for beat_uuid in self._bucket(_bucket_of(key))[key]["beats"]}
+
+    def _postings(self, term: str, level: str) -> Set[Any]:
+        if level == "scene":
+            return self.scene_postings.get(term, set())
+        if term in self.beat_postings:
+            return self.beat_postings[term]
+        return self._beats_of(self.scene_postings.get(term, ()))
+
+    def _evaluate(self, query: Query, level: str) -> Set[Any]:
+        if isinstance(query, str):
+            return self._postings(query, level)
+        op, *args = query
+        if not args:
+            raise ValueError(f"Empty {op!r} query")
+        if op == "or":
+            result: Set[Any] = set()
+            for arg in args:
+                result |= self._evaluate(arg, level)
+            return result
+        if op == "and":
+            # Smallest posting list first keeps each intersection cheap
+            sets = sorted((self._evaluate(arg, level) for arg in args), key=len)
+            result = set(sets[0])
+            for s in sets[1:]:
+                if not result:
+                    break
+                result &= s
+            return result
+        raise ValueError(f"Unknown query operator {op!r}; expected 'and' or 'or'")
+
+    def query(self, query: Query, level: str = "scene") -> Union[List[str], List[BeatId]]:
+        """
+        query: a term, a ("and"|"or", *subqueries) tuple, or a string such as
+        'two_condition_rule_triggered AND cuffs_detected:leather'.
+        level="scene" returns sorted scene keys, level="beat" sorted (scene key, beat_uuid) pairs.
+        """
+        if level not in ("scene", "beat"):
+            raise ValueError(f"Unknown query level {level!r}; expected 'scene' or 'beat'")
+        if isinstance(query, str) and (" " in query.strip() or "(" in query):
+            query = parse_query(query)
+        return sorted(self._evaluate(query, level))
+
+    # -----------------------
+    # Sidecar persistence (forward documents only; postings are rebuilt on first query)
+    # -----------------------
+    def _read_bucket(self, bucket: int) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._source / _bucket_file(bucket), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def save(self, path: Union[str, Path]) -> None:
+        p = Path(path)
+        st = p.stat()
+        target = terms_path_for(p)
+        target.mkdir(parents=True, exist_ok=True)
+        # Buckets this index holds but the sidecar doesn't: all of them unless it was loaded from there
+        changed = self._changed if self._source == target else set(range(BUCKET_COUNT))
+        for bucket in sorted(changed):
+            entries = self._bucket(bucket)
+            if entries:
+                _write_json(target / _bucket_file(bucket), entries)
+            else:
+                (target / _bucket_file(bucket)).unlink(missing_ok=True)
+        # The manifest goes last: until it is replaced, its stamp no longer matches the passfile
+        _write_json(target / MANIFEST_NAME, {"version": TERMS_VERSION, "size": st.st_size,
+                                             "mtime_ns": st.st_mtime_ns})
+        self._source, self._changed = target, set()
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Optional["InvertedIndex"]:
+        """The stored index, or None if it is missing, unreadable or older than the passfile."""
+        p = Path(path)
+        target = terms_path_for(p)
+        try:
+            with open(target / MANIFEST_NAME, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            st = p.stat()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable term index {target}: {e}")
+            return None
+        if manifest.get("version") != TERMS_VERSION or \
+                (manifest.get("size"), manifest.get("mtime_ns")) != (st.st_size, st.st_mtime_ns):
+            return None
+        index = cls()
+        index._buckets = [None] * BUCKET_COUNT
+        index._postings_built = False
+        index._source, index._changed = target, set()
+        return index
+
+
+def _bucket_of(key: str) -> int:
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=1).digest()[0] % BUCKET_COUNT
+
+def _bucket_file(bucket: int) -> str:
+    return f"bucket-{bucket:02x}.json"
+
+def _write_json(target: Path, payload: Any) -> None:
+    with tempfile.NamedTemporaryFile("w", delete=False, dir=target.parent, encoding="utf-8") as tmp:
+        json.dump(payload, tmp, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp.name, target)
+
+
+def load_or_build_inverted_index(path: Union[str, Path], save: bool = True) -> InvertedIndex:
+    """Stored index when current; otherwise index the passfile (and store the result if save)."""
+    index = InvertedIndex.load(path)
+    if index is None:
+        from workflow_utils import read_passfile
+        index = InvertedIndex.build(read_passfile(str(path)))
+        if save and Path(path).exists():
+            index.save(path)
+    return index
+
+
+# -----------------------
+# Write-path hook
+# -----------------------
+class InvertedIndexRefresh:
+    """
+    Captured before write_passfile replaces the file, applied after; same
+    contract as MerkleRefresh. Only passfiles with an existing sidecar are maintained.
+    With the list of changed keys and a sidecar matching the old file, only those
+    entries are re-indexed and only their buckets rewritten; otherwise the index is rebuilt.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.enabled = terms_path_for(path).exists()
+        self.index = InvertedIndex.load(path) if self.enabled else None
+
+    def apply(self, data: Dict[str, Any], changed: Optional[Iterable[str]]) -> None:
+        if not self.enabled:
+            return
+        try:
+            if self.index is not None and changed is not None:
+                self.index.update(data, changed)
+            else:
+                self.index = InvertedIndex.build(data)
+            self.index.save(self.path)
+        except Exception as e:
+            logger.warning(f"Could not refresh term index for {self.path}: {e}")
@@ -0,0 +1,20 @@
+# workflow_utils_keywords.py
+# -----------------------
+# Micro-beat keyword lexicon and analysis defaults, shared by pipeline_full
+# and pipeline_incremental
+# -----------------------
+from typing import Dict
+
+# -----------------------
+# Constants
+# -----------------------
+KEYWORDS = ["dominance", "submission", "tension", "release", "erotic", "gaze", "posture", "voice", "control"]
+DEFAULT_CHUNK_SIZE = 5
+DEFAULT_ARC_THRESHOLDS = {"erotic_peak": 0.3, "fast_pacing_word_count": 30}
+ROLLING_AVG_WINDOW = 3
+
+
+def keyword_counts(text: str) -> Dict[str, int]:
+    """Substring count of each KEYWORDS entry in text.lower()."""
+    lowered = text.lower()
+    return {kw: lowered.count(kw) for kw in KEYWORDS}
@@ -0,0 +1,35 @@
+# workflow_utils_lexicon.py
+# -----------------------
+# Lexicon matchers, built on first use and memoized per lexicon
+# -----------------------
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, List, Tuple
+
+_WORD_RE = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=64)
+def _compile_token_matcher(keywords: Tuple[str, ...]) -> Callable[[str], List[str]]:
+    # A keyword made only of word characters matches r"\bkw\b" exactly when it
+    # equals one of the text's maximal \w+ runs, so one tokenization pass covers
+    # all of them. Anything else keeps its own regex.
+    word_only = {k for k in keywords if k and _WORD_RE.fullmatch(k)}
+    patterns = {k: re.compile(rf"\b{re.escape(k)}\b") for k in keywords if k not in word_only}
+
+    def match(text: str) -> List[str]:
+        lowered = (text or "").lower()
+        words = set(_WORD_RE.findall(lowered)) if word_only else set()
+        return [k for k in keywords
+                if (k in words if k in word_only else patterns[k].search(lowered))]
+
+    return match
+
+
+def token_matcher(keywords: Iterable[str]) -> Callable[[str], List[str]]:
+    """
+    Returns match(text) -> keywords found as whole words in text.lower(), in
+    lexicon order. Same result as testing re.search(rf"\\b{re.escape(k)}\\b", ...)
+    per keyword.
+    """
+    return _compile_token_matcher(tuple(keywords))
@@ -0,0 +1,211 @@
+# workflow_utils_marketing_sink.py
+# -----------------------
+# Write-behind sink for marketing copy (per-scene merch evidence)
+# Records are buffered and appended in batches to <passfile>.marketing.jsonl
+# by a background writer thread; flushed on size, on interval, on demand and at exit
+# -----------------------
+import atexit
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+MARKETING_SUFFIX = ".marketing.jsonl"
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+
+def marketing_copy_path_for(passfile_path: Union[str, Path]) -> Path:
+    p = Path(passfile_path)
+    return p.with_name(p.name + MARKETING_SUFFIX)
+
+
+# -----------------------
+# Sink
+# -----------------------
+class MarketingCopySink:
+    """
+    save(scene_uuid, merch_evidence) only appends to an in-memory buffer; the
+    writer thread turns each batch into one append to the JSONL file.
+    The writer wakes when batch_size records are pending, flush_interval has
+    passed since the oldest one, or flush()/close() is called.
+    A write error is re-raised from the next save()/flush() and the failed
+    batch is kept; it is retried after flush_interval (or on flush()/close()),
+    not straight away.
+    """
+
+    def __init__(self, path: Union[str, Path], batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.batches = 0
+        self._cond = threading.Condition()
+        self._buffer: List[str] = []
+        self._oldest = 0.0
+        self._retry_at = 0.0  # after a failed write, no size/interval-triggered write before this
+        self._submitted = 0
+        self._written = 0
+        self._flush_requested = False
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # -----------------------
+    # Producer side
+    # -----------------------
+    def save(self, scene_uuid: str, merch_evidence: Any) -> None:
+        line = json.dumps({"scene_uuid": scene_uuid, "merch_evidence": merch_evidence},
+                          ensure_ascii=False, separators=(",", ":"))
+        with self._cond:
+            self._raise_error()
+            if self._closed:
+                raise RuntimeError(f"Marketing copy sink for {self.path} is closed")
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(line)
+            self._submitted += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="marketing-sink", daemon=True)
+                self._thread.start()
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify_all()
+
+    def flush(self) -> None:
+        """Block until everything saved so far is on disk."""
+        with self._cond:
+            target = self._submitted
+            while self._written < target and self._error is None and self._thread is not None:
+                self._flush_requested = True
+                self._cond.notify_all()
+                self._cond.wait()
+            self._raise_error()
+
+    def close(self) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        with self._cond:
+            if self._buffer:
+                logger.error(f"{len(self._buffer)} marketing copy records for {self.path} were not written")
+            self._raise_error()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    # -----------------------
+    # Writer thread
+    # -----------------------
+    def _deadline(self) -> float:
+        # When the pending records are due without a flush()/close()
+        due = self._oldest + self.flush_interval if len(self._buffer) < self.batch_size else 0.0
+        return max(due, self._retry_at)
+
+    def _due(self) -> bool:
+        return bool(self._buffer) and (
+            self._closed or self._flush_requested or time.monotonic() >= self._deadline()
+        )
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._due():
+                    if self._closed and not self._buffer:
+                        return
+                    timeout = None
+                    if self._buffer:
+                        timeout = max(0.0, self._deadline() - time.monotonic())
+                    self._cond.wait(timeout)
+                batch, self._buffer = self._buffer, []
+                self._flush_requested = False
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(batch) + "\n")
+            except BaseException as e:
+                logger.error(f"Failed to write marketing copy to {self.path}: {e}")
+                with self._cond:
+                    self._buffer[:0] = batch
+                    self._oldest = time.monotonic()
+                    self._retry_at = self._oldest + self.flush_interval
+                    self._error = e
+                    self._cond.notify_all()
+                    if self._closed:
+                        return
+                continue
+            with self._cond:
+                self._retry_at = 0.0
+                self._written += len(batch)
+                self.batches += 1
+                self._cond.notify_all()
+
+
+# -----------------------
+# Shared sinks (one per passfile, closed at exit)
+# -----------------------
+_sinks: Dict[Path, MarketingCopySink] = {}
+_sinks_lock = threading.Lock()
+
+
+def get_marketing_sink(passfile_path: Union[str, Path], **options: Any) -> MarketingCopySink:
+    """The process-wide sink for a passfile's marketing copy (options apply on first use)."""
+    target = marketing_copy_path_for(passfile_path).resolve()
+    with _sinks_lock:
+        sink = _sinks.get(target)
+        if sink is None or sink._closed:
+            sink = _sinks[target] = MarketingCopySink(target, **options)
+        return sink
+
+def close_marketing_sinks() -> None:
+    with _sinks_lock:
+        sinks = list(_sinks.values())
+        _sinks.clear()
+    for sink in sinks:
+        try:
+            sink.close()
+        except Exception as e:
+            logger.error(f"Failed to close marketing copy sink {sink.path}: {e}")
+
+atexit.register(close_marketing_sinks)
+
+
+# -----------------------
+# Reader
+# -----------------------
+def read_marketing_copy(path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Per-scene merch evidence from a marketing copy file (or its passfile's path);
+    the latest record for a scene wins. A torn final line from an interrupted
+    write is skipped.
+    """
+    p = Path(path)
+    if not p.name.endswith(MARKETING_SUFFIX):
+        p = marketing_copy_path_for(p)
+    copy: Dict[str, Any] = {}
+    if not p.exists():
+        return copy
+    with open(p, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping unreadable marketing copy record {p}:{lineno}")
+                continue
+            copy[record["scene_uuid"]] = record["merch_evidence"]
+    return copy
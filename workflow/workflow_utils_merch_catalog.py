@@ -0,0 +1,201 @@
+# workflow_utils_merch_catalog.py
+# -----------------------
+# Canonical merch catalog
+# Loaded once per (path, mtime, size) into a normalized lookup:
+# - hash: normalized canonical ref / alias -> canonical ref
+# - prefix trie over the same keys, for truncated refs that identify one item
+# Lookups cost O(len(ref)) regardless of catalog size
+# Prefix matches are reported apart from exact matches so truncated refs stay visible
+#
+# The catalog is not shipped with the tree: install it at data/merch_catalog.json
+# (or point MERCH_CATALOG_PATH at it) as {canonical ref: {"aliases": [...], ...}}.
+# Without one, pipeline_full falls back to per-scene canonicalization.
+# -----------------------
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+MERCH_CATALOG_PATH = Path(os.environ.get("MERCH_CATALOG_PATH")
+                          or Path(__file__).resolve().parent.parent / "data" / "merch_catalog.json")
+MIN_PREFIX_LEN = 3
+_SEPARATOR_RE = re.compile(r"[^0-9a-z]+")
+_AMBIGUOUS = object()
+
+_catalogs: Dict[str, Tuple[Tuple[int, int], "MerchCatalog"]] = {}
+
+
+def normalize_merch_ref(ref: Optional[str]) -> str:
+    """'  Leather_Cuffs (Black) ' -> 'leather-cuffs-black'."""
+    return _SEPARATOR_RE.sub("-", (ref or "").casefold()).strip("-")
+
+
+# -----------------------
+# Catalog
+# -----------------------
+class _TrieNode:
+    __slots__ = ("children", "target")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.target: Any = None  # canonical ref if every key below maps to one item, else _AMBIGUOUS
+
+
+class MerchCatalog:
+    """
+    entries: {canonical ref: {"aliases": [...], ...}} or {canonical ref: [aliases]}.
+    lookup() tries the exact (normalized) key first, then a unique prefix of at
+    least MIN_PREFIX_LEN characters, and says which one matched. Results are
+    memoized per raw ref, so the same catalog can be shared by every scene of a run.
+    """
+
+    def __init__(self, entries: Mapping[str, Any]):
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._exact: Dict[str, str] = {}
+        self._root = _TrieNode()
+        self._memo: Dict[str, Tuple[Optional[str], bool]] = {}
+        for canonical, entry in entries.items():
+            if isinstance(entry, list):
+                entry = {"aliases": entry}
+            self.entries[canonical] = dict(entry or {})
+            for key in [canonical, *self.entries[canonical].get("aliases", [])]:
+                self._add_key(normalize_merch_ref(key), canonical)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "MerchCatalog":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _add_key(self, key: str, canonical: str) -> None:
+        if not key:
+            return
+        existing = self._exact.setdefault(key, canonical)
+        if existing != canonical:
+            logger.warning(f"Merch alias {key!r} maps to both {existing!r} and {canonical!r}; keeping {existing!r}")
+            return
+        node = self._root
+        for ch in key:
+            node = node.children.setdefault(ch, _TrieNode())
+            if node.target is None:
+                node.target = canonical
+            elif node.target != canonical:
+                node.target = _AMBIGUOUS
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, ref: object) -> bool:
+        return isinstance(ref, str) and self.canonicalize(ref) is not None
+
+    # -----------------------
+    # Lookup
+    # -----------------------
+    def lookup(self, ref: str) -> Tuple[Optional[str], bool]:
+        """(canonical ref or None if unknown / ambiguous, True if ref matched a key exactly)."""
+        if ref in self._memo:
+            return self._memo[ref]
+        key = normalize_merch_ref(ref)
+        result, exact = self._exact.get(key), True
+        if result is None and len(key) >= MIN_PREFIX_LEN:
+            exact = False
+            node: Optional[_TrieNode] = self._root
+            for ch in key:
+                node = node.children.get(ch)
+                if node is None:
+                    break
+            if node is not None and node.target is not _AMBIGUOUS:
+                result = node.target
+        self._memo[ref] = (result, exact and result is not None)
+        return self._memo[ref]
+
+    def canonicalize(self, ref: str) -> Optional[str]:
+        """Canonical ref for ref (exact key or unique prefix), or None if unknown / ambiguous."""
+        return self.lookup(ref)[0]
+
+    def canonicalize_refs(self, refs: Iterable[str]) -> Tuple[List[str], List[str], Dict[str, str]]:
+        """
+        (canonical refs, deduplicated in first-seen order; unknown refs as given;
+         {ref: canonical ref} for refs that only matched as a prefix).
+        """
+        canonical: List[str] = []
+        seen = set()
+        unknown: List[str] = []
+        prefixed: Dict[str, str] = {}
+        for ref in refs:
+            target, exact = self.lookup(ref) if isinstance(ref, str) else (None, False)
+            if target is None:
+                unknown.append(ref)
+                continue
+            if not exact:
+                prefixed[ref] = target
+            if target not in seen:
+                seen.add(target)
+                canonical.append(target)
+        return canonical, unknown, prefixed
+
+    def canonicalize_batch(self, scene_refs: Mapping[str, Iterable[str]]) -> Dict[str, Any]:
+        """
+        scene_refs: {scene key: merch refs}. Returns
+        {"refs": {scene key: canonical refs}, "unknown": {scene key: unknown refs},
+         "prefix": {scene key: {ref: canonical ref}}, "unknown_counts": {unknown ref: scenes it appears in}};
+        scenes without unknown / prefix-matched refs are omitted from "unknown" / "prefix".
+        """
+        refs: Dict[str, List[str]] = {}
+        unknown: Dict[str, List[str]] = {}
+        prefix: Dict[str, Dict[str, str]] = {}
+        counts: Dict[str, int] = {}
+        for key, scene in scene_refs.items():
+            refs[key], missing, prefixed = self.canonicalize_refs(scene)
+            if prefixed:
+                prefix[key] = prefixed
+            if missing:
+                unknown[key] = missing
+                for ref in set(map(str, missing)):
+                    counts[ref] = counts.get(ref, 0) + 1
+        return {"refs": refs, "unknown": unknown, "prefix": prefix,
+                "unknown_counts": dict(sorted(counts.items()))}
+
+    def canonicalize_passfile(self, passfile: Dict[str, Any]) -> Dict[str, Any]:
+        """Rewrite scene_metadata.merch_refs of every scene in place; returns the batch report."""
+        scenes = {key: scene["scene_metadata"] for key, scene in passfile.items()
+                  if isinstance(scene, dict) and isinstance(scene.get("scene_metadata"), dict)}
+        report = self.canonicalize_batch({key: md.get("merch_refs") or [] for key, md in scenes.items()})
+        for key, md in scenes.items():
+            if "merch_refs" in md:
+                md["merch_refs"] = report["refs"][key]
+        if report["prefix"]:
+            logger.warning(f"Merch refs matched by prefix only: {report['prefix']}")
+        if report["unknown"]:
+            logger.warning(f"Unknown merch refs: {report['unknown_counts']}")
+        return report
+
+
+def get_merch_catalog(path: Optional[Union[str, Path]] = None) -> MerchCatalog:
+    """The catalog at path (default MERCH_CATALOG_PATH), loaded once per (mtime, size)."""
+    p = Path(path) if path else MERCH_CATALOG_PATH
+    try:
+        st = p.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No merch catalog at {p}; install one there or pass its path") from None
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = str(p.resolve())
+    cached = _catalogs.get(key)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    catalog = MerchCatalog.load(p)
+    _catalogs[key] = (stamp, catalog)
+    return catalog
+
+
+def default_merch_catalog() -> Optional[MerchCatalog]:
+    """The catalog at MERCH_CATALOG_PATH, or None when none is installed."""
+    if not MERCH_CATALOG_PATH.exists():
+        return None
+    return get_merch_catalog(MERCH_CATALOG_PATH)
@@ -3,6 +3,19 @@
 import logging
 from typing import Dict, Any, List, Optional
 
+from workflow_utils import (
+    generate_scene_uuid_from_metadata,
+    assign_micro_beat_uuids,
+    enforce_continuity,
+    insert_trinity_advisory,
+    record_scene_uuid,
+    validate_minimal_canonical
+)
+from workflow_utils_blobs import same_text
+from workflow_utils_continuity_graph import ContinuityGraph
+from workflow_utils_profiling import memory_stage
+from workflow_utils_tracing import trace_iter, trace_span
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,6 +28,7 @@ def merge_chunks_v5_13(
     incoming_chunks: List[Dict[str, Any]],
     schema: Optional[Dict[str, Any]] = None,
     force_overwrite_text_for: Optional[List[str]] = None,
+    graph: Optional[ContinuityGraph] = None,
 ) -> Dict[str, Any]:
     """
     Merge incoming chunks into an existing passfile according to v5.13 rules:
@@ -22,52 +36,70 @@ def merge_chunks_v5_13(
     - Scene_text conflict logging (never overwrite silently)
     - Union of beats, micro_beats, refs, trinity advisory
     - Special handling for Chunk 15 continuity arcs
+    - graph, if given, is updated for the merged scenes only
     """
 
     force_overwrite_text_for = force_overwrite_text_for or []
+    # Top-level fields each pre-existing scene had changed, keyed the way
+    # validate_minimal_canonical looks records up; scenes added by this merge are validated in full
+    dirty: Dict[str, set] = {}
+    added = set()
+    touched: Dict[str, None] = {}
+
+    with memory_stage("merge_v5_13.chunks"), trace_span("merge_v5_13.chunks"):
+        for chunk in trace_iter(incoming_chunks, "merge_v5_13.chunk"):
+            # Step 1: Ensure deterministic UUIDs
+            chunk["scene_uuid"] = generate_scene_uuid_from_metadata(
+                chunk.get("scene_metadata", {})
+            )
+            chunk["micro_beats"] = assign_micro_beat_uuids(
+                chunk.get("micro_beats", []),
+                chunk.get("scene_metadata", {})
+            )
 
-    for chunk in incoming_chunks:
-        # Step 1: Ensure deterministic UUIDs
-        chunk["scene_uuid"] = generate_scene_uuid_from_metadata(
-            chunk.get("scene_metadata", {})
-        )
-        chunk["micro_beats"] = assign_micro_beat_uuids(
-            chunk.get("micro_beats", []),
-            chunk.get("scene_metadata", {})
-        )
+            scene_uuid = chunk["scene_uuid"]
 
-        scene_uuid = chunk["scene_uuid"]
+            # Step 2: Merge vs Add
+            if scene_uuid in existing_passfile:
+                existing = existing_passfile[scene_uuid]
 
-        # Step 2: Merge vs Add
-        if scene_uuid in existing_passfile:
-            existing = existing_passfile[scene_uuid]
+                # Beats
+                merge_beats_by_uuid(existing, chunk)
 
-            # Beats
-            merge_beats_by_uuid(existing, chunk)
+                # Micro-beats
+                merge_micro_beats_by_uuid(existing, chunk)
 
-            # Micro-beats
-            merge_micro_beats_by_uuid(existing, chunk)
+                # Refs
+                union_and_sort_refs(existing, chunk)
 
-            # Refs
-            union_and_sort_refs(existing, chunk)
+                # Continuity (special for Chunk 15)
+                merge_connected_completion_arcs(existing, chunk)
 
-            # Continuity (special for Chunk 15)
-            merge_connected_completion_arcs(existing, chunk)
+                # Scene text conflict logging
+                handle_scene_text_conflict(existing, chunk, force_overwrite_text_for)
 
-            # Scene text conflict logging
-            handle_scene_text_conflict(existing, chunk, force_overwrite_text_for)
-        else:
-            existing_passfile[scene_uuid] = chunk
+                if scene_uuid not in added:
+                    dirty.setdefault(record_scene_uuid(existing), set()).update(merged_fields(chunk))
+            else:
+                existing_passfile[scene_uuid] = chunk
+                added.add(scene_uuid)
+            touched[scene_uuid] = None
 
-        # Step 3: Trinity advisory recompute
-        insert_trinity_advisory(existing_passfile[scene_uuid])
+            # Step 3: Trinity advisory recompute
+            insert_trinity_advisory(existing_passfile[scene_uuid])
 
     # Step 4: Canonical validation
     if schema:
-        validate_minimal_canonical(list(existing_passfile.values()), schema_path=None)
+        with memory_stage("merge_v5_13.validate"), trace_span("merge_v5_13.validate"):
+            validate_minimal_canonical([existing_passfile[u] for u in touched], schema_path=None,
+                                       schema=schema, dirty=dirty)
 
     # Step 5: Deterministic ordering everywhere
-    enforce_deterministic_order(existing_passfile)
+    with memory_stage("merge_v5_13.order"), trace_span("merge_v5_13.order"):
+        enforce_deterministic_order(existing_passfile)
+
+    if graph is not None:
+        graph.update(existing_passfile, {chunk["scene_uuid"] for chunk in incoming_chunks})
 
     return existing_passfile
 
@@ -76,6 +108,13 @@ def merge_chunks_v5_13(
 # Sub-Merge Functions
 # ---------------------------
 
+def merged_fields(incoming: Dict[str, Any]) -> set:
+    """Top-level fields of an existing scene that merging `incoming` into it can change."""
+    # Refs and sections are always rewritten (ref union, continuity arcs, trinity advisory)
+    fields = {"refs", "sections"}
+    fields.update(f for f in ("beats", "micro_beats", "scene_text") if f in incoming)
+    return fields
+
 def merge_beats_by_uuid(existing: Dict[str, Any], incoming: Dict[str, Any]):
     """Union beats by beat_uuid (dedupe + sort)."""
     existing_beats = {b["beat_uuid"]: b for b in existing.get("beats", [])}
@@ -118,7 +157,7 @@ def handle_scene_text_conflict(
 ):
     """Log conflicts; overwrite only if explicitly allowed."""
     scene_uuid = existing["scene_uuid"]
-    if existing.get("scene_text") != incoming.get("scene_text"):
+    if not same_text(existing.get("scene_text"), incoming.get("scene_text")):
         if scene_uuid in force_overwrite_text_for:
             logger.warning(f"[OVERRIDE] Scene text overwritten for {scene_uuid}")
             existing["scene_text"] = incoming["scene_text"]
@@ -138,7 +177,8 @@ def enforce_deterministic_order(passfile: Dict[str, Any]):
         # Refs
         if "refs" in scene:
             for k in scene["refs"]:
-                scene["refs"][k] = sorted(scene["refs"][k])
+                if isinstance(scene["refs"][k], list):
+                    scene["refs"][k] = sorted(scene["refs"][k])
         # Arcs
         if "sections" in scene and "connected_completion_arcs" in scene["sections"]:
             scene["sections"]["connected_completion_arcs"] = sorted(
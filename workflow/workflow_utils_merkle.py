@@ -0,0 +1,308 @@
+# workflow_utils_merkle.py
+# -----------------------
+# Merkle fingerprint index over a passfile
+# - hash tree: entry (scene) -> sections / beats / micro_beats / refs -> ... -> scalars
+# - stored next to the passfile in <passfile>.merkle/ (manifest + one file per bucket),
+#   refreshed by write_passfile; an update rewrites only the buckets it touched
+# - diff walks only subtrees whose hashes differ
+# -----------------------
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+from workflow_utils_checkpoint import is_checkpoint_key
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+MERKLE_SUFFIX = ".merkle"
+MERKLE_VERSION = 2
+MANIFEST_NAME = "manifest.json"
+BUCKET_COUNT = 256
+DIGEST_SIZE = 16
+LIST_KEY = "beat_uuid"
+
+# A node is either a leaf hash (str) or {"h": hash, "t": kind, "c": children}
+#   kind "d": dict, children keyed by property name
+#   kind "k": list of records with unique beat_uuids, children keyed by beat_uuid (in list order)
+#   kind "l": any other list, children by index
+Node = Union[str, Dict[str, Any]]
+TreePath = Tuple[Any, ...]
+Change = Tuple[TreePath, str]  # (path, "added" | "removed" | "changed")
+
+
+def merkle_path_for(path: Union[str, Path]) -> Path:
+    p = Path(path)
+    return p.with_name(p.name + MERKLE_SUFFIX)
+
+
+# -----------------------
+# Hashing
+# -----------------------
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).hexdigest()
+
+def node_hash(node: Node) -> str:
+    return node if isinstance(node, str) else node["h"]
+
+def _pairs(tag: str, keys: Iterable[str], children: Dict[str, Node]) -> bytes:
+    # Keys are JSON-quoted and hashes fixed-width, so the encoding is unambiguous
+    return (tag + "".join(json.dumps(k) + node_hash(children[k]) for k in keys)).encode("utf-8")
+
+def _keyed_list(value: List[Any]) -> bool:
+    keys = [item.get(LIST_KEY) if isinstance(item, dict) else None for item in value]
+    return bool(keys) and all(isinstance(k, str) for k in keys) and len(set(keys)) == len(keys)
+
+def build_node(value: Any) -> Node:
+    """Hash tree for one JSON value."""
+    if isinstance(value, dict):
+        children = {k: build_node(v) for k, v in value.items()}
+        return {"h": _digest(_pairs("d", sorted(children), children)), "t": "d", "c": children}
+    if isinstance(value, list):
+        if _keyed_list(value):
+            children = {item[LIST_KEY]: build_node(item) for item in value}
+            return {"h": _digest(_pairs("k", children, children)), "t": "k", "c": children}
+        items = [build_node(v) for v in value]
+        return {"h": _digest(("l" + "".join(node_hash(c) for c in items)).encode()), "t": "l", "c": items}
+    if isinstance(value, str):
+        return _digest(b"s" + value.encode("utf-8"))
+    return _digest(b"v" + json.dumps(value).encode())
+
+def _bucket_of(key: str) -> int:
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=1).digest()[0] % BUCKET_COUNT
+
+
+# -----------------------
+# Diff
+# -----------------------
+def _diff_nodes(a: Node, b: Node, path: TreePath, out: List[Change]) -> None:
+    if node_hash(a) == node_hash(b):
+        return
+    if isinstance(a, str) or isinstance(b, str) or a["t"] != b["t"]:
+        out.append((path, "changed"))
+        return
+    ca, cb = a["c"], b["c"]
+    before = len(out)
+    if a["t"] == "l":
+        for i in range(min(len(ca), len(cb))):
+            _diff_nodes(ca[i], cb[i], path + (i,), out)
+        out.extend((path + (i,), "removed") for i in range(len(cb), len(ca)))
+        out.extend((path + (i,), "added") for i in range(len(ca), len(cb)))
+        return
+    for k, child in ca.items():
+        if k not in cb:
+            out.append((path + (k,), "removed"))
+        else:
+            _diff_nodes(child, cb[k], path + (k,), out)
+    out.extend((path + (k,), "added") for k in cb if k not in ca)
+    if a["t"] == "k" and len(out) == before and list(ca) != list(cb):
+        out.append((path, "changed"))  # same records, different order
+
+
+# -----------------------
+# Index
+# -----------------------
+class MerkleIndex:
+    """
+    Hash tree over every top-level passfile entry except the pipeline checkpoint. Entries are grouped into
+    BUCKET_COUNT buckets by key hash, so a diff compares BUCKET_COUNT bucket
+    hashes plus the entries of buckets that differ, then descends only into
+    changed subtrees.
+    On disk (<passfile>.merkle/) the bucket hashes sit in a small manifest and
+    each bucket's entry trees in a file of its own; a loaded index reads bucket
+    files on first use and save() rewrites only the buckets that changed.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Node]] = None):
+        self.stamp: Optional[Tuple[int, int]] = None
+        self._buckets: List[Optional[Dict[str, Node]]] = [{} for _ in range(BUCKET_COUNT)]
+        for key, node in (entries or {}).items():
+            self._buckets[_bucket_of(key)][key] = node
+        self.buckets = [self._bucket_hash(b) for b in range(BUCKET_COUNT)]
+        self.root = _digest("".join(self.buckets).encode())
+        self._source: Optional[Path] = None      # sidecar the unloaded buckets come from
+        self._changed: Set[int] = set(range(BUCKET_COUNT))  # buckets the sidecar doesn't have yet
+
+    @classmethod
+    def build(cls, passfile: Dict[str, Any]) -> "MerkleIndex":
+        return cls({k: build_node(v) for k, v in passfile.items() if not is_checkpoint_key(k)})
+
+    @property
+    def entries(self) -> Dict[str, Node]:
+        """Every entry's tree (reads all bucket files of a loaded index)."""
+        out: Dict[str, Node] = {}
+        for bucket in range(BUCKET_COUNT):
+            out.update(self._bucket(bucket))
+        return out
+
+    def _bucket(self, bucket: int) -> Dict[str, Node]:
+        entries = self._buckets[bucket]
+        if entries is None:
+            entries = self._read_bucket(bucket)
+            self._buckets[bucket] = entries
+        return entries
+
+    def _bucket_hash(self, bucket: int) -> str:
+        entries = self._bucket(bucket)
+        return _digest(_pairs("b", sorted(entries), entries))
+
+    def update(self, passfile: Dict[str, Any], keys: Iterable[str]) -> None:
+        """Re-hash only the given top-level entries (absent ones are dropped)."""
+        dirty = set()
+        for key in keys:
+            if is_checkpoint_key(key):
+                continue
+            bucket = _bucket_of(key)
+            entries = self._bucket(bucket)
+            if key in passfile:
+                entries[key] = build_node(passfile[key])
+            elif key in entries:
+                del entries[key]
+            else:
+                continue
+            dirty.add(bucket)
+        for bucket in dirty:
+            self.buckets[bucket] = self._bucket_hash(bucket)
+        self._changed |= dirty
+        if dirty:
+            self.root = _digest("".join(self.buckets).encode())
+
+    def diff(self, other: "MerkleIndex") -> List[Change]:
+        """Paths that differ going from self to other, e.g. (("scene-1", "beats", "b-2", "snippet"), "changed")."""
+        out: List[Change] = []
+        if self.root == other.root:
+            return out
+        for bucket in range(BUCKET_COUNT):
+            if self.buckets[bucket] == other.buckets[bucket]:
+                continue
+            mine, theirs = self._bucket(bucket), other._bucket(bucket)
+            for key in sorted(mine.keys() | theirs.keys()):
+                if key not in theirs:
+                    out.append(((key,), "removed"))
+                elif key not in mine:
+                    out.append(((key,), "added"))
+                else:
+                    _diff_nodes(mine[key], theirs[key], (key,), out)
+        return out
+
+    def changed_entries(self, other: "MerkleIndex") -> Set[str]:
+        """Top-level keys (scenes) that were added, removed or modified."""
+        return {path[0] for path, _ in self.diff(other)}
+
+    # -----------------------
+    # Sidecar persistence
+    # -----------------------
+    def _read_bucket(self, bucket: int) -> Dict[str, Node]:
+        target = self._source / _bucket_file(bucket)
+        try:
+            with open(target, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            entries = {}
+        if _digest(_pairs("b", sorted(entries), entries)) != self.buckets[bucket]:
+            raise ValueError(f"Merkle bucket {target} does not match its manifest")
+        return entries
+
+    def save(self, path: Union[str, Path]) -> None:
+        p = Path(path)
+        st = p.stat()
+        target = merkle_path_for(p)
+        target.mkdir(parents=True, exist_ok=True)
+        # Buckets this index holds but the sidecar doesn't: all of them unless it was loaded from there
+        changed = self._changed if self._source == target else set(range(BUCKET_COUNT))
+        for bucket in sorted(changed):
+            entries = self._bucket(bucket)
+            if entries:
+                _write_json(target / _bucket_file(bucket), entries)
+            else:
+                (target / _bucket_file(bucket)).unlink(missing_ok=True)
+        # The manifest goes last: until it is replaced, its stamp no longer matches the passfile
+        self.stamp = (st.st_size, st.st_mtime_ns)
+        _write_json(target / MANIFEST_NAME, {"version": MERKLE_VERSION, "size": self.stamp[0],
+                                             "mtime_ns": self.stamp[1], "root": self.root,
+                                             "buckets": self.buckets})
+        self._source, self._changed = target, set()
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Optional["MerkleIndex"]:
+        """The stored index, or None if it is missing, unreadable or older than the passfile."""
+        p = Path(path)
+        target = merkle_path_for(p)
+        try:
+            with open(target / MANIFEST_NAME, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            st = p.stat()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable Merkle index {target}: {e}")
+            return None
+        if manifest.get("version") != MERKLE_VERSION or \
+                (manifest.get("size"), manifest.get("mtime_ns")) != (st.st_size, st.st_mtime_ns) or \
+                len(manifest.get("buckets") or []) != BUCKET_COUNT:
+            return None
+        index = cls.__new__(cls)
+        index.stamp = (st.st_size, st.st_mtime_ns)
+        index._buckets = [None] * BUCKET_COUNT
+        index.buckets = list(manifest["buckets"])
+        index.root = manifest["root"]
+        index._source, index._changed = target, set()
+        return index
+
+
+def _bucket_file(bucket: int) -> str:
+    return f"bucket-{bucket:02x}.json"
+
+def _write_json(target: Path, payload: Any) -> None:
+    with tempfile.NamedTemporaryFile("w", delete=False, dir=target.parent, encoding="utf-8") as tmp:
+        json.dump(payload, tmp, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp.name, target)
+
+
+def load_or_build_merkle_index(path: Union[str, Path], save: bool = True) -> MerkleIndex:
+    """Stored index when current; otherwise hash the passfile (and store the result if save)."""
+    index = MerkleIndex.load(path)
+    if index is None:
+        from workflow_utils import read_passfile
+        index = MerkleIndex.build(read_passfile(str(path)))
+        if save and Path(path).exists():
+            index.save(path)
+    return index
+
+def diff_passfiles(path_a: Union[str, Path], path_b: Union[str, Path]) -> List[Change]:
+    return load_or_build_merkle_index(path_a).diff(load_or_build_merkle_index(path_b))
+
+
+# -----------------------
+# Write-path hook
+# -----------------------
+class MerkleRefresh:
+    """
+    Captured before write_passfile replaces the file, applied after.
+    Only passfiles that already have a sidecar are maintained. With the list of
+    changed keys and a sidecar matching the old file, only those entries are
+    re-hashed and only their buckets rewritten; otherwise the tree is rebuilt.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.enabled = merkle_path_for(path).exists()
+        self.index = MerkleIndex.load(path) if self.enabled else None
+
+    def apply(self, data: Dict[str, Any], changed: Optional[Iterable[str]]) -> None:
+        if not self.enabled:
+            return
+        try:
+            if self.index is not None and changed is not None:
+                self.index.update(data, changed)
+            else:
+                self.index = MerkleIndex.build(data)
+            self.index.save(self.path)
+        except Exception as e:
+            # A stale sidecar is detected by its size/mtime stamp and ignored
+            logger.warning(f"Could not refresh Merkle index for {self.path}: {e}")
@@ -0,0 +1,231 @@
+# workflow_utils_passfile_index.py
+# -----------------------
+# Lazy random-access passfile reader
+# Byte-offset index of top-level keys, cached next to the passfile as <passfile>.idx
+# Records are decoded from an mmap on demand
+# -----------------------
+import json
+import logging
+import mmap
+import os
+import tempfile
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from workflow_utils_blobs import BLOB_PREFIX, intern_text, is_blob_key, resolve_blobs
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+_WS = " \t\n\r"
+
+
+def index_path_for(path: Union[str, Path]) -> Path:
+    p = Path(path)
+    return p.with_name(p.name + INDEX_SUFFIX)
+
+
+# -----------------------
+# Index build
+# -----------------------
+def _skip_ws(text: str, i: int) -> int:
+    n = len(text)
+    while i < n and text[i] in _WS:
+        i += 1
+    return i
+
+def scan_top_level_spans(raw: bytes) -> Dict[str, Tuple[int, int]]:
+    """Map each top-level key of a JSON object to the [start, end) byte span of its value."""
+    text = raw.decode("utf-8")
+    decoder = json.JSONDecoder()
+    spans: Dict[str, Tuple[int, int]] = {}
+    i = _skip_ws(text, 0)
+    if i == len(text):
+        return spans
+    if text[i] != "{":
+        raise ValueError("Passfile top level is not a JSON object")
+    # char offsets -> byte offsets, advanced incrementally
+    char_pos, byte_pos = 0, 0
+
+    def to_bytes(ci: int) -> int:
+        nonlocal char_pos, byte_pos
+        byte_pos += len(text[char_pos:ci].encode("utf-8"))
+        char_pos = ci
+        return byte_pos
+
+    i = _skip_ws(text, i + 1)
+    if text[i] == "}":
+        return spans
+    while True:
+        if text[i] != '"':
+            raise ValueError(f"Expected key string at char {i}")
+        key, i = json.decoder.scanstring(text, i + 1)
+        i = _skip_ws(text, i)
+        if text[i] != ":":
+            raise ValueError(f"Expected ':' at char {i}")
+        i = _skip_ws(text, i + 1)
+        _, end = decoder.raw_decode(text, i)
+        spans[key] = (to_bytes(i), to_bytes(end))
+        i = _skip_ws(text, end)
+        if text[i] == ",":
+            i = _skip_ws(text, i + 1)
+            continue
+        if text[i] == "}":
+            return spans
+        raise ValueError(f"Expected ',' or '}}' at char {i}")
+
+def _file_stamp(path: Path) -> Tuple[int, int]:
+    st = path.stat()
+    return st.st_size, st.st_mtime_ns
+
+def _read_cached_index(idx_path: Path, stamp: Tuple[int, int]) -> Optional[Dict[str, Tuple[int, int]]]:
+    if not idx_path.exists():
+        return None
+    try:
+        with open(idx_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("version") == INDEX_VERSION and (cached.get("size"), cached.get("mtime_ns")) == stamp:
+            return {k: (v[0], v[1]) for k, v in cached["entries"].items()}
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable passfile index {idx_path}: {e}")
+    return None
+
+def _write_index(idx_path: Path, stamp: Tuple[int, int], spans: Dict[str, Tuple[int, int]]) -> None:
+    payload = {"version": INDEX_VERSION, "size": stamp[0], "mtime_ns": stamp[1],
+               "entries": {k: list(v) for k, v in spans.items()}}
+    try:
+        with tempfile.NamedTemporaryFile("w", delete=False, dir=idx_path.parent, encoding="utf-8") as tmp:
+            json.dump(payload, tmp, ensure_ascii=False)
+        os.replace(tmp.name, idx_path)
+    except OSError as e:
+        logger.warning(f"Could not save passfile index {idx_path}: {e}")
+
+def _index_open_file(fh, path: Path, save: bool) -> Tuple[Tuple[int, int], Dict[str, Tuple[int, int]]]:
+    """Index the exact inode behind fh (the path may be swapped by rename meanwhile)."""
+    st = os.fstat(fh.fileno())
+    stamp = (st.st_size, st.st_mtime_ns)
+    idx_path = index_path_for(path)
+    spans = _read_cached_index(idx_path, stamp)
+    if spans is None:
+        fh.seek(0)
+        spans = scan_top_level_spans(fh.read()) if st.st_size else {}
+        logger.info(f"Indexed {len(spans)} top-level keys in {path}")
+        if save:
+            _write_index(idx_path, stamp, spans)
+    return stamp, spans
+
+def load_or_build_index(path: Union[str, Path], save: bool = True) -> Dict[str, Tuple[int, int]]:
+    """Reuse <passfile>.idx when it matches the passfile's size/mtime, otherwise rebuild it."""
+    p = Path(path)
+    with open(p, "rb") as fh:
+        return _index_open_file(fh, p, save)[1]
+
+
+# -----------------------
+# Lazy Mapping
+# -----------------------
+class LazyPassfile(Mapping):
+    """
+    Read-only Mapping over a passfile that decodes only the records you ask for.
+    Each access checks the file's size/mtime and re-indexes if it changed.
+    Every lookup decodes a fresh object, so callers may mutate what they get.
+    Text blobs are hidden from the mapping and resolved into the records that use them.
+    """
+
+    def __init__(self, path: Union[str, Path], save_index: bool = True):
+        self.path = Path(path)
+        self.save_index = save_index
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._spans: Dict[str, Tuple[int, int]] = {}
+        self._keys: List[str] = []
+        self._blobs: Dict[str, str] = {}
+        self._fh = None
+        self._mm: Optional[mmap.mmap] = None
+        self._open()
+
+    def _open(self) -> None:
+        self._close_map()
+        self._blobs = {}
+        if not self.path.exists():
+            self._stamp, self._spans, self._keys = None, {}, []
+            return
+        self._fh = open(self.path, "rb")
+        self._stamp, self._spans = _index_open_file(self._fh, self.path, self.save_index)
+        self._keys = [k for k in self._spans if not is_blob_key(k)]
+        if self._stamp[0]:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _close_map(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def _ensure_current(self) -> None:
+        try:
+            stamp = _file_stamp(self.path)
+        except FileNotFoundError:
+            stamp = None
+        if stamp != self._stamp:
+            self._open()
+
+    def _decode(self, key: str) -> Any:
+        start, end = self._spans[key]
+        return resolve_blobs(json.loads(self._mm[start:end]), self._blob)
+
+    def _blob(self, digest: str) -> str:
+        # Text blobs are top-level entries too, so each one is decoded on first use only
+        text = self._blobs.get(digest)
+        if text is None:
+            span = self._spans.get(BLOB_PREFIX + digest)
+            if span is None:
+                raise KeyError(f"Passfile references missing text blob {digest}")
+            text = self._blobs[digest] = intern_text(json.loads(self._mm[span[0]:span[1]]), digest)
+        return text
+
+    def __getitem__(self, key: str) -> Any:
+        self._ensure_current()
+        if is_blob_key(key):
+            raise KeyError(key)
+        return self._decode(key)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        self._ensure_current()
+        return {k: self._decode(k) for k in keys if k in self._spans and not is_blob_key(k)}
+
+    def __contains__(self, key: object) -> bool:
+        self._ensure_current()
+        return key in self._spans and not is_blob_key(key)
+
+    def __iter__(self) -> Iterator[str]:
+        self._ensure_current()
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        self._ensure_current()
+        return len(self._keys)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: self[k] for k in self}
+
+    def close(self) -> None:
+        self._close_map()
+
+    def __enter__(self) -> "LazyPassfile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __del__(self):
+        try:
+            self._close_map()
+        except Exception:
+            pass
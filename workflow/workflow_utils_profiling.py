@@ -0,0 +1,197 @@
+# workflow_utils_profiling.py
+# -----------------------
+# Opt-in memory profiling of pipeline and merge stages (tracemalloc)
+# Per stage: peak and retained bytes above the stage's starting point,
+# plus the allocation sites that grew the most; reported as JSON
+# Off by default: memory_stage() is a shared no-op context until a profiler is installed
+# -----------------------
+import json
+import logging
+import os
+import tempfile
+import threading
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+REPORT_VERSION = 1
+DEFAULT_TOP_N = 10
+MEMORY_REPORT_ENV = "PIPELINE_MEMORY_REPORT"
+
+# The profiler's own snapshots would otherwise dominate every top-sites list
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+# -----------------------
+# Profiler
+# -----------------------
+class _Frame:
+    __slots__ = ("name", "start", "peak", "snapshot")
+
+    def __init__(self, name: str, start: int, snapshot: Optional[tracemalloc.Snapshot]):
+        self.name = name
+        self.start = start
+        self.peak = start
+        self.snapshot = snapshot
+
+
+class MemoryProfiler:
+    """
+    Measures memory per named stage with tracemalloc.
+    - peak_bytes: highest traced memory above the stage's starting point (max over calls)
+    - retained_bytes: traced memory still held when the stage ends (summed over calls)
+    - top_allocations: sites (file:line) with the largest growth across the stage
+    Stages may nest; a parent's peak includes its children's. tracemalloc's peak
+    counter is process-wide, so stages should run on one thread at a time.
+    """
+
+    def __init__(self, top_n: int = DEFAULT_TOP_N, frames: int = 1):
+        self.top_n = top_n
+        self.frames = frames
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._sites: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        self._stack: List[_Frame] = []
+        self._owns_tracing = False
+        self._thread: Optional[int] = None
+
+    # -----------------------
+    # Tracing lifecycle
+    # -----------------------
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._owns_tracing = True
+        self._thread = threading.get_ident()
+
+    def stop(self) -> None:
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    def _snapshot(self) -> Optional[tracemalloc.Snapshot]:
+        if not self.top_n:
+            return None
+        return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+    # -----------------------
+    # Stages
+    # -----------------------
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not tracemalloc.is_tracing() or threading.get_ident() != self._thread:
+            # Other threads share tracemalloc's peak counter; their numbers would be meaningless
+            yield
+            return
+        # Snapshot before reading the counters so its own allocation is part of the baseline
+        snapshot = self._snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            self._stack[-1].peak = max(self._stack[-1].peak, peak)
+        tracemalloc.reset_peak()
+        frame = _Frame(name, current, snapshot)
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(frame.peak, peak)
+            self._stack.pop()
+            self._record(frame, peak, current)
+            if self._stack:
+                # Hide our end-of-stage snapshot from the parent's peak
+                self._stack[-1].peak = max(self._stack[-1].peak, peak)
+                tracemalloc.reset_peak()
+
+    def _record(self, frame: _Frame, peak: int, current: int) -> None:
+        stats = self.stages.setdefault(frame.name, {"calls": 0, "peak_bytes": 0, "retained_bytes": 0})
+        stats["calls"] += 1
+        stats["peak_bytes"] = max(stats["peak_bytes"], peak - frame.start)
+        stats["retained_bytes"] += current - frame.start
+        if frame.snapshot is None:
+            return
+        diff = self._snapshot().compare_to(frame.snapshot, "lineno")
+        sites = self._sites[frame.name]
+        for stat in diff[: self.top_n * 4]:
+            if stat.size_diff <= 0:
+                break
+            where = stat.traceback[0]
+            entry = sites[f"{where.filename}:{where.lineno}"]
+            entry[0] += stat.size_diff
+            entry[1] += stat.count_diff
+
+    # -----------------------
+    # Report
+    # -----------------------
+    def report(self) -> Dict[str, Any]:
+        traced = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        stages = {}
+        for name, stats in self.stages.items():
+            top = sorted(self._sites.get(name, {}).items(), key=lambda kv: kv[1][0], reverse=True)[: self.top_n]
+            stages[name] = dict(stats, top_allocations=[
+                {"site": site, "size_bytes": size, "count": count} for site, (size, count) in top
+            ])
+        return {"version": REPORT_VERSION, "top_n": self.top_n,
+                "traced_current_bytes": traced[0], "stages": stages}
+
+    def write_report(self, path: Union[str, Path]) -> Path:
+        target = Path(path)
+        with tempfile.NamedTemporaryFile("w", delete=False, dir=target.parent, encoding="utf-8") as tmp:
+            json.dump(self.report(), tmp, indent=2)
+        os.replace(tmp.name, target)
+        logger.info(f"Memory profile written to {target}")
+        return target
+
+
+# -----------------------
+# Active profiler
+# -----------------------
+_active_profiler: Optional[MemoryProfiler] = None
+_NO_STAGE = nullcontext()
+
+
+def get_memory_profiler() -> Optional[MemoryProfiler]:
+    return _active_profiler
+
+def set_memory_profiler(profiler: Optional[MemoryProfiler]) -> Optional[MemoryProfiler]:
+    """Install the profiler memory_stage() reports to (None turns profiling off); returns the previous one."""
+    global _active_profiler
+    previous, _active_profiler = _active_profiler, profiler
+    return previous
+
+def memory_stage(name: str) -> ContextManager[None]:
+    """Context for one pipeline/merge stage; a shared no-op unless profiling is on."""
+    profiler = _active_profiler
+    return profiler.stage(name) if profiler is not None else _NO_STAGE
+
+@contextmanager
+def memory_profiling(report_path: Optional[Union[str, Path]] = None,
+                     top_n: int = DEFAULT_TOP_N, frames: int = 1) -> Iterator[MemoryProfiler]:
+    """
+    Profile every memory_stage() entered inside the block; the JSON report is
+    written to report_path on exit (also when the block raises).
+    """
+    profiler = MemoryProfiler(top_n=top_n, frames=frames)
+    profiler.start()
+    previous = set_memory_profiler(profiler)
+    try:
+        yield profiler
+    finally:
+        set_memory_profiler(previous)
+        try:
+            if report_path:
+                profiler.write_report(report_path)
+        finally:
+            profiler.stop()
@@ -0,0 +1,204 @@
+# workflow_utils_schema.py
+# -----------------------
+# Scene record schema loading & validation
+# jsonschema is imported on first validation, not at import time
+# Uses the generated validator (workflow_utils_schema_compiled) when it matches the schema
+# Partial validation: the record's own keywords plus only the dirty top-level subtrees
+# -----------------------
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from workflow_utils_cache import PIPELINE_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / "data" / "schema_passfile.json"
+
+_schemas: Dict[str, Tuple[Tuple[int, int], str, Dict[str, Any]]] = {}
+_validators: Dict[Tuple[str, bool], Any] = {}
+
+
+# -----------------------
+# Schema Loading
+# -----------------------
+def schema_fingerprint(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+def load_schema_with_fingerprint(path: Optional[Path] = None) -> Tuple[Dict[str, Any], str]:
+    """Load a schema once per (path, mtime, size); returns (schema, content fingerprint)."""
+    p = Path(path) if path else SCHEMA_PATH
+    st = p.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = str(p.resolve())
+    cached = _schemas.get(key)
+    if cached and cached[0] == stamp:
+        return cached[2], cached[1]
+    raw = p.read_bytes()
+    fingerprint = schema_fingerprint(raw)
+    schema = json.loads(raw)
+    _schemas[key] = (stamp, fingerprint, schema)
+    return schema, fingerprint
+
+def load_schema(path: Optional[Path] = None) -> Dict[str, Any]:
+    return load_schema_with_fingerprint(path)[0]
+
+
+# -----------------------
+# On-disk "schema already checked" marker
+# -----------------------
+def _checked_marker(fingerprint: str, cache_dir: Optional[Path]) -> Optional[Path]:
+    if cache_dir is None:
+        return None
+    return Path(cache_dir) / f"schema-{fingerprint}.checked"
+
+def _check_schema_once(cls, schema: Dict[str, Any], fingerprint: str, cache_dir: Optional[Path]) -> None:
+    """Run the metaschema check unless a previous process already checked this exact schema."""
+    marker = _checked_marker(fingerprint, cache_dir)
+    if marker is not None and marker.exists():
+        return
+    cls.check_schema(schema)
+    if marker is not None:
+        try:
+            marker.parent.mkdir(parents=True, exist_ok=True)
+            marker.touch()
+        except OSError as e:
+            logger.debug(f"Could not write schema cache marker {marker}: {e}")
+
+
+# -----------------------
+# Validation
+# -----------------------
+class SchemaValidator:
+    """Equivalent to jsonschema.validate(instance, schema) without re-checking the schema per call."""
+
+    def __init__(self, schema: Dict[str, Any], fingerprint: str, cache_dir: Optional[Path] = PIPELINE_CACHE_DIR):
+        from jsonschema.validators import validator_for
+        cls = validator_for(schema)
+        _check_schema_once(cls, schema, fingerprint, cache_dir)
+        self.schema = schema
+        self.fingerprint = fingerprint
+        self._validator = cls(schema)
+        # Root keywords with each property's subschema emptied; the subtrees are checked per part
+        properties = schema.get("properties") or {}
+        self.parts = tuple(properties)
+        self._shell = cls(dict(schema, properties={key: {} for key in properties}))
+
+    def is_valid(self, instance: Any) -> bool:
+        return self._validator.is_valid(instance)
+
+    def iter_errors(self, instance: Any):
+        return self._validator.iter_errors(instance)
+
+    def iter_part_errors(self, instance: Any, part: Optional[str] = None):
+        """part=None: the record's own keywords; else the errors under instance[part]."""
+        if part is None:
+            yield from self._shell.iter_errors(instance)
+            return
+        if not isinstance(instance, dict) or part not in instance:
+            return
+        for error in self._validator.descend(instance[part], self.schema["properties"][part], path=part, schema_path=part):
+            error.schema_path.appendleft("properties")
+            yield error
+
+    def is_valid_part(self, instance: Any, part: Optional[str] = None) -> bool:
+        return next(iter(self.iter_part_errors(instance, part)), None) is None
+
+    def validate(self, instance: Any) -> None:
+        from jsonschema.exceptions import best_match
+        error = best_match(self._validator.iter_errors(instance))
+        if error is not None:
+            raise error
+
+class CompiledSchemaValidator:
+    """
+    Wraps the module generated by scripts/generate_schema_validator.py.
+    Valid records never import jsonschema; invalid ones raise the same
+    best-match ValidationError as the generic validator.
+    """
+
+    def __init__(self, module):
+        self.schema = module.SCHEMA
+        self.fingerprint = module.SCHEMA_FINGERPRINT
+        self.is_valid = module.is_valid
+        self.iter_errors = module.iter_errors
+        self.validate = module.validate
+        self.parts = module.PARTS
+        self.is_valid_part = module.is_valid_part
+        self.iter_part_errors = module.iter_part_errors
+
+def _compiled_validator_for(fingerprint: str, schema: Optional[Dict[str, Any]] = None) -> Optional[CompiledSchemaValidator]:
+    try:
+        import workflow_utils_schema_compiled as compiled
+    except ImportError:
+        return None
+    if compiled.SCHEMA_FINGERPRINT != fingerprint and (schema is None or compiled.SCHEMA != schema):
+        logger.debug(f"Compiled validator is stale for schema {fingerprint}; using jsonschema.")
+        return None
+    return CompiledSchemaValidator(compiled)
+
+def _validator(schema: Dict[str, Any], fingerprint: str, cache_dir: Optional[Path], compiled: bool,
+               in_memory: bool = False) -> Union[SchemaValidator, CompiledSchemaValidator]:
+    key = (fingerprint, compiled)
+    validator = _validators.get(key)
+    if validator is None:
+        validator = (_compiled_validator_for(fingerprint, schema if in_memory else None) if compiled else None) \
+            or SchemaValidator(schema, fingerprint, cache_dir)
+        _validators[key] = validator
+    return validator
+
+def get_schema_validator(path: Optional[Path] = None,
+                         cache_dir: Optional[Path] = PIPELINE_CACHE_DIR,
+                         compiled: bool = True) -> Union[SchemaValidator, CompiledSchemaValidator]:
+    """Compiled validator when it was generated from this exact schema, generic otherwise."""
+    schema, fingerprint = load_schema_with_fingerprint(path)
+    return _validator(schema, fingerprint, cache_dir, compiled)
+
+def get_schema_validator_for(schema: Dict[str, Any],
+                             cache_dir: Optional[Path] = PIPELINE_CACHE_DIR,
+                             compiled: bool = True) -> Union[SchemaValidator, CompiledSchemaValidator]:
+    """get_schema_validator for an in-memory schema (e.g. one handed to a merge)."""
+    raw = json.dumps(schema, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _validator(schema, schema_fingerprint(raw), cache_dir, compiled, in_memory=True)
+
+def dirty_parts(validator: Union[SchemaValidator, CompiledSchemaValidator], dirty: Iterable[str]) -> List[str]:
+    """The schema's top-level properties among dirty, in schema order."""
+    dirty = set(dirty)
+    return [part for part in validator.parts if part in dirty]
+
+def validate_parts(validator: Union[SchemaValidator, CompiledSchemaValidator], instance: Any, dirty: Iterable[str]) -> None:
+    """
+    Validate the record's own keywords (type, required, additionalProperties)
+    and the subtrees of the dirty top-level properties only; clean subtrees
+    are assumed to be as valid as when they were last checked. Raises the
+    best-match ValidationError among the checked parts, like validate().
+    """
+    parts: List[Optional[str]] = [None, *dirty_parts(validator, dirty)]
+    if all(validator.is_valid_part(instance, part) for part in parts):
+        return
+    from jsonschema.exceptions import best_match
+    error = best_match(e for part in parts for e in validator.iter_part_errors(instance, part))
+    if error is not None:
+        raise error
+
+def validate_scene_record(scene_record: Dict[str, Any], path: Optional[Path] = None,
+                          dirty: Optional[Iterable[str]] = None) -> None:
+    # dirty: top-level fields changed since the record last validated (None: validate everything)
+    validator = get_schema_validator(path)
+    if dirty is None:
+        validator.validate(scene_record)
+    else:
+        validate_parts(validator, scene_record, dirty)
+
+def validation_error_type() -> type:
+    """
+    jsonschema.ValidationError, imported on demand.
+    Usable as `except validation_error_type() as e:` -- the expression only runs
+    when an exception reaches the handler.
+    """
+    from jsonschema import ValidationError
+    return ValidationError
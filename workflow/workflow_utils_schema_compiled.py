@@ -0,0 +1,845 @@
+# workflow_utils_schema_compiled.py
+# -----------------------
+# GENERATED by scripts/generate_schema_validator.py -- do not edit by hand
+# Source schema: Passfile Scene Record
+# -----------------------
+from numbers import Number as _Number
+
+SCHEMA_FINGERPRINT = 'f84d750c86035055'
+SCHEMA = {'$schema': 'http://json-schema.org/draft-07/schema#',
+ 'title': 'Passfile Scene Record',
+ 'type': 'object',
+ 'required': ['scene_metadata',
+              'scene_text',
+              'beats',
+              'sections',
+              'refs',
+              'scene_uuid',
+              'core_identifier'],
+ 'properties': {'scene_metadata': {'type': 'object',
+                                   'required': ['book_code',
+                                                'part',
+                                                'episode',
+                                                'scene',
+                                                'scene_uuid'],
+                                   'properties': {'book_code': {'type': 'string'},
+                                                  'part': {'type': 'string'},
+                                                  'episode': {'type': 'string'},
+                                                  'scene': {'type': 'string'},
+                                                  'scene_uuid': {'type': 'string',
+                                                                 'format': 'uuid'},
+                                                  'scene_title': {'type': 'string'},
+                                                  'concise_summary': {'type': 'string'},
+                                                  'merch_refs': {'type': 'array',
+                                                                 'items': {'type': 'string'}},
+                                                  'flags': {'type': 'array',
+                                                            'items': {'type': 'string'}},
+                                                  'previous_scene': {'type': 'string'},
+                                                  'next_scene': {'type': 'string'}}},
+                'scene_text': {'type': 'string'},
+                'beats': {'type': 'array',
+                          'items': {'type': 'object',
+                                    'required': ['snippet', 'beat_uuid'],
+                                    'properties': {'snippet': {'type': 'string'},
+                                                   'beat_uuid': {'type': 'string',
+                                                                 'format': 'uuid'}}}},
+                'micro_beats': {'type': 'array',
+                                'items': {'type': 'object',
+                                          'required': ['beat_uuid', 'text', 'keyword_counts'],
+                                          'properties': {'beat_uuid': {'type': 'string'},
+                                                         'text': {'type': 'string'},
+                                                         'keyword_counts': {'type': 'object',
+                                                                            'additionalProperties': {'type': 'number'}}}}},
+                'sections': {'type': 'object',
+                             'required': ['emotional_arc',
+                                          'erotic_arc',
+                                          'pacing_strategy_notes',
+                                          'connected_completion_arcs',
+                                          'trinity_advisory'],
+                             'properties': {'emotional_arc': {'type': 'object'},
+                                            'erotic_arc': {'type': 'object'},
+                                            'pacing_strategy_notes': {'type': 'object'},
+                                            'connected_completion_arcs': {'type': 'array',
+                                                                          'items': {'type': 'string',
+                                                                                    'format': 'uuid'}},
+                                            'trinity_advisory': {'type': 'object',
+                                                                 'properties': {'pearls_detected': {'type': 'array',
+                                                                                                    'items': {'type': 'string'}},
+                                                                                'cuffs_detected': {'type': 'array',
+                                                                                                   'items': {'type': 'string'}},
+                                                                                'moan_detected': {'type': 'array',
+                                                                                                  'items': {'type': 'string'}},
+                                                                                'sexual_actions': {'type': 'array',
+                                                                                                   'items': {'type': 'string'}},
+                                                                                'erotic_physiology': {'type': 'array',
+                                                                                                      'items': {'type': 'string'}},
+                                                                                'two_condition_rule_triggered': {'type': 'boolean'},
+                                                                                'advisory_strength': {'type': 'number'}},
+                                                                 'additionalProperties': False}}},
+                'refs': {'type': 'object',
+                         'required': ['scene_uuid', 'insert_advisory_refs', 'flag_refs'],
+                         'properties': {'scene_uuid': {'type': 'string', 'format': 'uuid'},
+                                        'insert_advisory_refs': {'type': 'array',
+                                                                 'items': {'type': 'string',
+                                                                           'format': 'uuid'}},
+                                        'flag_refs': {'type': 'array',
+                                                      'items': {'type': 'string'}}}},
+                'cross_references': {'type': 'object',
+                                     'properties': {'previous_scene': {'type': 'string'},
+                                                    'next_scene': {'type': 'string'}}},
+                'core_identifier': {'type': 'string'}},
+ 'additionalProperties': False}
+
+_S0 = SCHEMA
+_S1 = SCHEMA['properties']['scene_metadata']
+_S2 = SCHEMA['properties']['scene_metadata']['properties']['book_code']
+_S3 = SCHEMA['properties']['scene_metadata']['properties']['part']
+_S4 = SCHEMA['properties']['scene_metadata']['properties']['episode']
+_S5 = SCHEMA['properties']['scene_metadata']['properties']['scene']
+_S6 = SCHEMA['properties']['scene_metadata']['properties']['scene_uuid']
+_S7 = SCHEMA['properties']['scene_metadata']['properties']['scene_title']
+_S8 = SCHEMA['properties']['scene_metadata']['properties']['concise_summary']
+_S9 = SCHEMA['properties']['scene_metadata']['properties']['merch_refs']
+_S10 = SCHEMA['properties']['scene_metadata']['properties']['merch_refs']['items']
+_S11 = SCHEMA['properties']['scene_metadata']['properties']['flags']
+_S12 = SCHEMA['properties']['scene_metadata']['properties']['flags']['items']
+_S13 = SCHEMA['properties']['scene_metadata']['properties']['previous_scene']
+_S14 = SCHEMA['properties']['scene_metadata']['properties']['next_scene']
+_S15 = SCHEMA['properties']['scene_text']
+_S16 = SCHEMA['properties']['beats']
+_S17 = SCHEMA['properties']['beats']['items']
+_S18 = SCHEMA['properties']['beats']['items']['properties']['snippet']
+_S19 = SCHEMA['properties']['beats']['items']['properties']['beat_uuid']
+_S20 = SCHEMA['properties']['micro_beats']
+_S21 = SCHEMA['properties']['micro_beats']['items']
+_S22 = SCHEMA['properties']['micro_beats']['items']['properties']['beat_uuid']
+_S23 = SCHEMA['properties']['micro_beats']['items']['properties']['text']
+_S24 = SCHEMA['properties']['micro_beats']['items']['properties']['keyword_counts']
+_S25 = SCHEMA['properties']['micro_beats']['items']['properties']['keyword_counts']['additionalProperties']
+_S26 = SCHEMA['properties']['sections']
+_S27 = SCHEMA['properties']['sections']['properties']['emotional_arc']
+_S28 = SCHEMA['properties']['sections']['properties']['erotic_arc']
+_S29 = SCHEMA['properties']['sections']['properties']['pacing_strategy_notes']
+_S30 = SCHEMA['properties']['sections']['properties']['connected_completion_arcs']
+_S31 = SCHEMA['properties']['sections']['properties']['connected_completion_arcs']['items']
+_S32 = SCHEMA['properties']['sections']['properties']['trinity_advisory']
+_S33 = SCHEMA['properties']['sections']['properties']['trinity_advisory']['properties']['pearls_detected']
+_S34 = SCHEMA['properties']['sections']['properties']['trinity_advisory']['properties']['pearls_detected']['items']
+_S35 = SCHEMA['properties']['sections']['properties']['trinity_advisory']['properties']['cuffs_detected']
+_S36 = SCHEMA['properties']['sections']['properties']['trinity_advisory']['properties']['cuffs_detected']['items']
+_S37 = SCHEMA['properties']['sections']['properties']['trinity_advisory']['properties']['moan_detected']
+_S38 = SCHEMA['properties']['sections']['properties']['trinity_advisory']['properties']['moan_detected']['items']
+_S39 = SCHEMA['properties']['sections']['properties']['trinity_advisory']['properties']['sexual_actions']
+_S40 = SCHEMA['properties']['sections']['properties']['trinity_advisory']['properties']['sexual_actions']['items']
+_S41 = SCHEMA['properties']['sections']['properties']['trinity_advisory']['properties']['erotic_physiology']
+_S42 = SCHEMA['properties']['sections']['properties']['trinity_advisory']['properties']['erotic_physiology']['items']
+_S43 = SCHEMA['properties']['sections']['properties']['trinity_advisory']['properties']['two_condition_rule_triggered']
+_S44 = SCHEMA['properties']['sections']['properties']['trinity_advisory']['properties']['advisory_strength']
+_S45 = SCHEMA['properties']['refs']
+_S46 = SCHEMA['properties']['refs']['properties']['scene_uuid']
+_S47 = SCHEMA['properties']['refs']['properties']['insert_advisory_refs']
+_S48 = SCHEMA['properties']['refs']['properties']['insert_advisory_refs']['items']
+_S49 = SCHEMA['properties']['refs']['properties']['flag_refs']
+_S50 = SCHEMA['properties']['refs']['properties']['flag_refs']['items']
+_S51 = SCHEMA['properties']['cross_references']
+_S52 = SCHEMA['properties']['cross_references']['properties']['previous_scene']
+_S53 = SCHEMA['properties']['cross_references']['properties']['next_scene']
+_S54 = SCHEMA['properties']['core_identifier']
+
+def _is_integer(v):
+    if isinstance(v, bool): return False
+    if isinstance(v, float): return v.is_integer()
+    return isinstance(v, int)
+
+def _errors_2(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'scene_metadata', 'properties', 'book_code', 'type'), inst, _S2)
+    yield from ()
+
+def _errors_3(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'scene_metadata', 'properties', 'part', 'type'), inst, _S3)
+    yield from ()
+
+def _errors_4(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'scene_metadata', 'properties', 'episode', 'type'), inst, _S4)
+    yield from ()
+
+def _errors_5(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'scene_metadata', 'properties', 'scene', 'type'), inst, _S5)
+    yield from ()
+
+def _errors_6(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'scene_metadata', 'properties', 'scene_uuid', 'type'), inst, _S6)
+    yield from ()
+
+def _errors_7(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'scene_metadata', 'properties', 'scene_title', 'type'), inst, _S7)
+    yield from ()
+
+def _errors_8(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'scene_metadata', 'properties', 'concise_summary', 'type'), inst, _S8)
+    yield from ()
+
+def _errors_10(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'scene_metadata', 'properties', 'merch_refs', 'items', 'type'), inst, _S10)
+    yield from ()
+
+def _valid_9(inst):
+    if not isinstance(inst, list): return False
+    for item in inst:
+        if not isinstance(item, str): return False
+    return True
+
+def _errors_9(inst, path):
+    if not isinstance(inst, list):
+        yield (f"{inst!r} is not of type " + "'array'", 'type', path, ('properties', 'scene_metadata', 'properties', 'merch_refs', 'type'), inst, _S9)
+    if isinstance(inst, list):
+        for i, item in enumerate(inst):
+            yield from _errors_10(item, path + (i,))
+    yield from ()
+
+def _errors_12(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'scene_metadata', 'properties', 'flags', 'items', 'type'), inst, _S12)
+    yield from ()
+
+def _valid_11(inst):
+    if not isinstance(inst, list): return False
+    for item in inst:
+        if not isinstance(item, str): return False
+    return True
+
+def _errors_11(inst, path):
+    if not isinstance(inst, list):
+        yield (f"{inst!r} is not of type " + "'array'", 'type', path, ('properties', 'scene_metadata', 'properties', 'flags', 'type'), inst, _S11)
+    if isinstance(inst, list):
+        for i, item in enumerate(inst):
+            yield from _errors_12(item, path + (i,))
+    yield from ()
+
+def _errors_13(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'scene_metadata', 'properties', 'previous_scene', 'type'), inst, _S13)
+    yield from ()
+
+def _errors_14(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'scene_metadata', 'properties', 'next_scene', 'type'), inst, _S14)
+    yield from ()
+
+def _valid_1(inst):
+    if not isinstance(inst, dict): return False
+    if 'book_code' not in inst or 'part' not in inst or 'episode' not in inst or 'scene' not in inst or 'scene_uuid' not in inst: return False
+    if 'book_code' in inst and not isinstance(inst['book_code'], str): return False
+    if 'part' in inst and not isinstance(inst['part'], str): return False
+    if 'episode' in inst and not isinstance(inst['episode'], str): return False
+    if 'scene' in inst and not isinstance(inst['scene'], str): return False
+    if 'scene_uuid' in inst and not isinstance(inst['scene_uuid'], str): return False
+    if 'scene_title' in inst and not isinstance(inst['scene_title'], str): return False
+    if 'concise_summary' in inst and not isinstance(inst['concise_summary'], str): return False
+    if 'merch_refs' in inst and not _valid_9(inst['merch_refs']): return False
+    if 'flags' in inst and not _valid_11(inst['flags']): return False
+    if 'previous_scene' in inst and not isinstance(inst['previous_scene'], str): return False
+    if 'next_scene' in inst and not isinstance(inst['next_scene'], str): return False
+    return True
+
+def _errors_1(inst, path):
+    if not isinstance(inst, dict):
+        yield (f"{inst!r} is not of type " + "'object'", 'type', path, ('properties', 'scene_metadata', 'type'), inst, _S1)
+    if isinstance(inst, dict):
+        for p in _S1['required']:
+            if p not in inst:
+                yield (f"{p!r} is a required property", 'required', path, ('properties', 'scene_metadata', 'required'), inst, _S1)
+    if isinstance(inst, dict):
+        if 'book_code' in inst:
+            yield from _errors_2(inst['book_code'], path + ('book_code',))
+        if 'part' in inst:
+            yield from _errors_3(inst['part'], path + ('part',))
+        if 'episode' in inst:
+            yield from _errors_4(inst['episode'], path + ('episode',))
+        if 'scene' in inst:
+            yield from _errors_5(inst['scene'], path + ('scene',))
+        if 'scene_uuid' in inst:
+            yield from _errors_6(inst['scene_uuid'], path + ('scene_uuid',))
+        if 'scene_title' in inst:
+            yield from _errors_7(inst['scene_title'], path + ('scene_title',))
+        if 'concise_summary' in inst:
+            yield from _errors_8(inst['concise_summary'], path + ('concise_summary',))
+        if 'merch_refs' in inst:
+            yield from _errors_9(inst['merch_refs'], path + ('merch_refs',))
+        if 'flags' in inst:
+            yield from _errors_11(inst['flags'], path + ('flags',))
+        if 'previous_scene' in inst:
+            yield from _errors_13(inst['previous_scene'], path + ('previous_scene',))
+        if 'next_scene' in inst:
+            yield from _errors_14(inst['next_scene'], path + ('next_scene',))
+    yield from ()
+
+def _errors_15(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'scene_text', 'type'), inst, _S15)
+    yield from ()
+
+def _errors_18(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'beats', 'items', 'properties', 'snippet', 'type'), inst, _S18)
+    yield from ()
+
+def _errors_19(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'beats', 'items', 'properties', 'beat_uuid', 'type'), inst, _S19)
+    yield from ()
+
+def _valid_17(inst):
+    if not isinstance(inst, dict): return False
+    if 'snippet' not in inst or 'beat_uuid' not in inst: return False
+    if 'snippet' in inst and not isinstance(inst['snippet'], str): return False
+    if 'beat_uuid' in inst and not isinstance(inst['beat_uuid'], str): return False
+    return True
+
+def _errors_17(inst, path):
+    if not isinstance(inst, dict):
+        yield (f"{inst!r} is not of type " + "'object'", 'type', path, ('properties', 'beats', 'items', 'type'), inst, _S17)
+    if isinstance(inst, dict):
+        for p in _S17['required']:
+            if p not in inst:
+                yield (f"{p!r} is a required property", 'required', path, ('properties', 'beats', 'items', 'required'), inst, _S17)
+    if isinstance(inst, dict):
+        if 'snippet' in inst:
+            yield from _errors_18(inst['snippet'], path + ('snippet',))
+        if 'beat_uuid' in inst:
+            yield from _errors_19(inst['beat_uuid'], path + ('beat_uuid',))
+    yield from ()
+
+def _valid_16(inst):
+    if not isinstance(inst, list): return False
+    for item in inst:
+        if not _valid_17(item): return False
+    return True
+
+def _errors_16(inst, path):
+    if not isinstance(inst, list):
+        yield (f"{inst!r} is not of type " + "'array'", 'type', path, ('properties', 'beats', 'type'), inst, _S16)
+    if isinstance(inst, list):
+        for i, item in enumerate(inst):
+            yield from _errors_17(item, path + (i,))
+    yield from ()
+
+def _errors_22(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'micro_beats', 'items', 'properties', 'beat_uuid', 'type'), inst, _S22)
+    yield from ()
+
+def _errors_23(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'micro_beats', 'items', 'properties', 'text', 'type'), inst, _S23)
+    yield from ()
+
+def _errors_25(inst, path):
+    if not (isinstance(inst, _Number) and not isinstance(inst, bool)):
+        yield (f"{inst!r} is not of type " + "'number'", 'type', path, ('properties', 'micro_beats', 'items', 'properties', 'keyword_counts', 'additionalProperties', 'type'), inst, _S25)
+    yield from ()
+
+def _valid_24(inst):
+    if not isinstance(inst, dict): return False
+    for value in inst.values():
+        if not (isinstance(value, _Number) and not isinstance(value, bool)): return False
+    return True
+
+def _errors_24(inst, path):
+    if not isinstance(inst, dict):
+        yield (f"{inst!r} is not of type " + "'object'", 'type', path, ('properties', 'micro_beats', 'items', 'properties', 'keyword_counts', 'type'), inst, _S24)
+    if isinstance(inst, dict):
+        extras = set(p for p in inst if p not in ())
+        for p in extras:
+            yield from _errors_25(inst[p], path + (p,))
+    yield from ()
+
+def _valid_21(inst):
+    if not isinstance(inst, dict): return False
+    if 'beat_uuid' not in inst or 'text' not in inst or 'keyword_counts' not in inst: return False
+    if 'beat_uuid' in inst and not isinstance(inst['beat_uuid'], str): return False
+    if 'text' in inst and not isinstance(inst['text'], str): return False
+    if 'keyword_counts' in inst and not _valid_24(inst['keyword_counts']): return False
+    return True
+
+def _errors_21(inst, path):
+    if not isinstance(inst, dict):
+        yield (f"{inst!r} is not of type " + "'object'", 'type', path, ('properties', 'micro_beats', 'items', 'type'), inst, _S21)
+    if isinstance(inst, dict):
+        for p in _S21['required']:
+            if p not in inst:
+                yield (f"{p!r} is a required property", 'required', path, ('properties', 'micro_beats', 'items', 'required'), inst, _S21)
+    if isinstance(inst, dict):
+        if 'beat_uuid' in inst:
+            yield from _errors_22(inst['beat_uuid'], path + ('beat_uuid',))
+        if 'text' in inst:
+            yield from _errors_23(inst['text'], path + ('text',))
+        if 'keyword_counts' in inst:
+            yield from _errors_24(inst['keyword_counts'], path + ('keyword_counts',))
+    yield from ()
+
+def _valid_20(inst):
+    if not isinstance(inst, list): return False
+    for item in inst:
+        if not _valid_21(item): return False
+    return True
+
+def _errors_20(inst, path):
+    if not isinstance(inst, list):
+        yield (f"{inst!r} is not of type " + "'array'", 'type', path, ('properties', 'micro_beats', 'type'), inst, _S20)
+    if isinstance(inst, list):
+        for i, item in enumerate(inst):
+            yield from _errors_21(item, path + (i,))
+    yield from ()
+
+def _errors_27(inst, path):
+    if not isinstance(inst, dict):
+        yield (f"{inst!r} is not of type " + "'object'", 'type', path, ('properties', 'sections', 'properties', 'emotional_arc', 'type'), inst, _S27)
+    yield from ()
+
+def _errors_28(inst, path):
+    if not isinstance(inst, dict):
+        yield (f"{inst!r} is not of type " + "'object'", 'type', path, ('properties', 'sections', 'properties', 'erotic_arc', 'type'), inst, _S28)
+    yield from ()
+
+def _errors_29(inst, path):
+    if not isinstance(inst, dict):
+        yield (f"{inst!r} is not of type " + "'object'", 'type', path, ('properties', 'sections', 'properties', 'pacing_strategy_notes', 'type'), inst, _S29)
+    yield from ()
+
+def _errors_31(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'sections', 'properties', 'connected_completion_arcs', 'items', 'type'), inst, _S31)
+    yield from ()
+
+def _valid_30(inst):
+    if not isinstance(inst, list): return False
+    for item in inst:
+        if not isinstance(item, str): return False
+    return True
+
+def _errors_30(inst, path):
+    if not isinstance(inst, list):
+        yield (f"{inst!r} is not of type " + "'array'", 'type', path, ('properties', 'sections', 'properties', 'connected_completion_arcs', 'type'), inst, _S30)
+    if isinstance(inst, list):
+        for i, item in enumerate(inst):
+            yield from _errors_31(item, path + (i,))
+    yield from ()
+
+def _errors_34(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'sections', 'properties', 'trinity_advisory', 'properties', 'pearls_detected', 'items', 'type'), inst, _S34)
+    yield from ()
+
+def _valid_33(inst):
+    if not isinstance(inst, list): return False
+    for item in inst:
+        if not isinstance(item, str): return False
+    return True
+
+def _errors_33(inst, path):
+    if not isinstance(inst, list):
+        yield (f"{inst!r} is not of type " + "'array'", 'type', path, ('properties', 'sections', 'properties', 'trinity_advisory', 'properties', 'pearls_detected', 'type'), inst, _S33)
+    if isinstance(inst, list):
+        for i, item in enumerate(inst):
+            yield from _errors_34(item, path + (i,))
+    yield from ()
+
+def _errors_36(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'sections', 'properties', 'trinity_advisory', 'properties', 'cuffs_detected', 'items', 'type'), inst, _S36)
+    yield from ()
+
+def _valid_35(inst):
+    if not isinstance(inst, list): return False
+    for item in inst:
+        if not isinstance(item, str): return False
+    return True
+
+def _errors_35(inst, path):
+    if not isinstance(inst, list):
+        yield (f"{inst!r} is not of type " + "'array'", 'type', path, ('properties', 'sections', 'properties', 'trinity_advisory', 'properties', 'cuffs_detected', 'type'), inst, _S35)
+    if isinstance(inst, list):
+        for i, item in enumerate(inst):
+            yield from _errors_36(item, path + (i,))
+    yield from ()
+
+def _errors_38(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'sections', 'properties', 'trinity_advisory', 'properties', 'moan_detected', 'items', 'type'), inst, _S38)
+    yield from ()
+
+def _valid_37(inst):
+    if not isinstance(inst, list): return False
+    for item in inst:
+        if not isinstance(item, str): return False
+    return True
+
+def _errors_37(inst, path):
+    if not isinstance(inst, list):
+        yield (f"{inst!r} is not of type " + "'array'", 'type', path, ('properties', 'sections', 'properties', 'trinity_advisory', 'properties', 'moan_detected', 'type'), inst, _S37)
+    if isinstance(inst, list):
+        for i, item in enumerate(inst):
+            yield from _errors_38(item, path + (i,))
+    yield from ()
+
+def _errors_40(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'sections', 'properties', 'trinity_advisory', 'properties', 'sexual_actions', 'items', 'type'), inst, _S40)
+    yield from ()
+
+def _valid_39(inst):
+    if not isinstance(inst, list): return False
+    for item in inst:
+        if not isinstance(item, str): return False
+    return True
+
+def _errors_39(inst, path):
+    if not isinstance(inst, list):
+        yield (f"{inst!r} is not of type " + "'array'", 'type', path, ('properties', 'sections', 'properties', 'trinity_advisory', 'properties', 'sexual_actions', 'type'), inst, _S39)
+    if isinstance(inst, list):
+        for i, item in enumerate(inst):
+            yield from _errors_40(item, path + (i,))
+    yield from ()
+
+def _errors_42(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'sections', 'properties', 'trinity_advisory', 'properties', 'erotic_physiology', 'items', 'type'), inst, _S42)
+    yield from ()
+
+def _valid_41(inst):
+    if not isinstance(inst, list): return False
+    for item in inst:
+        if not isinstance(item, str): return False
+    return True
+
+def _errors_41(inst, path):
+    if not isinstance(inst, list):
+        yield (f"{inst!r} is not of type " + "'array'", 'type', path, ('properties', 'sections', 'properties', 'trinity_advisory', 'properties', 'erotic_physiology', 'type'), inst, _S41)
+    if isinstance(inst, list):
+        for i, item in enumerate(inst):
+            yield from _errors_42(item, path + (i,))
+    yield from ()
+
+def _errors_43(inst, path):
+    if not isinstance(inst, bool):
+        yield (f"{inst!r} is not of type " + "'boolean'", 'type', path, ('properties', 'sections', 'properties', 'trinity_advisory', 'properties', 'two_condition_rule_triggered', 'type'), inst, _S43)
+    yield from ()
+
+def _errors_44(inst, path):
+    if not (isinstance(inst, _Number) and not isinstance(inst, bool)):
+        yield (f"{inst!r} is not of type " + "'number'", 'type', path, ('properties', 'sections', 'properties', 'trinity_advisory', 'properties', 'advisory_strength', 'type'), inst, _S44)
+    yield from ()
+
+def _valid_32(inst):
+    if not isinstance(inst, dict): return False
+    if 'pearls_detected' in inst and not _valid_33(inst['pearls_detected']): return False
+    if 'cuffs_detected' in inst and not _valid_35(inst['cuffs_detected']): return False
+    if 'moan_detected' in inst and not _valid_37(inst['moan_detected']): return False
+    if 'sexual_actions' in inst and not _valid_39(inst['sexual_actions']): return False
+    if 'erotic_physiology' in inst and not _valid_41(inst['erotic_physiology']): return False
+    if 'two_condition_rule_triggered' in inst and not isinstance(inst['two_condition_rule_triggered'], bool): return False
+    if 'advisory_strength' in inst and not (isinstance(inst['advisory_strength'], _Number) and not isinstance(inst['advisory_strength'], bool)): return False
+    if any(p not in ('pearls_detected', 'cuffs_detected', 'moan_detected', 'sexual_actions', 'erotic_physiology', 'two_condition_rule_triggered', 'advisory_strength') for p in inst): return False
+    return True
+
+def _errors_32(inst, path):
+    if not isinstance(inst, dict):
+        yield (f"{inst!r} is not of type " + "'object'", 'type', path, ('properties', 'sections', 'properties', 'trinity_advisory', 'type'), inst, _S32)
+    if isinstance(inst, dict):
+        if 'pearls_detected' in inst:
+            yield from _errors_33(inst['pearls_detected'], path + ('pearls_detected',))
+        if 'cuffs_detected' in inst:
+            yield from _errors_35(inst['cuffs_detected'], path + ('cuffs_detected',))
+        if 'moan_detected' in inst:
+            yield from _errors_37(inst['moan_detected'], path + ('moan_detected',))
+        if 'sexual_actions' in inst:
+            yield from _errors_39(inst['sexual_actions'], path + ('sexual_actions',))
+        if 'erotic_physiology' in inst:
+            yield from _errors_41(inst['erotic_physiology'], path + ('erotic_physiology',))
+        if 'two_condition_rule_triggered' in inst:
+            yield from _errors_43(inst['two_condition_rule_triggered'], path + ('two_condition_rule_triggered',))
+        if 'advisory_strength' in inst:
+            yield from _errors_44(inst['advisory_strength'], path + ('advisory_strength',))
+    if isinstance(inst, dict):
+        extras = set(p for p in inst if p not in ('pearls_detected', 'cuffs_detected', 'moan_detected', 'sexual_actions', 'erotic_physiology', 'two_condition_rule_triggered', 'advisory_strength'))
+        if extras:
+            extras = sorted(extras, key=str)
+            msg = 'Additional properties are not allowed (%s %s unexpected)' % (
+                ', '.join(repr(e) for e in extras), 'was' if len(extras) == 1 else 'were')
+            yield (msg, 'additionalProperties', path, ('properties', 'sections', 'properties', 'trinity_advisory', 'additionalProperties'), inst, _S32)
+    yield from ()
+
+def _valid_26(inst):
+    if not isinstance(inst, dict): return False
+    if 'emotional_arc' not in inst or 'erotic_arc' not in inst or 'pacing_strategy_notes' not in inst or 'connected_completion_arcs' not in inst or 'trinity_advisory' not in inst: return False
+    if 'emotional_arc' in inst and not isinstance(inst['emotional_arc'], dict): return False
+    if 'erotic_arc' in inst and not isinstance(inst['erotic_arc'], dict): return False
+    if 'pacing_strategy_notes' in inst and not isinstance(inst['pacing_strategy_notes'], dict): return False
+    if 'connected_completion_arcs' in inst and not _valid_30(inst['connected_completion_arcs']): return False
+    if 'trinity_advisory' in inst and not _valid_32(inst['trinity_advisory']): return False
+    return True
+
+def _errors_26(inst, path):
+    if not isinstance(inst, dict):
+        yield (f"{inst!r} is not of type " + "'object'", 'type', path, ('properties', 'sections', 'type'), inst, _S26)
+    if isinstance(inst, dict):
+        for p in _S26['required']:
+            if p not in inst:
+                yield (f"{p!r} is a required property", 'required', path, ('properties', 'sections', 'required'), inst, _S26)
+    if isinstance(inst, dict):
+        if 'emotional_arc' in inst:
+            yield from _errors_27(inst['emotional_arc'], path + ('emotional_arc',))
+        if 'erotic_arc' in inst:
+            yield from _errors_28(inst['erotic_arc'], path + ('erotic_arc',))
+        if 'pacing_strategy_notes' in inst:
+            yield from _errors_29(inst['pacing_strategy_notes'], path + ('pacing_strategy_notes',))
+        if 'connected_completion_arcs' in inst:
+            yield from _errors_30(inst['connected_completion_arcs'], path + ('connected_completion_arcs',))
+        if 'trinity_advisory' in inst:
+            yield from _errors_32(inst['trinity_advisory'], path + ('trinity_advisory',))
+    yield from ()
+
+def _errors_46(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'refs', 'properties', 'scene_uuid', 'type'), inst, _S46)
+    yield from ()
+
+def _errors_48(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'refs', 'properties', 'insert_advisory_refs', 'items', 'type'), inst, _S48)
+    yield from ()
+
+def _valid_47(inst):
+    if not isinstance(inst, list): return False
+    for item in inst:
+        if not isinstance(item, str): return False
+    return True
+
+def _errors_47(inst, path):
+    if not isinstance(inst, list):
+        yield (f"{inst!r} is not of type " + "'array'", 'type', path, ('properties', 'refs', 'properties', 'insert_advisory_refs', 'type'), inst, _S47)
+    if isinstance(inst, list):
+        for i, item in enumerate(inst):
+            yield from _errors_48(item, path + (i,))
+    yield from ()
+
+def _errors_50(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'refs', 'properties', 'flag_refs', 'items', 'type'), inst, _S50)
+    yield from ()
+
+def _valid_49(inst):
+    if not isinstance(inst, list): return False
+    for item in inst:
+        if not isinstance(item, str): return False
+    return True
+
+def _errors_49(inst, path):
+    if not isinstance(inst, list):
+        yield (f"{inst!r} is not of type " + "'array'", 'type', path, ('properties', 'refs', 'properties', 'flag_refs', 'type'), inst, _S49)
+    if isinstance(inst, list):
+        for i, item in enumerate(inst):
+            yield from _errors_50(item, path + (i,))
+    yield from ()
+
+def _valid_45(inst):
+    if not isinstance(inst, dict): return False
+    if 'scene_uuid' not in inst or 'insert_advisory_refs' not in inst or 'flag_refs' not in inst: return False
+    if 'scene_uuid' in inst and not isinstance(inst['scene_uuid'], str): return False
+    if 'insert_advisory_refs' in inst and not _valid_47(inst['insert_advisory_refs']): return False
+    if 'flag_refs' in inst and not _valid_49(inst['flag_refs']): return False
+    return True
+
+def _errors_45(inst, path):
+    if not isinstance(inst, dict):
+        yield (f"{inst!r} is not of type " + "'object'", 'type', path, ('properties', 'refs', 'type'), inst, _S45)
+    if isinstance(inst, dict):
+        for p in _S45['required']:
+            if p not in inst:
+                yield (f"{p!r} is a required property", 'required', path, ('properties', 'refs', 'required'), inst, _S45)
+    if isinstance(inst, dict):
+        if 'scene_uuid' in inst:
+            yield from _errors_46(inst['scene_uuid'], path + ('scene_uuid',))
+        if 'insert_advisory_refs' in inst:
+            yield from _errors_47(inst['insert_advisory_refs'], path + ('insert_advisory_refs',))
+        if 'flag_refs' in inst:
+            yield from _errors_49(inst['flag_refs'], path + ('flag_refs',))
+    yield from ()
+
+def _errors_52(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'cross_references', 'properties', 'previous_scene', 'type'), inst, _S52)
+    yield from ()
+
+def _errors_53(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'cross_references', 'properties', 'next_scene', 'type'), inst, _S53)
+    yield from ()
+
+def _valid_51(inst):
+    if not isinstance(inst, dict): return False
+    if 'previous_scene' in inst and not isinstance(inst['previous_scene'], str): return False
+    if 'next_scene' in inst and not isinstance(inst['next_scene'], str): return False
+    return True
+
+def _errors_51(inst, path):
+    if not isinstance(inst, dict):
+        yield (f"{inst!r} is not of type " + "'object'", 'type', path, ('properties', 'cross_references', 'type'), inst, _S51)
+    if isinstance(inst, dict):
+        if 'previous_scene' in inst:
+            yield from _errors_52(inst['previous_scene'], path + ('previous_scene',))
+        if 'next_scene' in inst:
+            yield from _errors_53(inst['next_scene'], path + ('next_scene',))
+    yield from ()
+
+def _errors_54(inst, path):
+    if not isinstance(inst, str):
+        yield (f"{inst!r} is not of type " + "'string'", 'type', path, ('properties', 'core_identifier', 'type'), inst, _S54)
+    yield from ()
+
+def _valid_0(inst):
+    if not isinstance(inst, dict): return False
+    if 'scene_metadata' not in inst or 'scene_text' not in inst or 'beats' not in inst or 'sections' not in inst or 'refs' not in inst or 'scene_uuid' not in inst or 'core_identifier' not in inst: return False
+    if 'scene_metadata' in inst and not _valid_1(inst['scene_metadata']): return False
+    if 'scene_text' in inst and not isinstance(inst['scene_text'], str): return False
+    if 'beats' in inst and not _valid_16(inst['beats']): return False
+    if 'micro_beats' in inst and not _valid_20(inst['micro_beats']): return False
+    if 'sections' in inst and not _valid_26(inst['sections']): return False
+    if 'refs' in inst and not _valid_45(inst['refs']): return False
+    if 'cross_references' in inst and not _valid_51(inst['cross_references']): return False
+    if 'core_identifier' in inst and not isinstance(inst['core_identifier'], str): return False
+    if any(p not in ('scene_metadata', 'scene_text', 'beats', 'micro_beats', 'sections', 'refs', 'cross_references', 'core_identifier') for p in inst): return False
+    return True
+
+def _errors_0(inst, path):
+    if not isinstance(inst, dict):
+        yield (f"{inst!r} is not of type " + "'object'", 'type', path, ('type',), inst, _S0)
+    if isinstance(inst, dict):
+        for p in _S0['required']:
+            if p not in inst:
+                yield (f"{p!r} is a required property", 'required', path, ('required',), inst, _S0)
+    if isinstance(inst, dict):
+        if 'scene_metadata' in inst:
+            yield from _errors_1(inst['scene_metadata'], path + ('scene_metadata',))
+        if 'scene_text' in inst:
+            yield from _errors_15(inst['scene_text'], path + ('scene_text',))
+        if 'beats' in inst:
+            yield from _errors_16(inst['beats'], path + ('beats',))
+        if 'micro_beats' in inst:
+            yield from _errors_20(inst['micro_beats'], path + ('micro_beats',))
+        if 'sections' in inst:
+            yield from _errors_26(inst['sections'], path + ('sections',))
+        if 'refs' in inst:
+            yield from _errors_45(inst['refs'], path + ('refs',))
+        if 'cross_references' in inst:
+            yield from _errors_51(inst['cross_references'], path + ('cross_references',))
+        if 'core_identifier' in inst:
+            yield from _errors_54(inst['core_identifier'], path + ('core_identifier',))
+    if isinstance(inst, dict):
+        extras = set(p for p in inst if p not in ('scene_metadata', 'scene_text', 'beats', 'micro_beats', 'sections', 'refs', 'cross_references', 'core_identifier'))
+        if extras:
+            extras = sorted(extras, key=str)
+            msg = 'Additional properties are not allowed (%s %s unexpected)' % (
+                ', '.join(repr(e) for e in extras), 'was' if len(extras) == 1 else 'were')
+            yield (msg, 'additionalProperties', path, ('additionalProperties',), inst, _S0)
+    yield from ()
+
+def _valid_shell(inst):
+    if not isinstance(inst, dict): return False
+    if 'scene_metadata' not in inst or 'scene_text' not in inst or 'beats' not in inst or 'sections' not in inst or 'refs' not in inst or 'scene_uuid' not in inst or 'core_identifier' not in inst: return False
+    if any(p not in ('scene_metadata', 'scene_text', 'beats', 'micro_beats', 'sections', 'refs', 'cross_references', 'core_identifier') for p in inst): return False
+    return True
+
+def _errors_shell(inst, path):
+    if not isinstance(inst, dict):
+        yield (f"{inst!r} is not of type " + "'object'", 'type', path, ('type',), inst, _S0)
+    if isinstance(inst, dict):
+        for p in _S0['required']:
+            if p not in inst:
+                yield (f"{p!r} is a required property", 'required', path, ('required',), inst, _S0)
+    if isinstance(inst, dict):
+        extras = set(p for p in inst if p not in ('scene_metadata', 'scene_text', 'beats', 'micro_beats', 'sections', 'refs', 'cross_references', 'core_identifier'))
+        if extras:
+            extras = sorted(extras, key=str)
+            msg = 'Additional properties are not allowed (%s %s unexpected)' % (
+                ', '.join(repr(e) for e in extras), 'was' if len(extras) == 1 else 'were')
+            yield (msg, 'additionalProperties', path, ('additionalProperties',), inst, _S0)
+    yield from ()
+
+_PART_VALID = {
+    'scene_metadata': _valid_1,
+    'scene_text': lambda inst: isinstance(inst, str),
+    'beats': _valid_16,
+    'micro_beats': _valid_20,
+    'sections': _valid_26,
+    'refs': _valid_45,
+    'cross_references': _valid_51,
+    'core_identifier': lambda inst: isinstance(inst, str),
+}
+
+_PART_ERRORS = {
+    'scene_metadata': _errors_1,
+    'scene_text': _errors_15,
+    'beats': _errors_16,
+    'micro_beats': _errors_20,
+    'sections': _errors_26,
+    'refs': _errors_45,
+    'cross_references': _errors_51,
+    'core_identifier': _errors_54,
+}
+
+# -----------------------
+# Public API
+# -----------------------
+PARTS = tuple(_PART_VALID)
+
+def is_valid(instance):
+    return _valid_0(instance)
+
+def _validation_errors(raw):
+    from jsonschema.exceptions import ValidationError
+    from jsonschema.validators import Draft7Validator
+    for message, keyword, path, schema_path, inst, subschema in raw:
+        yield ValidationError(
+            message,
+            validator=keyword,
+            path=path,
+            validator_value=subschema[keyword],
+            instance=inst,
+            schema=subschema,
+            schema_path=schema_path,
+            type_checker=Draft7Validator.TYPE_CHECKER,
+        )
+
+def iter_errors(instance):
+    return _validation_errors(_errors_0(instance, ()))
+
+def is_valid_part(instance, part=None):
+    # part=None: the record's own type / required / additionalProperties checks
+    if part is None:
+        return _valid_shell(instance)
+    return not isinstance(instance, dict) or part not in instance or _PART_VALID[part](instance[part])
+
+def iter_part_errors(instance, part=None):
+    if part is None:
+        return _validation_errors(_errors_shell(instance, ()))
+    if not isinstance(instance, dict) or part not in instance:
+        return iter(())
+    return _validation_errors(_PART_ERRORS[part](instance[part], (part,)))
+
+def validate(instance):
+    if _valid_0(instance):
+        return
+    from jsonschema.exceptions import best_match
+    error = best_match(iter_errors(instance))
+    if error is not None:
+        raise error
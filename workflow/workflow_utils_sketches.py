@@ -0,0 +1,340 @@
+# workflow_utils_sketches.py
+# -----------------------
+# Streaming, mergeable beat statistics for book / series dashboards
+# - CountMinSketch: approximate counts for any key (keywords, trinity cues, pacing)
+# - HeavyHitters: Misra-Gries top-k summary
+# - QuantileSketch: relative-error quantiles (DDSketch-style log buckets)
+# Fixed memory per summary whatever the number of beats; summaries built in
+# different workers / books merge into the summary of the combined stream
+# -----------------------
+import hashlib
+import logging
+import math
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+DEFAULT_CMS_WIDTH = 2048      # eps = e / width ~ 0.13% of the stream total
+DEFAULT_CMS_DEPTH = 5         # delta = e**-depth ~ 0.7%
+DEFAULT_TOP_K = 64
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BINS = 2048
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+NAMESPACES = ("keyword", "cue", "pacing")
+TRINITY_CUE_FIELDS = ("pearls_detected", "cuffs_detected", "moan_detected", "sexual_actions", "erotic_physiology")
+
+
+def _hash_pair(key: str) -> Tuple[int, int]:
+    # A stable hash (not hash(), which is salted per process) so workers' sketches line up
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+# -----------------------
+# Count-min sketch
+# -----------------------
+class CountMinSketch:
+    """
+    Counts for an unbounded key set in width x depth counters.
+    estimate(key) never undercounts, and exceeds the true count by more than
+    (e / width) * total with probability at most e**-depth. Merging adds
+    counters, so the bound holds for the merged stream.
+    """
+
+    def __init__(self, width: int = DEFAULT_CMS_WIDTH, depth: int = DEFAULT_CMS_DEPTH):
+        if width < 1 or depth < 1:
+            raise ValueError(f"CountMinSketch needs width, depth >= 1, got {width}, {depth}")
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.rows = [[0] * width for _ in range(depth)]
+
+    def _cells(self, key: str) -> Iterable[Tuple[List[int], int]]:
+        # Kirsch-Mitzenmacher: row i uses h1 + i * h2, as good as independent hashes here
+        h1, h2 = _hash_pair(key)
+        return ((row, (h1 + i * h2) % self.width) for i, row in enumerate(self.rows))
+
+    def add(self, key: str, count: int = 1) -> None:
+        if count < 0:
+            raise ValueError(f"CountMinSketch counts must be >= 0, got {count}")
+        self.total += count
+        for row, j in self._cells(key):
+            row[j] += count
+
+    def estimate(self, key: str) -> int:
+        return min(row[j] for row, j in self._cells(key))
+
+    def error_bound(self) -> float:
+        """Additive over-count bound (holds with probability 1 - e**-depth)."""
+        return math.e / self.width * self.total
+
+    def merge(self, other: "CountMinSketch") -> "CountMinSketch":
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError(f"Cannot merge {other.width}x{other.depth} sketch into {self.width}x{self.depth}")
+        self.total += other.total
+        for row, other_row in zip(self.rows, other.rows):
+            for j, v in enumerate(other_row):
+                if v:
+                    row[j] += v
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"width": self.width, "depth": self.depth, "total": self.total, "rows": self.rows}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CountMinSketch":
+        sketch = cls(data["width"], data["depth"])
+        sketch.total = data["total"]
+        sketch.rows = [list(row) for row in data["rows"]]
+        return sketch
+
+
+# -----------------------
+# Heavy hitters
+# -----------------------
+class HeavyHitters:
+    """
+    Misra-Gries summary with at most k counters. Every key whose count exceeds
+    total / (k + 1) is kept, and a kept count undercounts by at most
+    total / (k + 1). Merging (sum, then subtract the (k+1)-th largest count)
+    keeps the same bound for the combined stream.
+    """
+
+    def __init__(self, k: int = DEFAULT_TOP_K):
+        if k < 1:
+            raise ValueError(f"HeavyHitters needs k >= 1, got {k}")
+        self.k = k
+        self.total = 0
+        self.counters: Dict[str, int] = {}
+
+    def add(self, key: str, count: int = 1) -> None:
+        if count <= 0:
+            return
+        self.total += count
+        self.counters[key] = self.counters.get(key, 0) + count
+        if len(self.counters) > self.k:
+            self._shrink()
+
+    def _shrink(self) -> None:
+        # Subtract the (k+1)-th largest count from every counter and drop those at zero
+        cut = sorted(self.counters.values(), reverse=True)[self.k]
+        self.counters = {key: c - cut for key, c in self.counters.items() if c > cut}
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        ranked = sorted(self.counters.items(), key=lambda kv: (-kv[1], kv[0]))
+        return ranked if n is None else ranked[:n]
+
+    def error_bound(self) -> float:
+        """Maximum undercount of any reported count."""
+        return self.total / (self.k + 1)
+
+    def merge(self, other: "HeavyHitters") -> "HeavyHitters":
+        if self.k != other.k:
+            raise ValueError(f"Cannot merge a k={other.k} summary into k={self.k}")
+        self.total += other.total
+        for key, c in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + c
+        if len(self.counters) > self.k:
+            self._shrink()
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "total": self.total, "counters": self.counters}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HeavyHitters":
+        summary = cls(data["k"])
+        summary.total = data["total"]
+        summary.counters = dict(data["counters"])
+        return summary
+
+
+# -----------------------
+# Quantiles
+# -----------------------
+class QuantileSketch:
+    """
+    Quantiles of non-negative values from logarithmic buckets (DDSketch).
+    quantile(q) is within relative_accuracy of the exact rank-q value, as
+    long as no more than max_bins buckets were needed; past that the lowest
+    buckets are folded together, which only coarsens the smallest quantiles.
+    Zeros are counted exactly. Merging adds bucket counts and keeps the bound.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY, max_bins: int = DEFAULT_MAX_BINS):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be in (0, 1), got {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.count = 0
+        self.zeros = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.bins: Dict[int, int] = {}
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value < 0:
+            raise ValueError(f"QuantileSketch takes values >= 0, got {value}")
+        self.count += count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value == 0:
+            self.zeros += count
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        indexes = sorted(self.bins)
+        keep = indexes[len(indexes) - self.max_bins:]
+        folded = sum(self.bins.pop(i) for i in indexes[:len(indexes) - self.max_bins])
+        self.bins[keep[0]] += folded
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not 0 <= q <= 1:
+            raise ValueError(f"quantile must be in [0, 1], got {q}")
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zeros:
+            return 0.0
+        seen = self.zeros
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                # Midpoint (in relative terms) of the bucket (gamma**(i-1), gamma**i]
+                estimate = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if self.relative_accuracy != other.relative_accuracy:
+            raise ValueError(f"Cannot merge relative_accuracy {other.relative_accuracy} into {self.relative_accuracy}")
+        self.count += other.count
+        self.zeros += other.zeros
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for index, c in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + c
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"relative_accuracy": self.relative_accuracy, "max_bins": self.max_bins,
+                "count": self.count, "zeros": self.zeros,
+                "min": self.min if self.count else None, "max": self.max if self.count else None,
+                "bins": {str(i): c for i, c in self.bins.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data["relative_accuracy"], data["max_bins"])
+        sketch.count, sketch.zeros = data["count"], data["zeros"]
+        if data["count"]:
+            sketch.min, sketch.max = data["min"], data["max"]
+        sketch.bins = {int(i): c for i, c in data["bins"].items()}
+        return sketch
+
+
+# -----------------------
+# Beat statistics
+# -----------------------
+class BeatStatistics:
+    """
+    Keyword / trinity-cue / pacing counts and keyword-density / beat-length
+    quantiles over a stream of micro-beats. Counts go into one count-min
+    sketch under "namespace:key" plus a heavy-hitter summary per namespace.
+    Worker / book results travel as to_dict() and combine with merge().
+    """
+
+    def __init__(self, width: int = DEFAULT_CMS_WIDTH, depth: int = DEFAULT_CMS_DEPTH,
+                 top_k: int = DEFAULT_TOP_K, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 max_bins: int = DEFAULT_MAX_BINS):
+        self.beats = 0
+        self.scenes = 0
+        self.counts = CountMinSketch(width, depth)
+        self.top = {ns: HeavyHitters(top_k) for ns in NAMESPACES}
+        self.density = QuantileSketch(relative_accuracy, max_bins)
+        self.beat_length = QuantileSketch(relative_accuracy, max_bins)
+
+    def add(self, namespace: str, key: str, count: int = 1) -> None:
+        if count > 0:
+            self.counts.add(f"{namespace}:{key}", count)
+            self.top[namespace].add(key, count)
+
+    def add_micro_beats(self, micro_beats: Iterable[Dict[str, Any]],
+                        pacing_notes: Optional[Dict[str, str]] = None) -> None:
+        """Micro-beats as pipeline_full builds them; pacing_notes is sections.pacing_strategy_notes."""
+        for beat in micro_beats:
+            counts = beat.get("keyword_counts") or {}
+            words = len((beat.get("text") or "").split())
+            hits = 0
+            for kw, c in counts.items():
+                self.add("keyword", kw, c)
+                hits += c
+            self.beats += 1
+            self.beat_length.add(words)
+            self.density.add(hits / words if words else 0.0)
+            if pacing_notes and beat.get("beat_uuid") in pacing_notes:
+                self.add("pacing", pacing_notes[beat["beat_uuid"]])
+
+    def add_scene_record(self, scene_record: Dict[str, Any]) -> None:
+        """A scene record's micro-beats, pacing notes and trinity advisory cues."""
+        sections = scene_record.get("sections") or {}
+        self.add_micro_beats(scene_record.get("micro_beats") or [], sections.get("pacing_strategy_notes"))
+        advisory = sections.get("trinity_advisory") or {}
+        for field in TRINITY_CUE_FIELDS:
+            for cue in advisory.get(field) or []:
+                self.add("cue", cue)
+        self.scenes += 1
+
+    def estimate(self, namespace: str, key: str) -> int:
+        return self.counts.estimate(f"{namespace}:{key}")
+
+    def merge(self, other: "BeatStatistics") -> "BeatStatistics":
+        self.beats += other.beats
+        self.scenes += other.scenes
+        self.counts.merge(other.counts)
+        for ns in NAMESPACES:
+            self.top[ns].merge(other.top[ns])
+        self.density.merge(other.density)
+        self.beat_length.merge(other.beat_length)
+        return self
+
+    def summary(self, top_n: int = 10, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Dict[str, Any]:
+        """Dashboard view; every top-n count is the count-min estimate (an upper bound)."""
+        return {
+            "beats": self.beats,
+            "scenes": self.scenes,
+            "top": {ns: [[key, self.estimate(ns, key)] for key, _ in self.top[ns].top(top_n)] for ns in NAMESPACES},
+            "keyword_density": {str(q): self.density.quantile(q) for q in quantiles},
+            "beat_length": {str(q): self.beat_length.quantile(q) for q in quantiles},
+            "error_bounds": {
+                "count_overestimate": self.counts.error_bound(),
+                "count_confidence": 1 - math.exp(-self.counts.depth),
+                "top_k_undercount": {ns: self.top[ns].error_bound() for ns in NAMESPACES},
+                "quantile_relative_error": self.density.relative_accuracy,
+            },
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"beats": self.beats, "scenes": self.scenes, "counts": self.counts.to_dict(),
+                "top": {ns: self.top[ns].to_dict() for ns in NAMESPACES},
+                "density": self.density.to_dict(), "beat_length": self.beat_length.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BeatStatistics":
+        stats = cls()
+        stats.beats, stats.scenes = data["beats"], data["scenes"]
+        stats.counts = CountMinSketch.from_dict(data["counts"])
+        stats.top = {ns: HeavyHitters.from_dict(data["top"][ns]) for ns in NAMESPACES}
+        stats.density = QuantileSketch.from_dict(data["density"])
+        stats.beat_length = QuantileSketch.from_dict(data["beat_length"])
+        return stats
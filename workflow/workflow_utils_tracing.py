@@ -0,0 +1,185 @@
+# workflow_utils_tracing.py
+# -----------------------
+# Optional span tracer for pipeline and merge runs
+# Spans are Chrome trace-event "complete" events (ph "X"), written as
+# {"traceEvents": [...]} for chrome://tracing, Perfetto or speedscope
+# Off by default: trace_span() is a shared no-op and trace_iter() returns its input
+# -----------------------
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Constants
+# -----------------------
+TRACE_REPORT_ENV = "PIPELINE_TRACE"
+DEFAULT_CATEGORY = "pipeline"
+
+# Monotonic clock shifted onto the wall clock once per process, so spans
+# from worker processes line up with the parent's on one timeline
+_CLOCK_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+
+def _now_us() -> float:
+    return (time.perf_counter_ns() + _CLOCK_OFFSET_NS) / 1000
+
+
+# -----------------------
+# Tracer
+# -----------------------
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self) -> "_Span":
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # GeneratorExit: a trace_iter loop ended early (break / exception in the body)
+        if exc_type is not None and exc_type is not GeneratorExit:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.start, _now_us() - self.start, self.cat, self.args)
+
+
+class Tracer:
+    """
+    Collects spans from any thread of this process, plus spans shipped back
+    from worker processes (add_events). Thread and process names are kept so
+    the viewer labels each track.
+    """
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self._names: Dict[Tuple[int, int], str] = {}
+        self._lock = threading.Lock()
+
+    def span(self, name: str, cat: str = DEFAULT_CATEGORY, **args: Any) -> _Span:
+        return _Span(self, name, cat, args)
+
+    def record(self, name: str, ts: float, dur: float, cat: str = DEFAULT_CATEGORY,
+               args: Optional[Dict[str, Any]] = None) -> None:
+        pid, tid = os.getpid(), threading.get_native_id()
+        event = {"name": name, "cat": cat, "ph": "X", "ts": ts, "dur": dur, "pid": pid, "tid": tid}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+            if (pid, tid) not in self._names:
+                self._names[(pid, tid)] = threading.current_thread().name
+
+    def add_events(self, events: Iterable[Dict[str, Any]]) -> None:
+        """Merge spans recorded elsewhere (e.g. returned by run_traced in a worker process)."""
+        with self._lock:
+            for event in events:
+                if event.get("ph") == "M":
+                    self._names.setdefault((event["pid"], event["tid"]), event["args"]["name"])
+                else:
+                    self.events.append(event)
+
+    def thread_names(self) -> List[Dict[str, Any]]:
+        return [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                for (pid, tid), name in sorted(self._names.items())]
+
+    def trace_events(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            pids = sorted({pid for pid, _ in self._names})
+            processes = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                          "args": {"name": "pipeline" if pid == os.getpid() else f"worker {pid}"}}
+                         for pid in pids]
+            return processes + self.thread_names() + sorted(self.events, key=lambda e: e["ts"])
+
+    def write(self, path: Union[str, Path]) -> Path:
+        target = Path(path)
+        payload = {"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}
+        with tempfile.NamedTemporaryFile("w", delete=False, dir=target.parent, encoding="utf-8") as tmp:
+            json.dump(payload, tmp, default=str, separators=(",", ":"))
+        os.replace(tmp.name, target)
+        logger.info(f"Trace with {len(payload['traceEvents'])} events written to {target}")
+        return target
+
+
+# -----------------------
+# Active tracer
+# -----------------------
+_active_tracer: Optional[Tracer] = None
+_NO_SPAN = nullcontext()
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _active_tracer
+
+def set_tracer(tracer: Optional[Tracer]) -> Optional[Tracer]:
+    """Install the tracer trace_span() records to (None turns tracing off); returns the previous one."""
+    global _active_tracer
+    previous, _active_tracer = _active_tracer, tracer
+    return previous
+
+def trace_span(name: str, cat: str = DEFAULT_CATEGORY, **args: Any) -> ContextManager[Any]:
+    """Span around one stage; a shared no-op unless tracing is on."""
+    tracer = _active_tracer
+    return tracer.span(name, cat, **args) if tracer is not None else _NO_SPAN
+
+def trace_iter(items: Iterable[Any], name: str,
+               describe: Optional[Callable[[Any], Dict[str, Any]]] = None,
+               cat: str = DEFAULT_CATEGORY) -> Iterable[Any]:
+    """
+    One span per loop iteration: each span covers the loop body for one item
+    (until the next item is requested). describe(item) -> span args; defaults to the item index.
+    Returns items unchanged when tracing is off.
+    """
+    tracer = _active_tracer
+    if tracer is None:
+        return items
+    return _traced_items(tracer, items, name, describe, cat)
+
+def _traced_items(tracer: Tracer, items: Iterable[Any], name: str,
+                  describe: Optional[Callable[[Any], Dict[str, Any]]], cat: str) -> Iterator[Any]:
+    for i, item in enumerate(items):
+        with tracer.span(name, cat, **(describe(item) if describe else {"index": i})):
+            yield item
+
+@contextmanager
+def tracing(trace_path: Optional[Union[str, Path]] = None) -> Iterator[Tracer]:
+    """Record every span opened inside the block; the trace is written to trace_path on exit."""
+    tracer = Tracer()
+    previous = set_tracer(tracer)
+    try:
+        yield tracer
+    finally:
+        set_tracer(previous)
+        if trace_path:
+            tracer.write(trace_path)
+
+
+# -----------------------
+# Worker processes
+# -----------------------
+def run_traced(fn: Callable[[Any], Any], item: Any, name: str,
+               args: Optional[Dict[str, Any]] = None) -> Tuple[Any, List[Dict[str, Any]]]:
+    """
+    Run fn(item) in a worker process under its own tracer (spans fn opens are
+    kept too); returns (result, events) for the parent's Tracer.add_events.
+    """
+    tracer = Tracer()
+    previous = set_tracer(tracer)
+    try:
+        with tracer.span(name, **(args or {})):
+            result = fn(item)
+    finally:
+        set_tracer(previous)
+    return result, tracer.thread_names() + tracer.events